@@ -0,0 +1,85 @@
+"""
+Benchmark the ANN backends against brute force on the sample catalog:
+build time, per-query latency and recall@k for a sweep of recall knobs.
+"""
+
+import argparse
+import statistics
+import time
+from dataclasses import replace
+from backend.config import settings
+from backend.ingest.loader import load_data, build_superlinked_app
+from backend.search.ann import ExactIndex, build_ann_index
+from backend.search.cache import get_search_results
+from backend.search.queries import weighted_search
+from backend.search.types import SearchInputs, CategoryWeights
+
+
+def _run(ctx, inputs, p):
+    """Return (ids per query, median latency in ms)."""
+    ids, samples = [], []
+    for inp in inputs:
+        start = time.perf_counter()
+        res = weighted_search(ctx, inp, p)
+        samples.append((time.perf_counter() - start) * 1e3)
+        ids.append(set(res["id"]))
+    return ids, statistics.median(samples)
+
+
+def _recall(truth, found):
+    return statistics.mean(len(t & f) / max(len(t), 1) for t, f in zip(truth, found))
+
+
+def main():
+    """Report build time, latency and recall@k of each ANN backend."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=200, help="number of queries")
+    parser.add_argument("-k", type=int, default=10, help="recall@k")
+    args = parser.parse_args()
+
+    df = load_data()
+    ctx = build_superlinked_app(df)
+    get_search_results().max_entries = 0
+    p = CategoryWeights(desc_weight=1.0, cat_weight=0.5)
+    inputs = [
+        SearchInputs(
+            description_query=row.description,
+            category_query=row.food_category,
+            limit=args.k,
+        )
+        for row in df.sample(args.n, random_state=0).itertuples()
+    ]
+
+    exact = replace(ctx, ann=ExactIndex())
+    truth, exact_ms = _run(exact, inputs, p)  # also warms the query-vector cache
+    truth, exact_ms = _run(exact, inputs, p)
+    print(f"{'exact':<6} {'':<18} median {exact_ms:7.2f} ms   recall@{args.k} 1.000")
+
+    sweeps = {
+        "ivf": ("ivf_nprobe", [1, 4, 16, 64]),
+        "hnsw": ("hnsw_ef_search", [10, 50, 100, 200]),
+    }
+    for backend, (knob, values) in sweeps.items():
+        try:
+            start = time.perf_counter()
+            index = build_ann_index(ctx.vectors, backend)
+            build_s = time.perf_counter() - start
+        except ImportError as exc:
+            print(f"{backend:<6} skipped: {exc}")
+            continue
+        print(f"{backend:<6} built in {build_s:.2f}s")
+        for value in values:
+            setattr(settings, knob, value)
+            if backend == "ivf":
+                index.nprobe = value
+            found, ms = _run(replace(ctx, ann=index), inputs, p)
+            print(
+                f"{backend:<6} {knob}={value:<8} median {ms:7.2f} ms   "
+                f"recall@{args.k} {_recall(truth, found):.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
+
+# python -m scripts.bench_ann - run from the root directory
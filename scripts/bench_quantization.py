@@ -0,0 +1,103 @@
+"""
+Benchmark reduced-precision vector storage on the sample catalog: bytes of
+the scanned text blocks, per-query and batch latency, and recall@k of
+float16 / int8 shortlisting (with float32 rescoring) against float32.
+"""
+
+import argparse
+import statistics
+import time
+from dataclasses import replace
+from backend.config import settings
+from backend.ingest.loader import load_data, build_superlinked_app
+from backend.search.ann import ExactIndex
+from backend.search.cache import get_search_results
+from backend.search.quantize import quantize
+from backend.search.queries import batch_search, weighted_search
+from backend.search.types import SearchInputs, CategoryWeights
+
+
+def _run(ctx, inputs, p):
+    """Return (ids per query, median latency in ms)."""
+    ids, samples = [], []
+    for inp in inputs:
+        start = time.perf_counter()
+        res = weighted_search(ctx, inp, p)
+        samples.append((time.perf_counter() - start) * 1e3)
+        ids.append(set(res["id"]))
+    return ids, statistics.median(samples)
+
+
+def _recall(truth, found):
+    return statistics.mean(len(t & f) / max(len(t), 1) for t, f in zip(truth, found))
+
+
+def main():
+    """Report memory, latency and recall@k per vector precision."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=200, help="number of queries")
+    parser.add_argument("-k", type=int, default=10, help="recall@k")
+    parser.add_argument(
+        "--rescore",
+        type=int,
+        nargs="+",
+        default=[20, 50, 100, 200],
+        help="rescore_candidates values to sweep",
+    )
+    args = parser.parse_args()
+
+    df = load_data()
+    ctx = build_superlinked_app(df)
+    get_search_results().max_entries = 0
+    p = CategoryWeights(desc_weight=1.0, cat_weight=0.5)
+    inputs = [
+        SearchInputs(
+            description_query=row.description,
+            category_query=row.food_category,
+            limit=args.k,
+        )
+        for row in df.sample(args.n, random_state=0).itertuples()
+    ]
+
+    # brute-force NumPy path, float32 only
+    base = replace(
+        ctx,
+        ann=ExactIndex(),
+        vectors=replace(ctx.vectors, desc_q=None, cat_text_q=None),
+    )
+    _run(base, inputs, p)  # warm the query-vector cache
+    truth, ms = _run(base, inputs, p)
+    f32_bytes = base.vectors.desc.nbytes + base.vectors.cat_text.nbytes
+    start = time.perf_counter()
+    batch_search(base, inputs, p, k=args.k)
+    batch_ms = (time.perf_counter() - start) * 1e3
+    print(
+        f"{'float32':<8} {'':<12} {f32_bytes / 2**20:8.1f} MiB   median {ms:7.2f} ms   "
+        f"batch {batch_ms:8.1f} ms   recall@{args.k} 1.000"
+    )
+
+    for precision in ("float16", "int8"):
+        vi = replace(
+            base.vectors,
+            desc_q=quantize(base.vectors.desc, precision),
+            cat_text_q=quantize(base.vectors.cat_text, precision),
+        )
+        q_bytes = vi.desc_q.nbytes + vi.cat_text_q.nbytes
+        qctx = replace(base, vectors=vi)
+        for rescore in args.rescore:
+            settings.rescore_candidates = rescore
+            found, ms = _run(qctx, inputs, p)
+            start = time.perf_counter()
+            batch_search(qctx, inputs, p, k=args.k)
+            batch_ms = (time.perf_counter() - start) * 1e3
+            print(
+                f"{precision:<8} rescore={rescore:<4} {q_bytes / 2**20:8.1f} MiB   "
+                f"median {ms:7.2f} ms   batch {batch_ms:8.1f} ms   "
+                f"recall@{args.k} {_recall(truth, found):.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
+
+# python -m scripts.bench_quantization - run from the root directory
@@ -0,0 +1,106 @@
+"""
+Micro-benchmark per-call search latency: rebuilding the sl.Query chain on
+every call versus binding values into the templates compiled with SearchCtx,
+and a loop of weighted_search calls versus one batch_search call.
+"""
+
+import argparse
+import statistics
+import time
+from superlinked import framework as sl
+from backend.ingest.loader import load_data, build_superlinked_app
+from backend.search.cache import get_query_vectors, get_search_results
+from backend.search.queries import batch_search, compile_queries, weighted_search, _run
+from backend.search.types import SearchInputs, CategoryWeights
+from backend.config import settings
+
+
+def _time_calls(fn, n):
+    """Return per-call latencies (µs) of ``n`` calls to ``fn``."""
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def _report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[int(0.95 * (len(samples) - 1))]
+    print(f"{name:<28} median {statistics.median(samples):9.1f} µs   p95 {p95:9.1f} µs")
+
+
+def main():
+    """Compare per-call latency of rebuilt vs precompiled weighted queries."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=200, help="calls per variant")
+    parser.add_argument(
+        "--batch", type=int, default=1000, help="queries for the batch comparison"
+    )
+    args = parser.parse_args()
+
+    df = load_data()
+    ctx = build_superlinked_app(df)
+    get_search_results().max_entries = 0  # measure the query path, not the result cache
+    inp = SearchInputs(description_query="apple", category_query="dessert")
+    p = CategoryWeights(desc_weight=1.0, cat_weight=0.5)
+
+    def rebuilt():
+        q = (
+            sl.Query(
+                ctx.index,
+                weights={
+                    ctx.desc_space: p.desc_weight,
+                    ctx.cat_text_space: p.cat_weight,
+                },
+            )
+            .find(ctx.food_item)
+            .similar(ctx.desc_space, sl.Param("q"))
+            .similar(ctx.cat_text_space, sl.Param("cat"))
+            .select_all()
+        )
+        return _run(ctx, q, q=inp.description_query, cat=inp.category_query)
+
+    def compiled():
+        return _run(
+            ctx,
+            ctx.queries.weighted,
+            q=inp.description_query,
+            cat=inp.category_query,
+            desc_weight=p.desc_weight,
+            cat_weight=p.cat_weight,
+            limit=settings.search_limit,
+        )
+
+    rebuilt()  # warm the query-vector cache so neither variant pays inference
+    _report(
+        "compile all four templates", _time_calls(lambda: compile_queries(ctx), args.n)
+    )
+    _report("weighted, rebuilt per call", _time_calls(rebuilt, args.n))
+    _report("weighted, precompiled", _time_calls(compiled, args.n))
+
+    # batch: same query texts, cold query-vector cache for both variants
+    queries = df.description.sample(args.batch, replace=True, random_state=0).tolist()
+    inputs = [
+        SearchInputs(description_query=t, category_query="dessert") for t in queries
+    ]
+    get_query_vectors().clear()
+    start = time.perf_counter()
+    for one in inputs:
+        weighted_search(ctx, one, p)
+    loop_s = time.perf_counter() - start
+    get_query_vectors().clear()
+    start = time.perf_counter()
+    batch_search(ctx, inputs, p, k=10)
+    batch_s = time.perf_counter() - start
+    print(
+        f"{len(inputs)} weighted queries: loop {len(inputs) / loop_s:8.0f} q/s   "
+        f"batch_search {len(inputs) / batch_s:8.0f} q/s   ({loop_s / batch_s:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
+
+# python -m scripts.bench_queries - run from the root directory
@@ -0,0 +1,372 @@
+"""
+Reproducible benchmark of the ingest, search and UMAP hot paths.
+
+Runs offline on a synthetic catalog generated from the ``FoodItem`` schema,
+with a deterministic stub in place of the sentence-transformers model
+(``--real-model`` uses the configured model instead). For every stage it
+reports p50/p95/p99 latency, throughput and the peak RSS during that stage
+(the process' lifetime peak where the counter cannot be reset), and
+``--json`` writes the same numbers for comparison across commits. Run it
+with ``EMBEDDING_BACKEND`` / ``EMBEDDING_THREADS`` set to compare embedding
+runtimes on the ``ingest`` and ``encode_query*`` stages.
+"""
+
+import argparse
+import hashlib
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from backend.config import settings
+
+# ───────────────────────── synthetic catalog ─────────────────────────
+_WORDS = (
+    "apple banana cereal chicken beef pork salmon tuna rice bread pasta cheese milk "
+    "yogurt butter egg potato tomato carrot bean lentil oat corn wheat sugar honey "
+    "chocolate vanilla strawberry orange lemon nut almond peanut soy tofu spinach "
+    "broccoli onion garlic pepper raw cooked fried baked boiled roasted dried canned "
+    "frozen fresh sweetened salted low-fat whole skim smoked grilled"
+).split()
+_CATEGORIES = (
+    "Baked Products",
+    "Beef Products",
+    "Beverages",
+    "Breakfast Cereals",
+    "Dairy and Egg Products",
+    "Fats and Oils",
+    "Finfish and Shellfish Products",
+    "Fruits and Fruit Juices",
+    "Legumes and Legume Products",
+    "Nut and Seed Products",
+    "Pork Products",
+    "Poultry Products",
+    "Snacks",
+    "Soups, Sauces, and Gravies",
+    "Sweets",
+    "Vegetables and Vegetable Products",
+)
+
+
+def synthetic_catalog(n_rows, seed=0):
+    """
+    Generate ``n_rows`` rows with one column per ``FoodItem`` field: ids for
+    the id field, calories in the configured range for float fields, a
+    category for ``*category*`` text fields and 3-8 word phrases otherwise.
+    """
+    from backend.ingest.schema import FoodItem
+
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, kind in FoodItem.__annotations__.items():
+        kind = getattr(kind, "__name__", str(kind))
+        if "Id" in kind:
+            columns[name] = np.arange(1, n_rows + 1, dtype=np.int64) + 100_000
+        elif "Float" in kind:
+            columns[name] = rng.uniform(
+                settings.calories_min, settings.calories_max, n_rows
+            ).round(1)
+        elif "category" in name:
+            columns[name] = np.asarray(_CATEGORIES, dtype=object)[
+                rng.integers(0, len(_CATEGORIES), n_rows)
+            ]
+        else:
+            lengths = rng.integers(3, 9, n_rows)
+            words = np.asarray(_WORDS, dtype=object)[
+                rng.integers(0, len(_WORDS), lengths.sum())
+            ]
+            columns[name] = [
+                ", ".join(w) for w in np.split(words, np.cumsum(lengths)[:-1])
+            ]
+    return pd.DataFrame(columns)
+
+
+# ───────────────────────── stub encoder ──────────────────────────────
+def install_stub_encoder(dim=384):
+    """
+    Replace ``SentenceTransformer`` loading and encoding with a deterministic,
+    offline bag-of-words hash embedding (texts sharing words are similar).
+    Must run before anything installs the embedding-cache hook.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    token_vectors = {}
+
+    def token_vector(token):
+        vector = token_vectors.get(token)
+        if vector is None:
+            seed = int.from_bytes(
+                hashlib.blake2b(token.encode(), digest_size=8).digest(), "little"
+            )
+            vector = token_vectors[token] = (
+                np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+            )
+        return vector
+
+    def init(self, *args, **kwargs):
+        super(SentenceTransformer, self).__init__()
+        # read by Superlinked's sentence-transformers engine
+        self.prompts = {}
+        self.default_prompt_name = None
+        self._model_config = {}
+
+    def encode(self, sentences, *args, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        out = np.zeros((len(texts), dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in text.lower().replace(",", " ").split() or [""]:
+                out[i] += token_vector(token)
+        out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out[0] if single else out
+
+    SentenceTransformer.__init__ = init
+    SentenceTransformer.encode = encode
+    SentenceTransformer.get_sentence_embedding_dimension = lambda self: dim
+
+
+# ───────────────────────── measurement ───────────────────────────────
+def _reset_peak_rss():
+    """
+    Restart the kernel's peak-RSS counter (Linux), so each stage reports its
+    own peak. Returns False where that is not possible, leaving ``ru_maxrss``,
+    the peak over the whole process lifetime.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def _measure(fn, calls, items_per_call=1):
+    """Time ``calls`` calls of ``fn`` and summarise them as one stage."""
+    samples = []
+    per_stage = _reset_peak_rss()
+    start = time.perf_counter()
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e3)
+    elapsed = time.perf_counter() - start
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "calls": calls,
+        "p50_ms": statistics.median(ordered),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "throughput_per_s": (
+            calls * items_per_call / elapsed if elapsed else float("inf")
+        ),
+        "peak_rss_mb": _peak_rss_mb(),
+        "peak_rss_scope": "stage" if per_stage else "process",
+    }
+
+
+def _queries(df, n, seed):
+    return df.sample(n, replace=len(df) < n, random_state=seed)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    """Run every stage and return the results document."""
+    if not args.real_model:
+        install_stub_encoder(args.dim)
+    settings.embedding_cache_path = None
+
+    from backend.embedding.cache import get_embedding_cache
+    from backend.embedding.runtime import get_runtime
+    from backend.features.umap import create_umap_vectors, subset_top_n_umap
+    from backend.ingest.loader import build_superlinked_app
+    from backend.search.cache import get_query_vectors, get_search_results
+    from backend.search.queries import (
+        batch_search,
+        combined_search,
+        numeric_search,
+        simple_search,
+        weighted_search,
+    )
+    from backend.search.types import CategoryWeights, NumericWeights, SearchInputs
+
+    df = synthetic_catalog(args.rows, args.seed)
+    stages = {}
+    built = []
+
+    def ingest():
+        get_embedding_cache().clear()
+        built[:] = [build_superlinked_app(df, use_snapshot=False)]
+
+    stages["ingest"] = _measure(ingest, args.ingest_runs, items_per_call=len(df))
+    ctx = built[-1]
+    print(f"ingested {len(df)} rows", file=sys.stderr)
+
+    # measure the search path, not the result cache
+    get_search_results().max_entries = 0
+    sample = _queries(df, args.queries, args.seed)
+
+    # query encoding without the caches: one caller, then concurrent callers
+    # whose single-text calls the runtime coalesces into shared model calls
+    runtime = get_runtime()
+    texts = sample.description.tolist()
+    pending = iter(texts)
+    stages["encode_query"] = _measure(
+        lambda: runtime.encode([next(pending)]), len(texts)
+    )
+    with ThreadPoolExecutor(args.concurrency) as pool:
+
+        def encode_all():
+            return list(pool.map(lambda t: runtime.encode([t]), texts))
+
+        stages["encode_query_concurrent"] = _measure(encode_all, 1, len(texts))
+    inputs = [
+        SearchInputs(
+            description_query=r.description,
+            category_query=r.food_category,
+            calories_val=r.calories,
+        )
+        for r in sample.itertuples()
+    ]
+    filtered = [
+        SearchInputs(
+            description_query=r.description,
+            category_query=r.food_category,
+            calories_val=r.calories,
+            categories=(r.food_category,),
+        )
+        for r in sample.itertuples()
+    ]
+    cat_w, num_w = CategoryWeights(1.0, 0.5), NumericWeights(1.0, 1.0)
+    searches = {
+        "simple_search": lambda inp: simple_search(ctx, inp),
+        "weighted_search": lambda inp: weighted_search(ctx, inp, cat_w),
+        "numeric_search": lambda inp: numeric_search(ctx, inp, num_w),
+        "combined_search": lambda inp: combined_search(ctx, inp, num_w),
+    }
+    for name, search in searches.items():
+        for variant, batch in (("", inputs), ("_filtered", filtered)):
+            if variant and name != "combined_search":
+                continue
+            get_query_vectors().clear()
+            pending = iter(batch)
+            stages[f"{name}{variant}_cold"] = _measure(
+                lambda: search(next(pending)), len(batch)
+            )
+            pending = iter(batch)
+            stages[f"{name}{variant}"] = _measure(
+                lambda: search(next(pending)), len(batch)
+            )
+
+    get_query_vectors().clear()
+    stages["batch_search"] = _measure(
+        lambda: batch_search(ctx, inputs, cat_w, k=10), 1, len(inputs)
+    )
+
+    if not args.skip_umap:
+        umap_df = []
+        stages["create_umap_vectors"] = _measure(
+            lambda: umap_df.append(create_umap_vectors(ctx, df)), 1, len(df)
+        )
+        results = [weighted_search(ctx, inp, cat_w) for inp in inputs]
+        pending = iter(results)
+        stages["subset_top_n_umap"] = _measure(
+            lambda: subset_top_n_umap(umap_df[0], next(pending)), len(results)
+        )
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "rows": args.rows,
+            "queries": args.queries,
+            "seed": args.seed,
+            "encoder": (
+                settings.embedding_model if args.real_model else f"stub-{args.dim}"
+            ),
+            "ann_backend": settings.ann_backend,
+            "vector_precision": settings.vector_precision,
+            "embedding_backend": get_runtime().key,
+            "embedding_threads": settings.embedding_threads,
+        },
+        "stages": stages,
+    }
+
+
+def main():
+    """Benchmark ingest, search and UMAP stages and print / save the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--rows", type=int, default=10_000, help="synthetic catalog size"
+    )
+    parser.add_argument(
+        "--queries", type=int, default=200, help="queries per search stage"
+    )
+    parser.add_argument("--ingest-runs", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dim", type=int, default=384, help="stub embedding size")
+    parser.add_argument(
+        "--real-model", action="store_true", help="use settings.embedding_model"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="threads in the concurrent encode stage",
+    )
+    parser.add_argument("--skip-umap", action="store_true")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(
+        f"{'stage':<32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+        f"{'items/s':>11} {'peak RSS MiB':>13}"
+    )
+    for name, s in results["stages"].items():
+        print(
+            f"{name:<32} {s['p50_ms']:9.2f} {s['p95_ms']:9.2f} {s['p99_ms']:9.2f} "
+            f"{s['throughput_per_s']:11.1f} {s['peak_rss_mb']:13.1f}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
+
+# python -m scripts.benchmark --rows 10000 --json bench.json  (from the root directory)
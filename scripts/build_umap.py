@@ -1,25 +1,72 @@
-
 """
 Generate and save UMAP vectors for food database embeddings.
 """
 
+import argparse
+import logging
 from backend.ingest.loader import load_data, build_superlinked_app
-from backend.features.umap import create_umap_vectors
+from backend.features.umap import (
+    append_umap,
+    fit_umap,
+    load_umap_df,
+    load_umap_model,
+    save_umap_df,
+    save_umap_model,
+)
 from backend.config import settings
 
 def main():
     """Generate and save UMAP vectors for food database embeddings."""
-  
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--rebuild-snapshot",
+        action="store_true",
+        help="re-encode every row and rewrite the embedding snapshot",
+    )
+    parser.add_argument(
+        "--no-snapshot",
+        action="store_true",
+        help="neither read nor write the embedding snapshot",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["full", "append"],
+        default="append",
+        help="full: refit UMAP on every row; append: project only new or "
+        "changed rows with the saved model (falls back to full)",
+    )
+    parser.add_argument(
+        "--n-jobs",
+        type=int,
+        default=None,
+        help="UMAP threads for a full fit (default: settings.umap_n_jobs)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO, format="%(levelname)s %(name)s: %(message)s"
+    )
+
     df = load_data()
 
-    ctx = build_superlinked_app(df)
-   
-    umap_df = create_umap_vectors(ctx, df)
-     #save umap vectors
-    umap_df.to_parquet(settings.umap_path)
+    ctx = build_superlinked_app(
+        df,
+        use_snapshot=not args.no_snapshot,
+        refresh_snapshot=args.rebuild_snapshot,
+    )
+
+    model = load_umap_model() if args.mode == "append" else None
+    if model is not None and settings.umap_path.exists():
+        model, umap_df = append_umap(ctx, df, load_umap_df(df), model)
+    else:
+        model, umap_df = fit_umap(ctx, df, n_jobs=args.n_jobs)
+
+    # save umap coordinates (metadata is joined from the food store on load)
+    # and the fitted reducer
+    save_umap_df(umap_df)
+    save_umap_model(model)
     print("umap_df saved")
 
 if __name__ == "__main__":
     main()
-    
-# python -m scripts.build_umap - run from the root directory
\ No newline at end of file
+
+# python -m scripts.build_umap - run from the root directory
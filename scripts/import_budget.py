@@ -0,0 +1,121 @@
+"""
+Measure cold import time of the backend entry points against a budget.
+
+Each module is imported in a fresh interpreter under ``-X importtime``; the
+script reports its cumulative import time, the heaviest third-party
+packages it pulled in, and fails (exit code 1) if the time exceeds the
+budget, a package that should load lazily was imported, or the import built
+``Settings`` (which parses the environment and validates the data paths).
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# module -> (budget in ms, packages that must not be imported eagerly)
+BUDGETS = {
+    "backend.config": (
+        300,
+        ("superlinked", "sentence_transformers", "torch", "umap", "matplotlib"),
+    ),
+    "backend.features.umap": (
+        1500,
+        ("umap", "numba", "matplotlib", "seaborn", "adjustText", "joblib"),
+    ),
+    "backend.search.queries": (
+        1500,
+        ("superlinked", "sentence_transformers", "torch", "umap", "matplotlib"),
+    ),
+    "backend.ingest.store": (
+        2000,
+        ("superlinked", "sentence_transformers", "torch", "umap", "matplotlib"),
+    ),
+    "backend.ingest.loader": (15000, ("umap", "matplotlib", "seaborn")),
+}
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+# printed by the child: whether importing the module built ``Settings``
+_PROBE = (
+    "import {module}; import backend.config as c; "
+    "print(c.get_settings.cache_info().currsize)"
+)
+
+
+def measure(module):
+    """
+    Return (cumulative µs of ``module``, {top-level package: cumulative µs},
+    whether the import built ``Settings``).
+    """
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, ["src", os.environ.get("PYTHONPATH")])),
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    total, packages = 0, {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        cumulative, depth, name = int(m.group(2)), len(m.group(3)) // 2, m.group(4)
+        if name == module:
+            total = cumulative
+        top = name.split(".")[0]
+        if "." not in name or depth <= 1:
+            packages[top] = max(packages.get(top, 0), cumulative)
+    # last line: superlinked logs to stdout while it imports
+    return total, packages, proc.stdout.strip().splitlines()[-1] != "0"
+
+
+def main():
+    """Report import time per entry point and enforce the budgets."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "modules", nargs="*", default=list(BUDGETS), help="modules to measure"
+    )
+    parser.add_argument(
+        "--top", type=int, default=5, help="heaviest packages to list per module"
+    )
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        budget_ms, lazy = BUDGETS.get(module, (float("inf"), ()))
+        total, packages, settings_built = measure(module)
+        eager = [p for p in lazy if p in packages]
+        over = total / 1e3 > budget_ms
+        bad = over or bool(eager) or settings_built
+        failed |= bad
+        status = "FAIL" if bad else "ok"
+        print(
+            f"{status:<4} {module:<28} {total / 1e3:8.1f} ms  (budget {budget_ms} ms)"
+        )
+        heaviest = sorted(packages.items(), key=lambda kv: -kv[1])
+        heaviest = [
+            (p, us) for p, us in heaviest if p not in ("backend", module.split(".")[0])
+        ][: args.top]
+        print(
+            "     heaviest: "
+            + ", ".join(f"{p} {us / 1e3:.0f} ms" for p, us in heaviest)
+        )
+        if eager:
+            print(f"     imported eagerly: {', '.join(eager)}")
+        if settings_built:
+            print("     built Settings at import time")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
+
+# python -m scripts.import_budget - run from the root directory
@@ -0,0 +1,97 @@
+"""
+Load-test the search server: N concurrent clients send searches for food
+descriptions sampled from the data and report latency percentiles.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import aiohttp
+from backend.ingest.loader import load_data
+
+
+def _percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def _client(session, url, bodies, latencies, errors):
+    for body in bodies:
+        start = time.perf_counter()
+        async with session.post(url, json=body) as resp:
+            await resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def _run(args, texts):
+    url = f"{args.url.rstrip('/')}/search/{args.mode}"
+    rng = random.Random(0)
+    bodies = [
+        {
+            "description_query": rng.choice(texts),
+            "category_query": "dessert",
+            "limit": args.limit,
+        }
+        for _ in range(args.requests)
+    ]
+    per_client = [bodies[i :: args.concurrency] for i in range(args.concurrency)]
+    latencies, errors = [], []
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(_client(session, url, b, latencies, errors) for b in per_client)
+        )
+        elapsed = time.perf_counter() - start
+        async with session.get(f"{args.url.rstrip('/')}/health") as resp:
+            health = await resp.json()
+    latencies.sort()
+    print(
+        f"{len(latencies)} requests, concurrency {args.concurrency}, "
+        f"{len(errors)} errors"
+    )
+    print(f"throughput {len(latencies) / elapsed:8.1f} req/s")
+    print(
+        f"latency  p50 {_percentile(latencies, 0.50):7.1f} ms   "
+        f"p95 {_percentile(latencies, 0.95):7.1f} ms   "
+        f"p99 {_percentile(latencies, 0.99):7.1f} ms"
+    )
+    print(f"batching {json.dumps(health['batching'])}")
+
+
+def main():
+    """Drive the search server with concurrent clients and report p50/p95/p99."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument(
+        "--mode",
+        default="weighted",
+        choices=["simple", "weighted", "numeric", "combined"],
+    )
+    parser.add_argument("-n", "--requests", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument(
+        "--distinct",
+        type=int,
+        default=500,
+        help="distinct query texts (fewer = more query-cache hits)",
+    )
+    args = parser.parse_args()
+    texts = (
+        load_data()
+        .description.drop_duplicates()
+        .sample(frac=1.0, random_state=0)
+        .head(args.distinct)
+        .tolist()
+    )
+    asyncio.run(_run(args, texts))
+
+
+if __name__ == "__main__":
+    main()
+
+# python -m backend.server & python -m scripts.load_test - run from the root directory
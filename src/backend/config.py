@@ -1,4 +1,6 @@
+import functools
 from pathlib import Path
+from typing import Literal, Optional
 import os
 from pydantic import field_validator, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -18,11 +20,115 @@ class Settings(BaseSettings):
     data_path:        Path = Field(default=Path("data/sampled_food_db.parquet"))
     umap_path:        Path = Field(default=Path("data/umap_df.parquet"))
     embedding_model:  str  = Field(default="all-MiniLM-L6-v2")
+    snapshot_dir:     Path = Field(default=Path("data/snapshot"))
+    umap_model_path:  Path = Field(default=Path("data/umap_model.joblib"))
 
     # ─── app defaults ────────────────────────────────────────────────────
     calories_min:           int = Field(default=0)
     calories_max:           int = Field(default=1000)
     umap_top_n_food_items:  int = Field(default=10)
+    # >1 (or -1 = all cores) fits in parallel, unseeded
+    umap_n_jobs:            int = Field(default=1)
+    # result rows transformed per request
+    umap_max_projected:     int = Field(default=50, ge=0)
+    # "chart": client-side Vega-Lite; "image": cached PNG;
+    # "matplotlib": seaborn + adjustText
+    umap_render: Literal["chart", "image", "matplotlib"] = Field(default="chart")
+    umap_image_cache_size:  int = Field(default=64, ge=0)  # cached PNGs, 0 = off
+
+    # ─── ingest ──────────────────────────────────────────────────────────
+    use_snapshot:           bool = Field(default=True)
+    # rows per parquet chunk / source.put
+    ingest_batch_size:      int  = Field(default=4096, gt=0)
+    embedding_batch_size:   int  = Field(default=256, gt=0)    # texts per model call
+    # threads encoding in parallel
+    ingest_workers:         int  = Field(default=4, gt=0)
+    # LRU entries, None = unbounded
+    embedding_cache_size:   Optional[int]  = Field(default=500_000)
+    # e.g. data/embedding_cache.npz
+    embedding_cache_path:   Optional[Path] = Field(default=None)
+    # deleted ids filtered per query before sync re-ingests
+    max_tombstones:         int  = Field(default=1000, ge=0)
+
+    # ─── embedding runtime ───────────────────────────────────────────────
+    # "onnx" runs the model on ONNX Runtime (sentence-transformers[onnx])
+    embedding_backend:        Literal["torch", "onnx"] = Field(default="torch")
+    # e.g. onnx/model_quint8_avx2.onnx
+    embedding_onnx_file:      Optional[str]   = Field(default=None)
+    # inference threads, None = library default
+    embedding_threads:        Optional[int]   = Field(default=None, gt=0)
+    # wait to coalesce concurrent encodes, 0 = off
+    embedding_batch_wait_ms:  float           = Field(default=2.0, ge=0)
+
+    # ─── search ──────────────────────────────────────────────────────────
+    # default top-k per search
+    search_limit:            int   = Field(default=100, gt=0)
+    # cached query-text vectors
+    query_cache_size:        int   = Field(default=4096, gt=0)
+    query_cache_ttl_seconds: float = Field(default=3600.0, gt=0)
+    # cached result frames, 0 = off
+    result_cache_size:       int   = Field(default=256, ge=0)
+    # queries scored per matrix product
+    batch_search_chunk:      int   = Field(default=256, gt=0)
+    # rows kept per query for live re-weighting
+    rerank_pool_size:        int   = Field(default=20_000, gt=0)
+    # cached per-query score pools
+    score_pool_cache_size:   int   = Field(default=64, ge=0)
+    # sliders re-rank a cached NumPy score pool instead of re-querying
+    live_weights:            bool  = Field(default=False)
+    # "float16" / "int8" shortlist on quantized text vectors, then rescore
+    # the best rescore_candidates per query in float32 (NumPy search path)
+    vector_precision: Literal["float32", "float16", "int8"] = Field(default="float32")
+    rescore_candidates:      int   = Field(default=100, gt=0)
+
+    # ─── ANN backend ─────────────────────────────────────────────────────
+    # "none" queries through Superlinked; "exact" / "ivf" / "hnsw" serve
+    # unfiltered searches from the NumPy index with that candidate generator
+    ann_backend: Literal["none", "exact", "ivf", "hnsw"] = Field(default="none")
+    ann_dir:              Path = Field(default=Path("data/ann"))
+    # rows rescored exactly per query
+    ann_candidates:       int  = Field(default=200, gt=0)
+    ivf_nlist:            int  = Field(default=256, gt=0)
+    # higher = better recall, slower
+    ivf_nprobe:           int  = Field(default=16, gt=0)
+    hnsw_m:               int  = Field(default=16, gt=0)
+    hnsw_ef_construction: int  = Field(default=200, gt=0)
+    # higher = better recall, slower
+    hnsw_ef_search:       int  = Field(default=100, gt=0)
+
+    # ─── query understanding (non-English queries) ───────────────────────
+    # "local": built-in phrase table (offline stand-in); "openai": LLM via instructor
+    translator:             Literal["local", "openai"] = Field(default="local")
+    translator_model:       str   = Field(default="gpt-4o-mini")
+    # None = in memory
+    translation_cache_path: Optional[Path] = Field(
+        default=Path("data/translations.sqlite")
+    )
+    # translator calls in flight per batch
+    translate_concurrency:  int   = Field(default=8, gt=0)
+
+    # ─── metrics / profiling ─────────────────────────────────────────────
+    # per-stage timing histograms
+    metrics_enabled:      bool  = Field(default=True)
+    # keep cProfile dumps of the N slowest requests
+    profile_slowest:      int   = Field(default=0, ge=0)
+    # share of requests profiled
+    profile_sample_rate:  float = Field(default=1.0, ge=0, le=1)
+    profile_dir:          Path  = Field(default=Path("data/profiles"))
+
+    # ─── search server (python -m backend.server) ────────────────────────
+    server_host:          str   = Field(default="127.0.0.1")
+    server_port:          int   = Field(default=8080)
+    # threads running the search functions
+    server_threads:       int   = Field(default=4, gt=0)
+    # >1: processes sharing the mmap store
+    server_workers:       int   = Field(default=1, gt=0)
+    # larger request limits are clamped to this
+    server_max_limit:     int   = Field(default=1000, gt=0)
+    # query texts per embedding batch
+    batch_max_size:       int   = Field(default=64, gt=0)
+    # wait for more requests before encoding
+    batch_max_wait_ms:    float = Field(default=5.0, ge=0)
 
     # ─── validation ─────────────────────────────────────────────────────
     @field_validator("data_path", "umap_path")
@@ -43,4 +149,28 @@ class Settings(BaseSettings):
     )
 
 
-settings = Settings()
\ No newline at end of file
+@functools.lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build (once) and return the process settings."""
+    return Settings()
+
+
+class _LazySettings:
+    """
+    Stands in for the ``Settings`` instance until an attribute is first read
+    or assigned, so importing a module that uses ``settings`` does not parse
+    the environment or validate paths.
+    """
+    __slots__ = ()
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(get_settings(), name, value)
+
+    def __repr__(self) -> str:
+        return repr(get_settings())
+
+
+settings: Settings = _LazySettings()  # type: ignore[assignment]
@@ -0,0 +1,314 @@
+"""
+Process-wide cache of text embeddings, shared by every text space.
+
+Superlinked's text spaces encode through ``SentenceTransformer.encode``.
+The hook installed here routes those calls through an ``EmbeddingCache``, so
+``desc_space`` and ``cat_text`` share one cache: every unique string is
+encoded once, and vectors that are already known (restored from an ingest
+snapshot or from ``settings.embedding_cache_path``) never reach the model.
+"""
+
+from __future__ import annotations
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from ..config import settings
+from ..metrics import span
+
+logger = logging.getLogger(__name__)
+
+Encoder = Callable[[List[str]], np.ndarray]
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """
+    Counters of an ``EmbeddingCache``.
+
+    Attributes:
+        hits: Texts served from the cache (including repeats within one call).
+        misses: Unique texts that had to be encoded.
+        size: Entries currently held.
+    """
+
+    hits: int
+    misses: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __sub__(self, other: "CacheStats") -> "CacheStats":
+        return CacheStats(self.hits - other.hits, self.misses - other.misses, self.size)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed LRU cache mapping ``(model, text)`` to the vector the
+    model produced for that text.
+
+    Attributes:
+        model_name: The embedding model the cached vectors belong to.
+        max_entries: Entries kept before the least recently used are evicted
+                     (``None`` for unbounded).
+        ttl_seconds: Entries older than this are treated as missing
+                     (``None`` to never expire).
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._vectors: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._expires: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def stats(self) -> CacheStats:
+        """Return a snapshot of the hit/miss counters."""
+        with self._lock:
+            return CacheStats(self._hits, self._misses, len(self._vectors))
+
+    def clear(self) -> None:
+        """Drop every entry; the counters are kept."""
+        with self._lock:
+            self._vectors.clear()
+            self._expires.clear()
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """Store one vector per text, overwriting existing entries."""
+        expires = (
+            None if self.ttl_seconds is None else time.monotonic() + self.ttl_seconds
+        )
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = (self.model_name, text)
+                self._vectors[key] = vector
+                self._vectors.move_to_end(key)
+                if expires is not None:
+                    self._expires[key] = expires
+            self._evict()
+
+    def _evict(self) -> None:
+        if self.max_entries is None:
+            return
+        while len(self._vectors) > self.max_entries:
+            key, _ = self._vectors.popitem(last=False)
+            self._expires.pop(key, None)
+
+    def _lookup(self, key: Tuple[str, str], now: float) -> Optional[np.ndarray]:
+        vector = self._vectors.get(key)
+        if vector is None:
+            return None
+        if self._expires.get(key, now) < now:
+            del self._vectors[key]
+            del self._expires[key]
+            return None
+        self._vectors.move_to_end(key)
+        return vector
+
+    def get_or_encode(self, texts: Sequence[str], encode: Encoder) -> np.ndarray:
+        """
+        Return the vectors for ``texts``, encoding only the ones not cached.
+
+        Args:
+            texts (Sequence[str]): Texts to look up; duplicates are allowed.
+            encode (Encoder): Called once with the unique uncached texts.
+
+        Returns:
+            np.ndarray: One row per input text, in input order.
+        """
+        unique = list(dict.fromkeys(texts))
+        found: Dict[str, np.ndarray] = {}
+        now = time.monotonic()
+        with self._lock:
+            for t in unique:
+                vector = self._lookup((self.model_name, t), now)
+                if vector is not None:
+                    found[t] = vector
+        missing = [t for t in unique if t not in found]
+        if missing:
+            with span("embed"):
+                encoded = np.asarray(encode(missing))
+            self.put_many(missing, encoded)
+            found.update(zip(missing, encoded))
+        with self._lock:
+            self._hits += len(texts) - len(missing)
+            self._misses += len(missing)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([found[t] for t in texts])
+
+    # ─── persistence ────────────────────────────────────────────────────
+    def save(self, path: Path) -> None:
+        """Write all entries to an ``.npz`` file."""
+        with self._lock:
+            texts = [text for _, text in self._vectors]
+            vectors = list(self._vectors.values())
+        if not texts:
+            return
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as fh:
+            np.savez(
+                fh,
+                model=np.array(self.model_name),
+                texts=np.array(texts, dtype=str),
+                vectors=np.stack(vectors).astype(np.float32, copy=False),
+            )
+
+    def load(self, path: Path) -> int:
+        """
+        Add the entries saved by ``save``; files written for another model
+        are ignored.
+
+        Returns:
+            int: Number of entries loaded.
+        """
+        with np.load(path) as data:
+            if str(data["model"]) != self.model_name:
+                return 0
+            texts = data["texts"].tolist()
+            self.put_many(texts, data["vectors"])
+        return len(texts)
+
+
+# ───────────────────────── encode hook ─────────────────────────────────
+_cache: Optional[EmbeddingCache] = None
+# caches of runtimes other than the default one, by runtime key
+_model_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+_active: ContextVar[Optional[EmbeddingCache]] = ContextVar(
+    "active_embedding_cache", default=None
+)
+
+
+def get_embedding_cache(model_name: Optional[str] = None) -> EmbeddingCache:
+    """
+    Return the process-wide cache of ``model_name`` (default
+    ``settings.embedding_model``), installing the encode hook on first use.
+    Only the default model's cache is restored from ``cache_file()``.
+    """
+    global _cache
+    from .runtime import get_runtime
+
+    if _cache is None:
+        _cache = EmbeddingCache(
+            get_runtime().key, max_entries=settings.embedding_cache_size
+        )
+        path = cache_file()
+        if path is not None and path.exists():
+            logger.info("loaded %d cached embeddings from %s", _cache.load(path), path)
+        _install_encode_hook()
+    key = get_runtime(model_name).key
+    if key == _cache.model_name:
+        return _cache
+    with _caches_lock:
+        if key not in _model_caches:
+            _model_caches[key] = EmbeddingCache(
+                key, max_entries=settings.embedding_cache_size
+            )
+        return _model_caches[key]
+
+
+@contextmanager
+def using_cache(cache: EmbeddingCache) -> Iterator[EmbeddingCache]:
+    """
+    Route encode calls made inside the block (in this thread / task) through
+    ``cache`` instead of the process-wide ingest cache.
+    """
+    get_embedding_cache()
+    token = _active.set(cache)
+    try:
+        yield cache
+    finally:
+        _active.reset(token)
+
+
+def cache_file() -> Optional[Path]:
+    """Return the configured on-disk location of the cache, if any."""
+    if settings.embedding_cache_path is None:
+        return None
+    return Path(__file__).resolve().parents[3] / settings.embedding_cache_path
+
+
+def encode_uncached(model, texts: List[str], **kwargs) -> np.ndarray:
+    """Run ``model.encode`` without going through the cache."""
+    encode = type(model).encode
+    return getattr(encode, "__wrapped__", encode)(model, texts, **kwargs)
+
+
+# options that do not change the vectors, so any model instance can serve the call
+_RUNTIME_KWARGS = {"batch_size", "show_progress_bar", "convert_to_numpy"}
+
+
+def _runtime_of(model):
+    """
+    Return the ``EmbeddingRuntime`` that serves ``model``: the one that loaded
+    it, or the default runtime for any other instance. Those are the copies
+    Superlinked's text spaces load of ``settings.embedding_model``.
+    """
+    from .runtime import get_runtime
+
+    return getattr(model, "_embedding_runtime", None) or get_runtime()
+
+
+def _install_encode_hook() -> None:
+    """
+    Wrap ``SentenceTransformer.encode`` so numpy sentence embeddings go
+    through the cache of the calling model's runtime, and cache misses
+    through that shared ``EmbeddingRuntime`` rather than the calling space's
+    own model. Tensor / token outputs and positional options are passed
+    straight to the original implementation.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    original = SentenceTransformer.encode
+    if getattr(original, "_embedding_cache_hook", False):
+        return
+
+    @functools.wraps(original)
+    def encode(self, sentences, *args, **kwargs):
+        bypass = (
+            args
+            or kwargs.get("convert_to_tensor", False)
+            or not kwargs.get("convert_to_numpy", True)
+            or kwargs.get("output_value", "sentence_embedding") != "sentence_embedding"
+        )
+        if bypass:
+            return original(self, sentences, *args, **kwargs)
+        runtime = _runtime_of(self)
+        cache = _active.get()
+        if cache is None or cache.model_name != runtime.key:
+            cache = get_embedding_cache(runtime.model_name)
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        # Superlinked passes prompt_name=None; None leaves an option at its default
+        options = {name for name, value in kwargs.items() if value is not None}
+        if options <= _RUNTIME_KWARGS:
+            encode_missing = runtime.encode
+        else:
+            encode_missing = functools.partial(original, self, **kwargs)
+        vectors = cache.get_or_encode(texts, encode_missing)
+        return vectors[0] if single else vectors
+
+    encode._embedding_cache_hook = True
+    SentenceTransformer.encode = encode
@@ -0,0 +1,51 @@
+"""
+Direct access to the embedding model used by the text spaces, through the
+shared ``EmbeddingRuntime``.
+"""
+
+from __future__ import annotations
+import threading
+from typing import Optional, Sequence
+import numpy as np
+from .cache import get_embedding_cache
+from .runtime import get_runtime
+
+
+def load_model(model_name: Optional[str] = None):
+    """Load (once per process) the sentence-transformers model ``model_name``."""
+    return get_runtime(model_name).model
+
+
+def warm_up(model_name: Optional[str] = None) -> threading.Thread:
+    """
+    Import sentence-transformers, load the model and run one encode on a
+    daemon thread, so the first query does not pay for it.
+
+    Returns:
+        threading.Thread: The started thread (``join`` it to wait).
+    """
+    return get_runtime(model_name).warm_up()
+
+
+def encode_texts(
+    texts: Sequence[str], model_name: Optional[str] = None, cached: bool = True
+) -> np.ndarray:
+    """
+    Encode ``texts`` with the configured model.
+
+    Args:
+        texts (Sequence[str]): Texts to encode.
+        model_name (str, optional): Overrides ``settings.embedding_model``.
+        cached (bool): Go through the embedding cache. Callers that already
+                       did the cache lookup pass ``False``.
+
+    Returns:
+        np.ndarray: A float32 matrix with one row per text.
+    """
+    runtime = get_runtime(model_name)
+    if not cached:
+        return runtime.encode(texts)
+    get_embedding_cache()
+    return np.asarray(
+        runtime.model.encode(list(texts), convert_to_numpy=True), dtype=np.float32
+    )
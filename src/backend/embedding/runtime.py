@@ -0,0 +1,265 @@
+"""
+One embedding runtime per process, shared by every text space.
+
+``desc_space`` and ``cat_text`` (and the query path) all embed through
+``get_runtime()``: the runtime loads its model once, inference threads are
+set from ``settings.embedding_threads``, and encode calls arriving
+concurrently from several threads (ingest workers, server batches, Streamlit
+sessions) are coalesced into one model call of up to
+``settings.embedding_batch_size`` texts, waiting at most
+``settings.embedding_batch_wait_ms`` for company. ``share_with_superlinked``
+hands Superlinked's engine the runtime's model, so the process holds one
+copy of it.
+
+With ``settings.embedding_backend="onnx"`` the model runs on ONNX Runtime
+(``pip install "sentence-transformers[onnx]"``) instead of PyTorch;
+``settings.embedding_onnx_file`` selects an exported or quantized graph
+shipped with the model, e.g. ``onnx/model_quint8_avx2.onnx``.
+"""
+
+from __future__ import annotations
+import functools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from ..config import settings
+from .cache import encode_uncached
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingRuntime:
+    """
+    A lazily loaded sentence-transformers model with dynamic batching.
+
+    Calls with fewer than ``max_batch`` texts are queued; a single worker
+    thread takes the first pending call, collects whatever else arrives
+    within ``max_wait`` seconds (up to ``max_batch`` texts), encodes the
+    unique texts in one call and hands each caller its rows. Larger calls
+    are already a full batch and run directly on the calling thread.
+
+    Attributes:
+        model_name: sentence-transformers model name or path.
+        backend: ``"torch"`` or ``"onnx"``.
+        onnx_file: ONNX graph inside the model repo (``None`` = ``model.onnx``).
+        threads: Intra-op inference threads (``None`` = library default).
+        max_batch: Texts per coalesced model call.
+        max_wait: Seconds the first queued call waits for others.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        backend: str = "torch",
+        onnx_file: Optional[str] = None,
+        threads: Optional[int] = None,
+        max_batch: int = 256,
+        max_wait: float = 0.002,
+    ):
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self.threads = threads
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._batches = 0
+        self._texts = 0
+
+    @property
+    def key(self) -> str:
+        """Identifies the vectors this runtime produces (cache / snapshot key)."""
+        if self.backend == "torch":
+            return self.model_name
+        return f"{self.model_name}@{self.backend}:{self.onnx_file or 'model.onnx'}"
+
+    @property
+    def model(self):
+        """The loaded ``SentenceTransformer`` (loaded on first access)."""
+        if self._model is None:
+            with self._load_lock:  # a warm-up thread may be loading it already
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _load(self):
+        start = time.perf_counter()
+        from sentence_transformers import SentenceTransformer
+
+        kwargs = {}
+        if self.backend == "onnx":
+            try:
+                import onnxruntime
+            except ImportError as exc:
+                raise ImportError(
+                    "embedding_backend='onnx' requires "
+                    '`pip install "sentence-transformers[onnx]"`'
+                ) from exc
+            options = onnxruntime.SessionOptions()
+            if self.threads:
+                options.intra_op_num_threads = self.threads
+            model_kwargs = {
+                "provider": "CPUExecutionProvider",
+                "session_options": options,
+            }
+            if self.onnx_file:
+                model_kwargs["file_name"] = self.onnx_file
+            kwargs = {"backend": "onnx", "model_kwargs": model_kwargs}
+        elif self.threads:
+            import torch
+
+            torch.set_num_threads(self.threads)
+        model = SentenceTransformer(self.model_name, **kwargs)
+        # lets the encode hook route this model's cache misses back here
+        model._embedding_runtime = self
+        logger.info("loaded %s in %.1fs", self.key, time.perf_counter() - start)
+        return model
+
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    # ─── encoding ───────────────────────────────────────────────────────
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Encode ``texts`` (no cache lookup), coalescing small concurrent calls.
+
+        Returns:
+            np.ndarray: A float32 matrix with one row per text.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.dimension()), dtype=np.float32)
+        if len(texts) >= self.max_batch or self.max_wait <= 0:
+            return self._encode(texts)
+        future: Future = Future()
+        self._queue.put((texts, future))
+        self._ensure_worker()
+        return future.result()
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        vectors = encode_uncached(self.model, texts, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="embed-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            n_texts = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while n_texts < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                n_texts += len(request[0])
+            self._flush(batch)
+
+    def _flush(self, batch: List[Tuple[List[str], Future]]) -> None:
+        unique = list(dict.fromkeys(t for texts, _ in batch for t in texts))
+        self._batches += 1
+        self._texts += len(unique)
+        try:
+            vectors = self._encode(unique)
+        except Exception as exc:  # surface the failure to every waiting caller
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        position = {t: i for i, t in enumerate(unique)}
+        for texts, future in batch:
+            future.set_result(vectors[[position[t] for t in texts]])
+
+    def stats(self) -> Dict[str, float]:
+        """Coalesced model calls, unique texts they encoded and the mean batch size."""
+        return {
+            "batches": self._batches,
+            "texts": self._texts,
+            "mean_batch": self._texts / self._batches if self._batches else 0.0,
+        }
+
+    def warm_up(self) -> threading.Thread:
+        """
+        Load the model and run one encode on a daemon thread, so the first
+        query does not pay for it.
+
+        Returns:
+            threading.Thread: The started thread (``join`` it to wait).
+        """
+
+        def run() -> None:
+            start = time.perf_counter()
+            self._encode(["warm up"])
+            logger.info("embedding runtime ready in %.1fs", time.perf_counter() - start)
+
+        thread = threading.Thread(target=run, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+
+@functools.lru_cache(maxsize=None)
+def _runtime(model_name: str) -> EmbeddingRuntime:
+    return EmbeddingRuntime(
+        model_name,
+        backend=settings.embedding_backend,
+        onnx_file=settings.embedding_onnx_file,
+        threads=settings.embedding_threads,
+        max_batch=settings.embedding_batch_size,
+        max_wait=settings.embedding_batch_wait_ms / 1e3,
+    )
+
+
+def get_runtime(model_name: Optional[str] = None) -> EmbeddingRuntime:
+    """
+    Return the process-wide runtime for ``model_name`` (default
+    ``settings.embedding_model``).
+    """
+    return _runtime(model_name or settings.embedding_model)
+
+
+def share_with_superlinked() -> None:
+    """
+    Make Superlinked's sentence-transformers engine use the default runtime's
+    model instead of loading a (float16) copy of its own. Call it before the
+    text spaces are created: Superlinked keeps one engine per model and
+    process, built with the first space. The engine's encode calls already go
+    to the runtime through the embedding cache hook, so the vectors do not
+    change.
+    """
+    from superlinked.framework.common.space.embedding.model_based.engine import (
+        sentence_transformers_engine,
+    )
+
+    engine_type = sentence_transformers_engine.SentenceTransformersEngine
+    original = engine_type._initialize_model
+    if getattr(original, "_runtime_model_hook", False):
+        return
+
+    @functools.wraps(original)
+    def initialize(engine):
+        runtime = get_runtime()
+        if engine._model_name == engine._get_clean_model_name(runtime.model_name):
+            return runtime.model
+        return original(engine)
+
+    initialize._runtime_model_hook = True
+    engine_type._initialize_model = initialize
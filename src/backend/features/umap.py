@@ -1,60 +1,229 @@
-
 """
 Holds functions for creating and retrieving UMAP vectors
+
+umap-learn (numba), joblib and the plotting libraries are imported on first
+use, so importing this module stays cheap for processes that never plot.
 """
+
 from __future__ import annotations
-import matplotlib.pyplot as plt
-import seaborn as sns
-from adjustText import adjust_text
+import functools
+import io
+import logging
+from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Tuple
+import numpy as np
 import pandas as pd
-import umap
-from superlinked import framework as sl
-from ..config import settings  
+from ..config import settings
+from ..search.cache import ResultCache
 from ..search.types import SearchCtx
 
-def load_umap_df() -> pd.DataFrame:
+if TYPE_CHECKING:
+    import umap
+    from matplotlib.figure import Figure
+
+logger = logging.getLogger(__name__)
+
+DIMS = ["dimension_1", "dimension_2"]
+META_COLS = ["description", "food_category", "calories"]
+
+
+def _umap_file() -> Path:
+    return Path(__file__).resolve().parents[3] / settings.umap_path
+
+
+def load_umap_df(df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
     """
-    Returns a DataFrame with `umap_x`, `umap_y` + the original metadata.
+    Returns a DataFrame indexed by ``fdc_id`` with the two float32 UMAP
+    dimensions + the metadata columns of the food store.
+
+    Args:
+        df (pd.DataFrame, optional): The metadata store from ``load_data``;
+            loaded if not given. Pass the frame you already hold so its
+            columns are shared instead of read again.
     """
+    coords = pd.read_parquet(_umap_file())
+    if "fdc_id" in coords.columns:
+        coords = coords.set_index("fdc_id")
+    if df is None:
+        from ..ingest.loader import load_data
+
+        df = load_data()
+    return _with_metadata(coords, df)
 
-    repo_root = Path(__file__).resolve().parents[3]
-    umap_file = repo_root / settings.umap_path
-    df = pd.read_parquet(umap_file)
-    return df
 
-def create_umap_vectors(ctx: SearchCtx, df:pd.DataFrame):
-    
+def save_umap_df(umap_df: pd.DataFrame) -> None:
+    """
+    Write only ``fdc_id`` and the float32 coordinates; metadata comes from
+    the food store.
+    """
+    coords = umap_df[DIMS].astype(np.float32).rename_axis("fdc_id").reset_index()
+    coords.to_parquet(_umap_file(), index=False)
+
+
+@dataclass
+class UmapModel:
+    """
+    A fitted reducer plus the rows it has placed.
+
+    Attributes:
+        reducer: The fitted ``umap.UMAP``; projects ``VectorIndex.item_matrix`` rows.
+        hashes: Content hash per placed ``fdc_id``, to find changed rows on append.
+        categories: Category layout of the one-hot block the reducer was fitted on.
+    """
+
+    reducer: umap.UMAP
+    hashes: pd.Series
+    categories: tuple
+
+
+def _umap_model_file() -> Path:
+    return Path(__file__).resolve().parents[3] / settings.umap_model_path
+
+
+def load_umap_model() -> Optional[UmapModel]:
+    """Return the reducer persisted by ``save_umap_model``, or ``None``."""
+    model_file = _umap_model_file()
+    if not model_file.exists():
+        return None
+    import joblib
+
+    return joblib.load(model_file)
+
+
+def save_umap_model(model: UmapModel) -> None:
+    """Persist ``model`` next to the UMAP vectors (``settings.umap_model_path``)."""
+    import joblib
+
+    model_file = _umap_model_file()
+    model_file.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, model_file)
+
+
+def _with_metadata(coords: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Attach the ``META_COLS`` of ``df`` to ``coords`` (indexed by ``fdc_id``).
+
+    UMAP vectors are saved in ingest order, so the rows usually line up and
+    the columns are taken by position; otherwise the ids present in both
+    are matched once. Arrow / categorical columns keep their dtype.
+    """
+    ids = df["fdc_id"].to_numpy()
+    if np.array_equal(coords.index.to_numpy(), ids):
+        rows = np.arange(len(ids))
+    else:
+        pos = pd.Index(ids).get_indexer(coords.index)
+        coords, rows = coords[pos >= 0], pos[pos >= 0]
+    out = coords[DIMS].astype(np.float32)
+    for col in META_COLS:
+        out[col] = df[col].array.take(rows)
+    return out
+
+
+def fit_umap(
+    ctx: SearchCtx, df: pd.DataFrame, n_jobs: Optional[int] = None
+) -> Tuple[UmapModel, pd.DataFrame]:
+    """
+    Fit UMAP over every indexed row in a single ``fit_transform`` pass.
+
+    The reducer is fitted on ``ctx.vectors.item_matrix()`` (all spaces at
+    equal weight) so rows added later, and query vectors, can be projected
+    into the same layout without refitting.
+
+    Args:
+        ctx (SearchCtx): Search context with the ingested vector index.
+        df (pd.DataFrame): Food data providing the metadata columns.
+        n_jobs (int, optional): UMAP worker threads, defaults to
+            ``settings.umap_n_jobs``.
+            With more than one job the layout is no longer seeded, as UMAP
+            only runs single-threaded when ``random_state`` is set.
+
+    Returns:
+        Tuple[UmapModel, pd.DataFrame]: The fitted model and the UMAP
+        coordinates joined with the food metadata.
+    """
+    import umap
+
+    n_jobs = n_jobs or settings.umap_n_jobs
+    seed = {"random_state": 0} if n_jobs == 1 else {}
+    reducer = umap.UMAP(transform_seed=0, n_jobs=n_jobs, metric="cosine", **seed)
+
+    vi = ctx.vectors
+    umap_vectors = reducer.fit_transform(vi.item_matrix())
+    coords = pd.DataFrame(umap_vectors.astype(np.float32), columns=DIMS, index=vi.ids)
+    model = UmapModel(
+        reducer=reducer,
+        hashes=pd.Series(vi.hashes, index=vi.ids),
+        categories=vi.categories,
+    )
+    return model, _with_metadata(coords, df)
+
+
+def append_umap(
+    ctx: SearchCtx,
+    df: pd.DataFrame,
+    umap_df: pd.DataFrame,
+    model: UmapModel,
+) -> Tuple[UmapModel, pd.DataFrame]:
+    """
+    Bring ``umap_df`` up to date with the index without refitting.
+
+    Only new ids and rows whose content hash changed are ``transform``ed
+    into the existing layout; ids no longer in the index are dropped. If the
+    category set changed, the item vectors no longer match the reducer and
+    this falls back to ``fit_umap``.
+
+    Args:
+        ctx (SearchCtx): Search context with the ingested vector index.
+        df (pd.DataFrame): Food data providing the metadata columns.
+        umap_df (pd.DataFrame): Previously saved UMAP vectors.
+        model (UmapModel): The model that produced ``umap_df``.
+
+    Returns:
+        Tuple[UmapModel, pd.DataFrame]: The model with updated row hashes and
+        the refreshed UMAP vectors.
+    """
+    vi = ctx.vectors
+    if model.categories != vi.categories:
+        logger.info("UMAP append: category set changed, refitting")
+        return fit_umap(ctx, df)
+    pos = model.hashes.index.get_indexer(vi.ids)
+    old_hashes = (
+        model.hashes.to_numpy()[np.maximum(pos, 0)] if len(model.hashes) else vi.hashes
+    )
+    placed = (pos >= 0) & np.isin(vi.ids, umap_df.index.to_numpy())
+    fresh = placed & (old_hashes == vi.hashes)
+    stale = np.nonzero(~fresh)[0]
+
+    coords = umap_df.loc[vi.ids[fresh], DIMS]
+    if len(stale):
+        projected = model.reducer.transform(vi.item_matrix(stale)).astype(np.float32)
+        new = pd.DataFrame(projected, columns=DIMS, index=vi.ids[stale])
+        # back to ingest order, so the metadata joins by position
+        coords = pd.concat([coords, new]).loc[vi.ids]
+    dropped = int((~umap_df.index.isin(vi.ids)).sum())
+    logger.info("UMAP append: %d rows projected, %d dropped", len(stale), dropped)
+    model = UmapModel(
+        reducer=model.reducer,
+        hashes=pd.Series(vi.hashes, index=vi.ids),
+        categories=vi.categories,
+    )
+    return model, _with_metadata(coords, df)
+
+
+def create_umap_vectors(ctx: SearchCtx, df: pd.DataFrame) -> pd.DataFrame:
     """
     Create a DataFrame with UMAP transformed vectors and food metadata
-    
+
     Args:
-        app: Superlinked app instance
-        index: Index name
-        food_item: Food item name
-        results_df: DataFrame containing search results
-        n_results: Number of top results to include
-        
+        ctx (SearchCtx): Search context with the ingested vector index.
+        df (pd.DataFrame): Food data providing the metadata columns.
+
     Returns:
         DataFrame containing UMAP coordinates and food metadata
     """
-    # Collect all vectors from the app
- 
-    vs = sl.VectorSampler(app=ctx.app)
-    vector_collection = vs.get_all_vectors(ctx.index, ctx.food_item)
-    vectors = vector_collection.vectors
-    vector_df = pd.DataFrame(vectors, index=[int(id_) for id_ in vector_collection.id_list])
-    
-    # Transform vectors using UMAP
-    umap_transform = umap.UMAP(random_state=0, transform_seed=0, n_jobs=1, metric="cosine")
-    umap_transform = umap_transform.fit(vector_df)
-    umap_vectors = umap_transform.transform(vector_df)
-    umap_df = pd.DataFrame(umap_vectors, columns=["dimension_1", "dimension_2"], index=vector_df.index)
-    
-    #add the metadata to the umap_df
-    umap_df = umap_df.join(df.set_index('fdc_id')[['description', 'food_category', 'calories']], how='inner')
-
-    return umap_df
+    return fit_umap(ctx, df)[1]
+
 
 def subset_top_n_umap(
     umap_df: pd.DataFrame,
@@ -64,10 +233,13 @@ def subset_top_n_umap(
 ) -> pd.DataFrame:
     """
     Filter the cached UMAP DataFrame down to the top-N result IDs.
+    IDs missing from the cache (ingested after the last ``build_umap`` run)
+    are skipped.
 
     Args:
         umap_df (pd.DataFrame): DataFrame containing UMAP coordinates and metadata.
-        results_df (pd.DataFrame): DataFrame containing search results with similarity scores.
+        results_df (pd.DataFrame): DataFrame containing search results with
+            similarity scores.
         top_n (int, optional): Number of top results to include. Defaults to 10.
         id_col (str, optional): Column name for IDs in results_df. Defaults to "id".
 
@@ -80,52 +252,355 @@ def subset_top_n_umap(
         .astype(int)
         .tolist()
     )
-    return umap_df.loc[top_ids]
+    return umap_df.loc[[i for i in top_ids if i in umap_df.index]]
+
 
+# ───────────────────────── request-time projection ─────────────────────
+@functools.lru_cache(maxsize=1)
+def _cached_umap_model(mtime_ns: int) -> Optional[UmapModel]:
+    model = load_umap_model()
+    if model is not None:
+        # the first transform JIT-compiles UMAP's numba kernels; pay it here
+        model.reducer.transform(model.reducer._raw_data[:1])
+    return model
 
-def plot_umap_scatter(umap_df: pd.DataFrame) -> plt.Figure:
+
+def get_umap_model() -> Optional[UmapModel]:
+    """
+    Return the persisted UMAP model, loaded and warmed up once per file
+    version, or ``None`` if ``build_umap`` has not saved one yet.
+    """
+    model_file = _umap_model_file()
+    if not model_file.exists():
+        return None
+    return _cached_umap_model(model_file.stat().st_mtime_ns)
+
+
+def project_top_n_umap(
+    ctx: SearchCtx,
+    umap_df: pd.DataFrame,
+    results_df: pd.DataFrame,
+    model: Optional[UmapModel],
+    top_n: int = 10,
+    id_col: str = "id",
+) -> pd.DataFrame:
+    """
+    Like ``subset_top_n_umap``, but result ids missing from ``umap_df`` are
+    projected with ``model`` instead of skipped.
+
+    At most ``settings.umap_max_projected`` rows are transformed per call,
+    which bounds the added latency.
+
+    Args:
+        ctx (SearchCtx): Search context with the ingested vector index.
+        umap_df (pd.DataFrame): DataFrame containing UMAP coordinates and metadata.
+        results_df (pd.DataFrame): DataFrame containing search results with
+            similarity scores.
+        model (UmapModel, optional): Model from ``get_umap_model``; ``None``
+            skips missing ids.
+        top_n (int, optional): Number of top results to include. Defaults to 10.
+        id_col (str, optional): Column name for IDs in results_df. Defaults to "id".
+
+    Returns:
+        pd.DataFrame: UMAP coordinates and metadata of the top-N results, best first.
+    """
+    top_ids = (
+        results_df.nlargest(top_n, "similarity_score")[id_col].astype(int).tolist()
+    )
+    missing = [i for i in top_ids if i not in umap_df.index][
+        : settings.umap_max_projected
+    ]
+    if model is None or not missing or ctx.vectors is None:
+        return subset_top_n_umap(umap_df, results_df, top_n=top_n, id_col=id_col)
+
+    vi = ctx.vectors
+    positions = pd.Index(vi.ids).get_indexer(missing)
+    positions = positions[positions >= 0]
+    projected = model.reducer.transform(vi.item_matrix(positions))
+    extra = vi.rows(positions, np.zeros(len(positions), dtype=np.float32))
+    extra = extra.assign(
+        dimension_1=projected[:, 0].astype(np.float32),
+        dimension_2=projected[:, 1].astype(np.float32),
+    )
+    extra.index = vi.ids[positions]
+    # only the result rows are concatenated, not the whole cached frame
+    present = umap_df.loc[[i for i in top_ids if i in umap_df.index]]
+    combined = pd.concat([present, extra[umap_df.columns]])
+    return combined.loc[[i for i in top_ids if i in combined.index]]
+
+
+def project_query(
+    model: UmapModel, query_vector: np.ndarray, label: str
+) -> pd.DataFrame:
+    """
+    Project one query into the UMAP layout.
+
+    The layout was fitted on unweighted item rows (every space at weight 1),
+    so ``query_vector`` should be built the same way, e.g.
+    ``search_vectors(ctx, [inputs], CategoryWeights(1.0, 1.0))``. A vector
+    built with the search weights, which may be negative or zero, lies off
+    that manifold and lands somewhere meaningless. The point therefore shows
+    where the query texts sit, independent of the weight sliders.
+
+    Args:
+        model (UmapModel): Model from ``get_umap_model``.
+        query_vector (np.ndarray): Unweighted ``search_vectors`` row(s) of the
+            query, ``(1, D)``.
+        label (str): Text shown for the point.
+
+    Returns:
+        pd.DataFrame: One row with ``dimension_1``, ``dimension_2`` and ``description``.
+    """
+    point = model.reducer.transform(np.atleast_2d(query_vector))
+    return pd.DataFrame(
+        {"dimension_1": point[:, 0], "dimension_2": point[:, 1], "description": [label]}
+    )
+
+
+# ───────────────────────── rendering ───────────────────────────────────
+def umap_chart_data(
+    umap_df: pd.DataFrame,
+    query: Optional[pd.DataFrame] = None,
+    top_n: int = 10,
+) -> pd.DataFrame:
+    """
+    Plain coordinates and labels for a client-side scatter chart.
+
+    Args:
+        umap_df (pd.DataFrame): DataFrame containing UMAP coordinates and food metadata.
+        query (pd.DataFrame, optional): ``project_query`` output.
+        top_n (int, optional): Rows of ``umap_df`` to include. Defaults to 10.
+
+    Returns:
+        pd.DataFrame: Columns ``x``, ``y``, ``label``, ``food_category`` and
+        ``kind`` (``"result"`` or ``"query"``), one row per point.
+    """
+    top = umap_df.head(top_n)
+    points = pd.DataFrame(
+        {
+            "x": top["dimension_1"].to_numpy(),
+            "y": top["dimension_2"].to_numpy(),
+            "label": top["description"].to_numpy(),
+            "food_category": top["food_category"].to_numpy(),
+            "kind": "result",
+        }
+    )
+    if query is not None:
+        points = pd.concat(
+            [
+                points,
+                pd.DataFrame(
+                    {
+                        "x": query["dimension_1"].to_numpy(),
+                        "y": query["dimension_2"].to_numpy(),
+                        "label": query["description"].to_numpy(),
+                        "food_category": "your query",
+                        "kind": "query",
+                    }
+                ),
+            ],
+            ignore_index=True,
+        )
+    return points
+
+
+def umap_chart_spec(points: pd.DataFrame) -> dict:
+    """
+    Vega-Lite spec drawing ``umap_chart_data`` points with their labels
+    (e.g. for ``st.vega_lite_chart``); labels are offset, not relaxed.
+    """
+    encoding = {
+        "x": {
+            "field": "x",
+            "type": "quantitative",
+            "title": "Dimension 1",
+            "scale": {"zero": False},
+        },
+        "y": {
+            "field": "y",
+            "type": "quantitative",
+            "title": "Dimension 2",
+            "scale": {"zero": False},
+        },
+        "tooltip": [{"field": "label"}, {"field": "food_category"}],
+    }
+    return {
+        "data": {"values": points.to_dict(orient="records")},
+        "encoding": encoding,
+        "layer": [
+            {
+                "mark": {"type": "point", "filled": True, "size": 100},
+                "encoding": {
+                    "color": {
+                        "field": "food_category",
+                        "type": "nominal",
+                        "title": "Food Category",
+                    },
+                    "shape": {
+                        "field": "kind",
+                        "type": "nominal",
+                        "legend": None,
+                        "scale": {
+                            "domain": ["result", "query"],
+                            "range": ["circle", "diamond"],
+                        },
+                    },
+                },
+            },
+            {
+                "mark": {"type": "text", "align": "left", "dx": 8, "fontSize": 10},
+                "encoding": {"text": {"field": "label"}},
+            },
+        ],
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _umap_images() -> ResultCache:
+    return ResultCache(settings.umap_image_cache_size)
+
+
+def clear_umap_images() -> None:
+    """Drop every cached PNG; call it wherever the UMAP frame is reloaded."""
+    _umap_images().clear()
+
+
+def umap_png(
+    umap_df: pd.DataFrame, query: Optional[pd.DataFrame] = None, top_n: int = 10
+) -> bytes:
+    """
+    Render the scatter to a PNG without pyplot or label relaxation.
+
+    Images are cached by the plotted points (coordinates, labels and
+    categories, including the query point), so repeating a search or changing
+    only settings that keep the same top-N is free, while a rebuilt layout or
+    synced metadata renders afresh.
+
+    Args:
+        umap_df (pd.DataFrame): DataFrame containing UMAP coordinates and food metadata.
+        query (pd.DataFrame, optional): ``project_query`` output, drawn as a star.
+        top_n (int, optional): Rows of ``umap_df`` to include. Defaults to 10.
+
+    Returns:
+        bytes: The encoded PNG.
+    """
+    points = umap_chart_data(umap_df, query, top_n)
+    key = tuple(points.itertuples(index=False))
+    images = _umap_images()
+    cached = images.get(key)
+    if cached is not None:
+        return cached
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    results = points[points.kind == "result"]
+    codes, labels = pd.factorize(results["food_category"])
+    scatter = ax.scatter(results["x"], results["y"], c=codes, cmap="viridis", s=100)
+    ax.legend(
+        scatter.legend_elements()[0],
+        labels,
+        title="Food Category",
+        bbox_to_anchor=(1.05, 1),
+        loc="upper left",
+    )
+    asked = points[points.kind == "query"]
+    ax.scatter(asked["x"], asked["y"], marker="*", s=400, c="red")
+    for row in points.itertuples(index=False):
+        ax.annotate(
+            row.label,
+            (row.x, row.y),
+            xytext=(6, 0),
+            textcoords="offset points",
+            fontsize=9,
+            fontweight="bold" if row.kind == "query" else "normal",
+        )
+    ax.set_title("UMAP Transformed Vectors of top 10 food items of search results")
+    ax.set_xlabel("Dimension 1")
+    ax.set_ylabel("Dimension 2")
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=100)
+    png = buffer.getvalue()
+    if images.enabled:
+        images.put(key, png)
+    return png
+
+
+def plot_umap_scatter(
+    umap_df: pd.DataFrame, query: Optional[pd.DataFrame] = None
+) -> Figure:
     """
     Plots a UMAP scatter plot for the top 10 food items based on search results.
 
+    This is the slow, seaborn + ``adjustText`` path (labels are relaxed to
+    avoid overlap). It draws on its own figure, which the caller must close
+    with ``plt.close(fig)`` once rendered.
+
     Args:
         umap_df (pd.DataFrame): DataFrame containing UMAP coordinates and food metadata.
-            Expected columns: ['dimension_1', 'dimension_2', 'food_category', 'description']
+            Expected columns: ['dimension_1', 'dimension_2', 'food_category',
+            'description']
+        query (pd.DataFrame, optional): ``project_query`` output, drawn as a star.
 
     Returns:
-        plt.Figure: The matplotlib figure object containing the scatter plot.
+        Figure: The matplotlib figure object containing the scatter plot.
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from adjustText import adjust_text
+
     # Create the figure
-    plt.figure(figsize=(12, 8))
+    fig, ax = plt.subplots(figsize=(12, 8))
     sns.scatterplot(
-        x='dimension_1', 
-        y='dimension_2', 
-        hue='food_category', 
-        data=umap_df.head(10), 
+        x="dimension_1",
+        y="dimension_2",
+        hue="food_category",
+        data=umap_df.head(10),
         s=100,  # Size of the dots
-        palette='viridis'
+        palette="viridis",
+        ax=ax,
     )
 
     # Collect text objects for adjustment
     texts = []
     for i, row in umap_df.head(10).iterrows():
-        text = plt.text(row['dimension_1'] + 0.1, row['dimension_2'], row['description'], fontsize=9)
+        text = ax.text(
+            row["dimension_1"] + 0.1, row["dimension_2"], row["description"], fontsize=9
+        )
         texts.append(text)
 
-    # Adjust text to avoid overlap
-    adjust_text(texts, arrowprops=dict(arrowstyle='->', color='gray', lw=0.5))
-
-    plt.title('UMAP Transformed Vectors of top 10 food items of search results')
-    plt.xlabel('Dimension 1')
-    plt.ylabel('Dimension 2')
-    plt.legend(title='Food Category', bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.tight_layout()
-    
-    return plt
-
-
-
-
-   
+    if query is not None:
+        ax.scatter(
+            query["dimension_1"],
+            query["dimension_2"],
+            marker="*",
+            s=400,
+            c="red",
+            label="your query",
+        )
+        for _, row in query.iterrows():
+            texts.append(
+                ax.text(
+                    row["dimension_1"] + 0.1,
+                    row["dimension_2"],
+                    row["description"],
+                    fontsize=10,
+                    fontweight="bold",
+                )
+            )
 
+    # Adjust text to avoid overlap
+    adjust_text(texts, ax=ax, arrowprops=dict(arrowstyle="->", color="gray", lw=0.5))
 
+    ax.set_title("UMAP Transformed Vectors of top 10 food items of search results")
+    ax.set_xlabel("Dimension 1")
+    ax.set_ylabel("Dimension 2")
+    ax.legend(title="Food Category", bbox_to_anchor=(1.05, 1), loc="upper left")
+    fig.tight_layout()
 
+    return fig
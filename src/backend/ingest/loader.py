@@ -2,31 +2,313 @@
 Load the food database and build the Superlinked app.
 """
 
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from superlinked import framework as sl
 from ..config import settings
+from ..embedding.cache import EmbeddingCache, cache_file, get_embedding_cache
+from ..embedding.encoder import encode_texts
+from ..embedding.runtime import get_runtime, share_with_superlinked
+from ..metrics import registry, span
 from .schema import FoodItem
+from .snapshot import (
+    RECORD_COLS,
+    TEXT_FIELDS,
+    Snapshot,
+    SnapshotWriter,
+    compute_fingerprint,
+    load_snapshot,
+    row_hashes,
+)
+from .store import map_quantized, write_metadata
+from ..search.cache import get_search_results
+from ..search.queries import compile_queries
+from ..search.ann import load_or_build_ann
+from ..search.vectors import build_vector_index
 from ..search.types import SearchCtx
 
+logger = logging.getLogger(__name__)
+
 # ---- Load Data ----
 
+
+def _data_file() -> Path:
+    repo_root = Path(__file__).resolve().parents[3]
+    return repo_root / settings.data_path
+
+
+def _compact_frame(table) -> pd.DataFrame:
+    # strings stay in Arrow buffers; dictionary-encoded columns become categoricals
+    import pyarrow as pa
+
+    strings = {
+        pa.string(): pd.StringDtype("pyarrow"),
+        pa.large_string(): pd.StringDtype("pyarrow"),
+    }
+    return table.to_pandas(types_mapper=strings.get)
+
+
 def load_data():
     """
-    Load the food database from a Parquet file.
+    Load the food metadata store: one row per ``fdc_id`` with only the
+    ingested columns (``RECORD_COLS``).
+
+    ``food_category`` is read dictionary-encoded into a categorical and the
+    description as Arrow-backed strings, so the frame holds no per-row
+    Python objects. The search index, the UMAP vectors (joined by position,
+    see ``load_umap_df``) and the UI share this one frame.
 
     Returns:
         pd.DataFrame: A DataFrame containing the food database.
     """
+    import pyarrow.parquet as pq
 
-    repo_root = Path(__file__).resolve().parents[3]
-    data_file = repo_root / settings.data_path
-    df = pd.read_parquet(data_file)
-    return df
+    table = pq.read_table(
+        _data_file(), columns=RECORD_COLS, read_dictionary=["food_category"]
+    )
+    return _compact_frame(table)
+
+
+def data_version() -> int:
+    """Modification time (ns) of the data file, to detect when it needs a sync."""
+    return _data_file().stat().st_mtime_ns
+
+
+def iter_data_batches(batch_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream the ingest columns of the food database, one row-group chunk at a time.
+
+    Args:
+        batch_size (int, optional): Maximum rows per chunk.
+                                    Defaults to ``settings.ingest_batch_size``.
+
+    Yields:
+        pd.DataFrame: Consecutive chunks with the columns in ``RECORD_COLS``.
+    """
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(_data_file(), read_dictionary=["food_category"])
+    for batch in parquet.iter_batches(
+        batch_size=batch_size or settings.ingest_batch_size, columns=RECORD_COLS
+    ):
+        yield _compact_frame(batch)
+
+
+def _frame_batches(df: pd.DataFrame, batch_size: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), batch_size):
+        yield df.iloc[start : start + batch_size]
+
+
+# ---- Ingest ----
 
 
+@dataclass(frozen=True)
+class IngestStats:
+    """
+    Throughput of one ingest run.
 
-def build_superlinked_app(df):
+    Attributes:
+        rows: Number of rows pushed into the source.
+        seconds: Wall-clock time spent embedding and ingesting.
+        restored: Whether the embeddings came from the snapshot.
+    """
+
+    rows: int
+    seconds: float
+    restored: bool
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+
+def _categories(batch: pd.DataFrame) -> List[str]:
+    """Categories of ``batch`` by first appearance, the order the spaces use."""
+    return batch["food_category"].unique().tolist()
+
+
+def _scan(batches: Iterable[pd.DataFrame]):
+    """Collect the category list, row hashes and row count in one pass."""
+    categories: Dict[str, None] = {}
+    hashes: List[np.ndarray] = []
+    n_rows = 0
+    for batch in batches:
+        categories.update(dict.fromkeys(_categories(batch)))
+        hashes.append(row_hashes(batch))
+        n_rows += len(batch)
+    return list(categories), hashes, n_rows
+
+
+def _encode_batched(
+    cache: EmbeddingCache, texts: List[str], pool: ThreadPoolExecutor
+) -> np.ndarray:
+    """
+    Embed ``texts`` through the cache, spreading the unique uncached ones over
+    ``pool`` in chunks of ``settings.embedding_batch_size``.
+    """
+    size = settings.embedding_batch_size
+    encode = functools.partial(encode_texts, cached=False)
+
+    def encode_missing(missing: List[str]) -> np.ndarray:
+        chunks = [missing[i : i + size] for i in range(0, len(missing), size)]
+        return np.concatenate(list(pool.map(encode, chunks)))
+
+    return cache.get_or_encode(texts, encode_missing)
+
+
+class _Collected:
+    """
+    Ingested columns (and, without a snapshot, text vectors) copied batch by
+    batch into arrays preallocated for ``n_rows``, so no batch frame outlives
+    its iteration.
+    """
+
+    def __init__(self, n_rows: int, categories: List[str], keep_vectors: bool):
+        self.n_rows = n_rows
+        self.categories = pd.Index(categories)
+        self.ids = np.empty(n_rows, dtype=np.int64)
+        self.cat_codes = np.empty(n_rows, dtype=np.int32)
+        self.calories = np.empty(n_rows, dtype=np.float32)
+        self.descriptions = np.empty(n_rows, dtype=object)
+        self.vectors: Optional[Dict[str, np.ndarray]] = {} if keep_vectors else None
+
+    def add(
+        self, offset: int, batch: pd.DataFrame, vectors: Dict[str, np.ndarray]
+    ) -> None:
+        end = offset + len(batch)
+        self.ids[offset:end] = batch["fdc_id"].to_numpy()
+        self.cat_codes[offset:end] = self.categories.get_indexer(batch["food_category"])
+        self.calories[offset:end] = batch["calories"].to_numpy(dtype=np.float32)
+        self.descriptions[offset:end] = batch["description"].to_numpy(dtype=object)
+        if self.vectors is not None:
+            for field in TEXT_FIELDS:
+                if field not in self.vectors:
+                    dim = np.shape(vectors[field])[1]
+                    self.vectors[field] = np.empty((self.n_rows, dim), dtype=np.float32)
+                self.vectors[field][offset:end] = vectors[field]
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """The ingested columns, in the layout ``_vector_index`` reads."""
+        return {
+            "fdc_id": self.ids,
+            "description": self.descriptions,
+            "food_category": pd.Categorical.from_codes(
+                self.cat_codes, categories=self.categories
+            ),
+            "calories": self.calories,
+        }
+
+    def matrix(self, field: str) -> np.ndarray:
+        return self.vectors.get(field, np.empty((0, 0), np.float32))
+
+
+def _ingest(
+    source,
+    batches: Iterable[pd.DataFrame],
+    snapshot: Optional[Snapshot],
+    writer: Optional[SnapshotWriter],
+    collected: _Collected,
+) -> IngestStats:
+    """
+    Push ``batches`` into ``source``, embedding each batch's text fields first.
+
+    The text vectors are either sliced from ``snapshot`` or computed on a pool
+    of ``settings.ingest_workers`` threads. In both cases they land in the
+    embedding cache shared by ``desc_space`` and ``cat_text``, so each unique
+    string is encoded once and ``source.put`` never runs the model itself.
+    """
+    cache = get_embedding_cache()
+    before = cache.stats()
+    start = time.perf_counter()
+    offset = 0
+    with ThreadPoolExecutor(max_workers=settings.ingest_workers) as pool:
+        for batch in batches:
+            n = len(batch)
+            if snapshot is not None:
+                vectors = {
+                    f: snapshot.vectors[f][offset : offset + n] for f in TEXT_FIELDS
+                }
+                for field in TEXT_FIELDS:
+                    cache.put_many(batch[field].tolist(), vectors[field])
+            else:
+                vectors = {
+                    f: _encode_batched(cache, batch[f].tolist(), pool)
+                    for f in TEXT_FIELDS
+                }
+            if writer is not None:
+                writer.write(offset, batch["fdc_id"].to_numpy(), vectors)
+            collected.add(offset, batch, vectors)
+            with span("ingest.put"):
+                source.put(batch.to_dict(orient="records"))
+            offset += n
+    stats = IngestStats(
+        rows=offset, seconds=time.perf_counter() - start, restored=snapshot is not None
+    )
+    logger.info(
+        "ingested %d rows in %.1fs (%.0f rows/s, %s)",
+        stats.rows,
+        stats.seconds,
+        stats.rows_per_sec,
+        "restored from snapshot" if stats.restored else "encoded",
+    )
+    delta = cache.stats() - before
+    logger.info(
+        "embedding cache: %d hits, %d misses (%.1f%% hit rate), %d entries",
+        delta.hits,
+        delta.misses,
+        100 * delta.hit_rate,
+        delta.size,
+    )
+    path = cache_file()
+    if path is not None and delta.misses:
+        cache.save(path)
+    return stats
+
+
+def _space_config(categories: List[str]) -> dict:
+    return {
+        "model": get_runtime().key,
+        "categories": categories,
+        "calories_min": settings.calories_min,
+        "calories_max": settings.calories_max,
+    }
+
+
+def _vector_index(
+    ingested,
+    text_vectors: Dict[str, np.ndarray],
+    categories: List[str],
+    hashes: List[np.ndarray],
+    precision: Optional[str] = None,
+):
+    # ``ingested``: a frame, or the column dict of ``_Collected.columns``
+    return build_vector_index(
+        ids=np.asarray(ingested["fdc_id"]),
+        desc=text_vectors["description"],
+        cat_text=text_vectors["food_category"],
+        food_categories=ingested["food_category"],
+        categories=categories,
+        calories=np.asarray(ingested["calories"]),
+        descriptions=np.asarray(ingested["description"], dtype=object),
+        calories_min=settings.calories_min,
+        calories_max=settings.calories_max,
+        hashes=np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64),
+        precision=precision,
+    )
+
+
+def build_superlinked_app(
+    df: Optional[pd.DataFrame] = None,
+    use_snapshot: Optional[bool] = None,
+    refresh_snapshot: bool = False,
+):
     """
     Constructs and returns a fully-ingested Superlinked SearchCtx object.
 
@@ -37,17 +319,40 @@ def build_superlinked_app(df):
     and returns a SearchCtx object containing the application context, index,
     and similarity spaces.
 
+    Rows are ingested in chunks of ``settings.ingest_batch_size``; when ``df``
+    is omitted they are streamed straight from the Parquet file instead of
+    being loaded up front. Text embeddings are restored from the snapshot in
+    ``settings.snapshot_dir`` when its fingerprint (ingested rows, embedding
+    model and space config) matches, otherwise they are encoded and the
+    snapshot is rewritten.
+
     Args:
-        df (pd.DataFrame): A DataFrame containing food data with columns
+        df (pd.DataFrame, optional): A DataFrame containing food data with columns
                            'fdc_id', 'description', 'food_category', and 'calories'.
+                           Defaults to streaming ``settings.data_path``.
+        use_snapshot (bool, optional): Read/write the embedding snapshot.
+                           Defaults to ``settings.use_snapshot``.
+        refresh_snapshot (bool): Ignore an existing snapshot and rewrite it.
 
     Returns:
         SearchCtx: An object containing the Superlinked application context,
                    index, and similarity spaces for further search operations.
     """
+    if use_snapshot is None:
+        use_snapshot = settings.use_snapshot
+
+    batch_size = settings.ingest_batch_size
+    if df is not None:
+        batches = functools.partial(_frame_batches, df[RECORD_COLS], batch_size)
+    else:
+        batches = functools.partial(iter_data_batches, batch_size)
+
+    categories, hashes, n_rows = _scan(batches())
+    fingerprint = compute_fingerprint(hashes, _space_config(categories))
+
     schema = FoodItem()
-    categories = df.food_category.unique().tolist()
 
+    share_with_superlinked()
     desc_space  = sl.TextSimilaritySpace(text=schema.description, model=settings.embedding_model)
     cat_text    = sl.TextSimilaritySpace(text=schema.food_category, model=settings.embedding_model)
     cat_cat     = sl.CategoricalSimilaritySpace(category_input=schema.food_category, categories=categories)
@@ -56,15 +361,51 @@ def build_superlinked_app(df):
                                  max_value=settings.calories_max,
                                  mode=sl.Mode.SIMILAR)
 
-    index = sl.Index([desc_space, cat_text, cat_cat, cal_space])
+    # fields: the hard filters of the query templates
+    index = sl.Index(
+        [desc_space, cat_text, cat_cat, cal_space],
+        fields=[schema.food_category, schema.calories],
+    )
     source = sl.InMemorySource(schema)
     executor = sl.InMemoryExecutor(sources=[source], indices=[index])
     app = executor.run()
 
-    records = df[["fdc_id", "description", "food_category", "calories"]].to_dict(orient="records")
-    source.put(records)
+    snapshot_dir = Path(__file__).resolve().parents[3] / settings.snapshot_dir
+    snapshot = None
+    if use_snapshot and not refresh_snapshot:
+        snapshot = load_snapshot(snapshot_dir, fingerprint)
+    writer = None
+    if use_snapshot and snapshot is None and n_rows:
+        writer = SnapshotWriter(snapshot_dir, n_rows)
+
+    collected = _Collected(
+        n_rows, categories, keep_vectors=snapshot is None and writer is None
+    )
+    with span("ingest"):
+        _ingest(source, batches(), snapshot, writer, collected)
+    if writer is not None:
+        snapshot = writer.finish(fingerprint)
+    get_search_results().clear()
+
+    text_vectors = (
+        snapshot.vectors
+        if snapshot is not None
+        else {f: collected.matrix(f) for f in TEXT_FIELDS}
+    )
+    stored = use_snapshot and snapshot is not None
+    # quantized blocks are written into the store and mapped back, not kept in memory
+    vectors = _vector_index(
+        collected.columns(),
+        text_vectors,
+        categories,
+        hashes,
+        precision="float32" if stored else None,
+    )
+    if stored:
+        write_metadata(vectors, fingerprint, snapshot_dir)
+        vectors = map_quantized(vectors, snapshot_dir)
 
-    return SearchCtx(
+    ctx = SearchCtx(
         app=app,
         index=index,
         food_item=schema,
@@ -72,5 +413,149 @@ def build_superlinked_app(df):
         cat_text_space=cat_text,
         cat_cat_space=cat_cat,
         cal_space=cal_space,
+        fingerprint=fingerprint,
+        vectors=vectors,
+        ann=load_or_build_ann(vectors, fingerprint),
+        source=source,
     )
+    return replace(ctx, queries=compile_queries(ctx))
+
+
+# ---- Incremental sync ----
+
 
+@dataclass(frozen=True)
+class SyncStats:
+    """
+    What ``sync_index`` changed.
+
+    Attributes:
+        added: ``fdc_id``s that were not ingested before.
+        updated: ``fdc_id``s whose row content changed.
+        deleted: ``fdc_id``s no longer present in the data.
+        rebuilt: Whether a full re-ingest was needed instead.
+    """
+
+    added: np.ndarray
+    updated: np.ndarray
+    deleted: np.ndarray
+    rebuilt: bool = False
+
+    def __bool__(self) -> bool:
+        return self.rebuilt or bool(
+            len(self.added) or len(self.updated) or len(self.deleted)
+        )
+
+
+def sync_index(
+    ctx: SearchCtx, df: Optional[pd.DataFrame] = None
+) -> Tuple[SearchCtx, SyncStats]:
+    """
+    Bring an ingested ``ctx`` in line with ``df`` without re-embedding everything.
+
+    Rows are diffed against the ingested ``fdc_id`` set and per-row content
+    hashes: only new or changed rows are embedded and upserted into the
+    Superlinked source, removed ids are tombstoned (the in-memory source has
+    no delete) and dropped from the NumPy index. The snapshot, ANN index and
+    fingerprint are refreshed and the result cache is cleared. The
+    fingerprint is computed as ``build_superlinked_app`` computes it, so a
+    later full build over the same data restores from this snapshot.
+
+    Data that introduces new categories changes the categorical space, and
+    every tombstone widens each Superlinked query, so both fall back to a full
+    ``build_superlinked_app``: on new categories before syncing, and once
+    more than ``settings.max_tombstones`` ids are tombstoned after writing the
+    snapshot (which the rebuild then restores instead of re-encoding).
+
+    Args:
+        ctx (SearchCtx): A context built by ``build_superlinked_app``.
+        df (pd.DataFrame, optional): The new data. Defaults to ``load_data()``.
+
+    Returns:
+        Tuple[SearchCtx, SyncStats]: The updated context and what changed.
+    """
+    vi = ctx.vectors
+    if vi is None or ctx.source is None:
+        raise ValueError("sync_index needs a SearchCtx built by build_superlinked_app")
+    diff_start = time.perf_counter()
+    rows = (load_data() if df is None else df)[RECORD_COLS].reset_index(drop=True)
+    hashes = row_hashes(rows)
+    new_ids = rows["fdc_id"].to_numpy(np.int64)
+
+    old_pos = pd.Series(np.arange(len(vi)), index=vi.ids).reindex(new_ids).to_numpy()
+    known = ~np.isnan(old_pos)
+    old_pos = np.where(known, old_pos, 0).astype(np.int64)
+    old_hashes = vi.hashes[old_pos] if len(vi) else np.zeros(len(rows), dtype=np.uint64)
+    unchanged = known & (old_hashes == hashes)
+    changed = ~unchanged
+    stats = SyncStats(
+        added=new_ids[~known],
+        updated=new_ids[known & changed],
+        deleted=np.setdiff1d(vi.ids, new_ids),
+    )
+    if not stats:
+        return ctx, stats
+
+    categories = _categories(rows)
+    if not set(categories) <= set(vi.categories):
+        logger.info("new food categories found, re-ingesting everything")
+        new_ctx = build_superlinked_app(rows)
+        return new_ctx, replace(stats, rebuilt=True)
+
+    start = time.perf_counter()
+    registry.observe("ingest.sync_diff", start - diff_start)
+    cache = get_embedding_cache()
+    delta = rows[changed]
+    text_vectors = {}
+    with ThreadPoolExecutor(max_workers=settings.ingest_workers) as pool:
+        for field, old in (("description", vi.desc), ("food_category", vi.cat_text)):
+            block = np.empty((len(rows), old.shape[1]), dtype=np.float32)
+            block[unchanged] = old[old_pos[unchanged]]
+            if len(delta):
+                block[changed] = _encode_batched(cache, delta[field].tolist(), pool)
+            text_vectors[field] = block
+    if len(delta):
+        ctx.source.put(delta.to_dict(orient="records"))
+
+    fingerprint = compute_fingerprint([hashes], _space_config(categories))
+    stored = settings.use_snapshot and len(rows) > 0
+    if stored:
+        snapshot_dir = Path(__file__).resolve().parents[3] / settings.snapshot_dir
+        writer = SnapshotWriter(snapshot_dir, len(rows))
+        writer.write(0, new_ids, text_vectors)
+        text_vectors = writer.finish(fingerprint).vectors
+    vectors = _vector_index(
+        rows,
+        text_vectors,
+        categories,
+        [hashes],
+        precision="float32" if stored else None,
+    )
+    if stored:
+        write_metadata(vectors, fingerprint, snapshot_dir)
+        vectors = map_quantized(vectors, snapshot_dir)
+    deleted_ids = (ctx.deleted_ids | frozenset(stats.deleted.tolist())) - frozenset(
+        new_ids.tolist()
+    )
+    get_search_results().clear()
+    registry.observe("ingest.sync", time.perf_counter() - start)
+    logger.info(
+        "synced %d added, %d updated, %d deleted rows in %.1fs",
+        len(stats.added),
+        len(stats.updated),
+        len(stats.deleted),
+        time.perf_counter() - start,
+    )
+    if len(deleted_ids) > settings.max_tombstones:
+        logger.info("%d tombstoned rows, re-ingesting to drop them", len(deleted_ids))
+        return build_superlinked_app(rows), replace(stats, rebuilt=True)
+    return (
+        replace(
+            ctx,
+            fingerprint=fingerprint,
+            vectors=vectors,
+            ann=load_or_build_ann(vectors, fingerprint),
+            deleted_ids=deleted_ids,
+        ),
+        stats,
+    )
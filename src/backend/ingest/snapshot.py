@@ -0,0 +1,200 @@
+"""
+On-disk snapshot of the text embeddings produced at ingest time.
+
+A snapshot directory holds one ``.npy`` file per array (row ids and one
+matrix per embedded text field, rows aligned with the ids) plus a
+``manifest.json`` carrying the fingerprint of the ingested rows, the
+embedding model and the space configuration. Arrays are memory-mapped on
+load, so restoring a snapshot costs page faults rather than model inference.
+
+The snapshot path is a symlink to a versioned sibling directory (see
+``publish_dir``), so a rewrite replaces it atomically.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+MANIFEST = "manifest.json"
+RECORD_COLS = ["fdc_id", "description", "food_category", "calories"]
+TEXT_FIELDS = ("description", "food_category")
+
+
+# ───────────────────────── fingerprint ─────────────────────────────────
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Return one uint64 content hash per row of the ingested columns.
+    """
+    return pd.util.hash_pandas_object(df[RECORD_COLS], index=False).to_numpy(np.uint64)
+
+
+def compute_fingerprint(hashes: Iterable[np.ndarray], config: dict) -> str:
+    """
+    Combine per-row hashes (in ingest order) and the space config into one digest.
+
+    Args:
+        hashes (Iterable[np.ndarray]): Chunks of ``row_hashes`` output.
+        config (dict): JSON-serialisable model and space configuration.
+
+    Returns:
+        str: A hex digest; any change to rows, order or config changes it.
+    """
+    h = hashlib.sha256(
+        json.dumps({"version": SNAPSHOT_VERSION, **config}, sort_keys=True).encode()
+    )
+    for chunk in hashes:
+        h.update(np.ascontiguousarray(chunk, dtype=np.uint64).tobytes())
+    return h.hexdigest()
+
+
+# ───────────────────────── read / write ────────────────────────────────
+def publish_dir(tmp: Path, directory: Path) -> None:
+    """
+    Atomically make the finished directory ``tmp`` visible at ``directory``.
+
+    ``tmp`` is renamed to a versioned sibling and ``directory`` becomes a
+    symlink to it, swapped in with one ``os.replace``: readers see the old or
+    the new tree, never a missing or half-written one. The previous version
+    is then removed; memory maps of its files stay valid.
+    """
+    directory = Path(directory)
+    version = directory.parent / f".{directory.name}.{uuid.uuid4().hex[:12]}"
+    Path(tmp).rename(version)
+    link = directory.parent / f".{directory.name}.link-{os.getpid()}"
+    if link.is_symlink():
+        link.unlink()
+    os.symlink(version.name, link)
+    previous = None
+    if directory.is_symlink():
+        previous = directory.resolve()
+    elif directory.exists():
+        # a plain directory from before versioning, moved aside once
+        previous = directory.parent / f".{directory.name}.old-{os.getpid()}"
+        directory.rename(previous)
+    os.replace(link, directory)
+    if previous is not None and previous != version:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Memory-mapped embeddings for every ingested row.
+
+    Attributes:
+        fingerprint: Fingerprint the snapshot was written for.
+        ids: ``fdc_id`` per row.
+        vectors: Text field name -> embedding matrix aligned with ``ids``.
+    """
+
+    fingerprint: str
+    ids: np.ndarray
+    vectors: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def load_snapshot(directory: Path, fingerprint: str) -> Optional[Snapshot]:
+    """
+    Memory-map the snapshot in ``directory`` if it matches ``fingerprint``.
+
+    Returns:
+        Optional[Snapshot]: ``None`` when the snapshot is missing, unreadable
+        or stale, in which case the caller should re-ingest and rewrite it.
+    """
+    directory = Path(directory).resolve()  # one version, even if republished meanwhile
+    manifest_file = directory / MANIFEST
+    if not manifest_file.exists():
+        return None
+    try:
+        manifest = json.loads(manifest_file.read_text())
+        if (
+            manifest.get("version") != SNAPSHOT_VERSION
+            or manifest.get("fingerprint") != fingerprint
+        ):
+            logger.info("embedding snapshot in %s is stale, rebuilding", directory)
+            return None
+        ids = np.load(directory / "ids.npy", mmap_mode="r")
+        vectors = {
+            field: np.load(directory / f"{field}.npy", mmap_mode="r")
+            for field in manifest["fields"]
+        }
+    except (OSError, ValueError, KeyError) as exc:
+        logger.warning(
+            "ignoring unreadable embedding snapshot in %s: %s", directory, exc
+        )
+        return None
+    if any(len(v) != len(ids) for v in vectors.values()):
+        logger.warning("ignoring inconsistent embedding snapshot in %s", directory)
+        return None
+    return Snapshot(fingerprint=fingerprint, ids=ids, vectors=vectors)
+
+
+class SnapshotWriter:
+    """
+    Writes a snapshot of ``n_rows`` rows, batch by batch, into memory-mapped files.
+
+    Files are written to a sibling temporary directory and published by
+    ``finish`` (``publish_dir``), so readers never observe a half-written or
+    missing snapshot and existing memory maps of the previous one stay valid.
+    """
+
+    def __init__(self, directory: Path, n_rows: int):
+        self.directory = Path(directory)
+        self.n_rows = n_rows
+        self._tmp = self.directory.parent / f".{self.directory.name}.tmp-{os.getpid()}"
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        self._tmp.mkdir(parents=True)
+        self._ids = self._open("ids", np.int64, ())
+        self._vectors: Dict[str, np.ndarray] = {}
+
+    def _open(self, name: str, dtype, row_shape: tuple) -> np.ndarray:
+        return np.lib.format.open_memmap(
+            self._tmp / f"{name}.npy",
+            mode="w+",
+            dtype=dtype,
+            shape=(self.n_rows, *row_shape),
+        )
+
+    def write(
+        self, offset: int, ids: np.ndarray, vectors: Dict[str, np.ndarray]
+    ) -> None:
+        """Write the rows ``offset:offset + len(ids)``."""
+        end = offset + len(ids)
+        self._ids[offset:end] = ids
+        for field, block in vectors.items():
+            if field not in self._vectors:
+                self._vectors[field] = self._open(field, np.float32, block.shape[1:])
+            self._vectors[field][offset:end] = block
+
+    def finish(self, fingerprint: str) -> Snapshot:
+        """Flush all arrays, write the manifest and publish the snapshot."""
+        for arr in (self._ids, *self._vectors.values()):
+            arr.flush()
+        manifest = {
+            "version": SNAPSHOT_VERSION,
+            "fingerprint": fingerprint,
+            "n_rows": self.n_rows,
+            "fields": sorted(self._vectors),
+        }
+        (self._tmp / MANIFEST).write_text(json.dumps(manifest, indent=2))
+        publish_dir(self._tmp, self.directory)
+        logger.info(
+            "wrote embedding snapshot for %d rows to %s", self.n_rows, self.directory
+        )
+        return Snapshot(
+            fingerprint=fingerprint, ids=self._ids, vectors=dict(self._vectors)
+        )
@@ -0,0 +1,298 @@
+"""
+Read-only, memory-mapped search store shared by worker processes.
+
+The store is the embedding snapshot (``.npy`` matrices) plus a
+``metadata.arrow`` file in the same directory holding, per row, the
+``fdc_id``, description, category code, calories and content hash, with the
+category names and calorie bounds in the schema metadata. The arrays derived
+from those columns (``cal_vec`` and the filter postings) and the quantized
+text blocks of ``settings.vector_precision`` are written next to it as
+``.npy`` files. All of it is mapped straight from the page cache, so any
+number of processes opening the store share one physical copy and no process
+re-ingests or recomputes anything; the float32 text vectors are only paged
+in for the rows a search rescores.
+
+A store-backed ``SearchCtx`` has no Superlinked app: every search is served
+from the NumPy ``VectorIndex`` (see ``backend.search.queries``).
+"""
+
+from __future__ import annotations
+import functools
+import json
+import logging
+import os
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+import pyarrow as pa
+from ..config import settings
+from ..search.ann import load_or_build_ann
+from ..search.filters import FilterIndex, build_filter_index
+from ..search.quantize import load_quantized, quantize, save_quantized
+from ..search.types import SearchCtx
+from ..search.vectors import VectorIndex, calorie_vectors, is_unit, unit_rows
+from .snapshot import load_snapshot
+
+logger = logging.getLogger(__name__)
+
+METADATA = "metadata.arrow"
+# arrays derived from the metadata columns, one ``<name>.npy`` each
+DERIVED = (
+    "cal_vec",
+    "category_offsets",
+    "category_rows",
+    "calorie_order",
+    "sorted_calories",
+)
+# snapshot field -> (float32 block, quantized block) of ``VectorIndex``
+TEXT_BLOCKS = {
+    "description": ("desc", "desc_q"),
+    "food_category": ("cat_text", "cat_text_q"),
+}
+
+
+def _store_dir(directory: Optional[Path]) -> Path:
+    if directory is not None:
+        return Path(directory)
+    return Path(__file__).resolve().parents[3] / settings.snapshot_dir
+
+
+def _metadata_fingerprint(path: Path) -> Optional[str]:
+    try:
+        with pa.memory_map(str(path)) as source:
+            meta = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    return meta.get(b"fingerprint", b"").decode() or None
+
+
+def _column(table: pa.Table, name: str) -> pa.Array:
+    """The single chunk of ``name``, so ``to_numpy`` stays a view of the map."""
+    chunks = table.column(name)
+    return chunks.chunk(0) if chunks.num_chunks == 1 else chunks.combine_chunks()
+
+
+def _save_array(path: Path, array: np.ndarray) -> None:
+    """Write ``array`` to ``path`` unless it exists, atomically for readers."""
+    if path.exists():
+        return
+    tmp = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(tmp, path)
+
+
+def _load_array(path: Path) -> Optional[np.ndarray]:
+    try:
+        return np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+
+def _derived_arrays(vi: VectorIndex) -> Dict[str, np.ndarray]:
+    """The arrays computed from the metadata columns, by file stem."""
+    rows = vi.filters.category_rows
+    return {
+        "cal_vec": vi.cal_vec,
+        # postings of category c:
+        # category_rows[category_offsets[c]:category_offsets[c + 1]]
+        "category_offsets": np.cumsum([0] + [len(r) for r in rows], dtype=np.int64),
+        "category_rows": np.concatenate(rows) if rows else np.empty(0, dtype=np.int64),
+        "calorie_order": vi.filters.calorie_order,
+        "sorted_calories": vi.filters.sorted_calories,
+    }
+
+
+def _map_derived(
+    directory: Path, n_rows: int, n_categories: int
+) -> Optional[Dict[str, np.ndarray]]:
+    """Memory-map the derived arrays, or ``None`` if any is missing or does not fit."""
+    arrays = {name: _load_array(directory / f"{name}.npy") for name in DERIVED}
+    if any(a is None for a in arrays.values()):
+        return None
+    per_row = ("cal_vec", "category_rows", "calorie_order", "sorted_calories")
+    if (
+        any(len(arrays[name]) != n_rows for name in per_row)
+        or len(arrays["category_offsets"]) != n_categories + 1
+    ):
+        return None
+    return arrays
+
+
+def write_metadata(
+    vi: VectorIndex, fingerprint: str, directory: Optional[Path] = None
+) -> None:
+    """
+    Write the row metadata, derived arrays and quantized text blocks of
+    ``vi`` next to its snapshot, skipping files already written for the same
+    ``fingerprint``.
+
+    Args:
+        vi (VectorIndex): The index whose text vectors the snapshot holds.
+        fingerprint (str): Fingerprint the snapshot was written for.
+        directory (Path, optional): Snapshot directory, defaults to
+            ``settings.snapshot_dir``.
+    """
+    directory = _store_dir(directory)
+    # a snapshot version directory only ever holds one fingerprint, so
+    # arrays already there belong to ``vi``
+    for name, array in _derived_arrays(vi).items():
+        _save_array(directory / f"{name}.npy", array)
+    for field, (block, _) in TEXT_BLOCKS.items():
+        save_quantized(getattr(vi, block), settings.vector_precision, directory / field)
+    path = directory / METADATA
+    if _metadata_fingerprint(path) == fingerprint:
+        return
+    snapshot = load_snapshot(directory, fingerprint)
+    # lets open_store use the snapshot vectors as they are, without a norm pass
+    unit_norm = snapshot is not None and all(
+        is_unit(snapshot.vectors[f]) for f in TEXT_BLOCKS
+    )
+    table = pa.table(
+        {
+            "fdc_id": pa.array(vi.ids, type=pa.int64()),
+            "description": pa.array(vi.descriptions, type=pa.large_string()),
+            "cat_code": pa.array(vi.cat_codes, type=pa.int32()),
+            "calories": pa.array(vi.calories, type=pa.float32()),
+            "hash": pa.array(vi.hashes, type=pa.uint64()),
+        },
+        metadata={
+            "fingerprint": fingerprint,
+            "categories": json.dumps(list(vi.categories)),
+            "calories_min": str(vi.calories_min),
+            "calories_max": str(vi.calories_max),
+            "unit_norm": json.dumps(unit_norm),
+        },
+    )
+    tmp = path.with_name(f".{METADATA}.tmp-{os.getpid()}")
+    # uncompressed, single record batch: columns map zero-copy
+    with (
+        pa.OSFile(str(tmp), "wb") as sink,
+        pa.ipc.new_file(sink, table.schema) as writer,
+    ):
+        writer.write_table(table.combine_chunks(), max_chunksize=max(len(table), 1))
+    os.replace(tmp, path)
+
+
+def map_quantized(vi: VectorIndex, directory: Optional[Path] = None) -> VectorIndex:
+    """
+    Return ``vi`` with its quantized text blocks memory-mapped from the store
+    written by ``write_metadata``, or unchanged if the store has none for
+    ``settings.vector_precision``.
+    """
+    directory = _store_dir(directory)
+    blocks = {
+        q: load_quantized(directory / field, settings.vector_precision)
+        for field, (_, q) in TEXT_BLOCKS.items()
+    }
+    if any(b is None or len(b) != len(vi) for b in blocks.values()):
+        return vi
+    return replace(vi, **blocks)
+
+
+def open_store(
+    directory: Optional[Path] = None, ann_backend: Optional[str] = None
+) -> Optional[SearchCtx]:
+    """
+    Open the shared store as a Superlinked-free ``SearchCtx``.
+
+    Args:
+        directory (Path, optional): Snapshot directory, defaults to
+            ``settings.snapshot_dir``.
+        ann_backend (str, optional): Candidate generator, defaults to
+            ``settings.ann_backend`` (``"none"`` means ``"exact"`` here).
+
+    Returns:
+        Optional[SearchCtx]: ``None`` if the store is missing or its snapshot
+        and metadata do not belong together; run ``build_superlinked_app``
+        once to (re)write it.
+    """
+    directory = _store_dir(directory)
+    path = directory / METADATA
+    fingerprint = _metadata_fingerprint(path)
+    snapshot = load_snapshot(directory, fingerprint) if fingerprint else None
+    if snapshot is None:
+        logger.warning("no usable search store in %s", directory)
+        return None
+
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    meta = table.schema.metadata
+    column = functools.partial(_column, table)
+    ids = column("fdc_id").to_numpy()
+    if len(ids) != len(snapshot) or not np.array_equal(ids, snapshot.ids):
+        logger.warning("search store in %s has mismatched rows", directory)
+        return None
+
+    categories = tuple(json.loads(meta[b"categories"]))
+    cat_codes = column("cat_code").to_numpy()
+    calories = column("calories").to_numpy()
+    calories_min, calories_max = float(meta[b"calories_min"]), float(
+        meta[b"calories_max"]
+    )
+    unit_norm = json.loads(meta.get(b"unit_norm", b"false"))
+    desc, cat_text = (
+        snapshot.vectors[f] if unit_norm else unit_rows(snapshot.vectors[f])
+        for f in TEXT_BLOCKS
+    )
+    derived = _map_derived(directory, len(ids), len(categories))
+    if derived is None:
+        logger.warning(
+            "search store in %s lacks derived arrays, computing them in this process",
+            directory,
+        )
+        cal_vec = calorie_vectors(calories, calories_min, calories_max)
+        filters = build_filter_index(cat_codes, len(categories), calories)
+    else:
+        cal_vec = derived["cal_vec"]
+        offsets, rows = derived["category_offsets"], derived["category_rows"]
+        filters = FilterIndex(
+            category_rows=tuple(
+                rows[offsets[c] : offsets[c + 1]] for c in range(len(categories))
+            ),
+            calorie_order=derived["calorie_order"],
+            sorted_calories=derived["sorted_calories"],
+            cat_codes=cat_codes,
+            calories=calories,
+        )
+    vi = VectorIndex(
+        ids=ids,
+        desc=desc,
+        cat_text=cat_text,
+        categories=categories,
+        cat_codes=cat_codes,
+        calories=calories,
+        cal_vec=cal_vec,
+        descriptions=column("description"),
+        calories_min=calories_min,
+        calories_max=calories_max,
+        filters=filters,
+        hashes=column("hash").to_numpy(),
+    )
+    vi = map_quantized(vi, directory)
+    if not vi.quantized and settings.vector_precision != "float32":
+        logger.warning(
+            "search store in %s lacks %s blocks, quantizing them in this process",
+            directory,
+            settings.vector_precision,
+        )
+        vi = replace(
+            vi,
+            desc_q=quantize(desc, settings.vector_precision),
+            cat_text_q=quantize(cat_text, settings.vector_precision),
+        )
+    backend = ann_backend or settings.ann_backend
+    return SearchCtx(
+        app=None,
+        index=None,
+        food_item=None,
+        desc_space=None,
+        cat_text_space=None,
+        cat_cat_space=None,
+        cal_space=None,
+        fingerprint=fingerprint,
+        vectors=vi,
+        ann=load_or_build_ann(
+            vi, fingerprint, "exact" if backend == "none" else backend
+        ),
+    )
@@ -0,0 +1,250 @@
+"""
+Stage timings for the search and ingest paths.
+
+``span(stage)`` times a block into a per-stage latency histogram of the
+process-wide ``registry``; ``registry.to_prometheus()`` renders every
+histogram in the Prometheus text exposition format. Spans are cheap (two
+``perf_counter`` calls and a locked bucket increment) and always on unless
+``settings.metrics_enabled`` is off.
+
+``profiled(name)`` is the opt-in profiler hook around whole requests: with
+``settings.profile_slowest`` > 0 a ``settings.profile_sample_rate`` share of
+requests runs under cProfile, and the stats of the slowest N are kept as
+``.prof`` files in ``settings.profile_dir`` (open with ``snakeviz`` or
+``pstats``).
+"""
+
+from __future__ import annotations
+import bisect
+import cProfile
+import heapq
+import random
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from .config import settings
+
+# seconds; the implicit last bucket is +Inf
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram, safe to update from many threads.
+
+    Attributes:
+        buckets: Upper bounds in seconds, ascending.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += seconds
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """``(upper bound, observations <= bound)`` pairs, ending with ``inf``."""
+        with self._lock:
+            counts = list(self._counts)
+        total, out = 0, []
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            total += n
+            out.append((bound, total))
+        return out
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the ``q`` quantile (a bucket-resolution
+        estimate).
+        """
+        pairs = self.cumulative()
+        target = q * pairs[-1][1]
+        for bound, total in pairs:
+            if total >= target and total:
+                return bound
+        return 0.0
+
+
+class MetricsRegistry:
+    """
+    One latency histogram per stage name.
+
+    Attributes:
+        name: Metric family name used in the Prometheus export.
+    """
+
+    def __init__(self, name: str = "food_search_stage_seconds"):
+        self.name = name
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        h = self._histograms.get(stage)
+        if h is None:
+            with self._lock:
+                h = self._histograms.setdefault(stage, Histogram())
+        return h
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self.histogram(stage).observe(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per stage: count, mean and bucket-resolution p50 / p95 / p99, in ms."""
+        out = {}
+        for stage, h in sorted(self._histograms.items()):
+            n = h.count
+            out[stage] = {
+                "count": n,
+                "mean_ms": 1e3 * h.sum / n if n else 0.0,
+                "p50_ms": 1e3 * h.quantile(0.50),
+                "p95_ms": 1e3 * h.quantile(0.95),
+                "p99_ms": 1e3 * h.quantile(0.99),
+            }
+        return out
+
+    def to_prometheus(self) -> str:
+        """Render every histogram in the Prometheus text format (version 0.0.4)."""
+        lines = [
+            f"# HELP {self.name} Time spent per search / ingest stage.",
+            f"# TYPE {self.name} histogram",
+        ]
+        for stage, h in sorted(self._histograms.items()):
+            for bound, total in h.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{stage="{stage}",le="{le}"}} {total}')
+            lines.append(f'{self.name}_sum{{stage="{stage}"}} {h.sum!r}')
+            lines.append(f'{self.name}_count{{stage="{stage}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the block into ``registry`` under ``stage``."""
+    if not settings.metrics_enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(stage, time.perf_counter() - start)
+
+
+# ───────────────────────── slow-request profiler ───────────────────────
+class SlowRequestProfiler:
+    """
+    Keeps cProfile dumps of the ``keep`` slowest profiled requests.
+
+    Only one request is profiled at a time (cProfile is per-interpreter on
+    recent Pythons); concurrent requests simply run unprofiled.
+    """
+
+    def __init__(self, keep: int, directory: Path, sample_rate: float = 1.0):
+        self.keep = keep
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self._slowest: List[Tuple[float, str]] = []  # min-heap of (seconds, file)
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        if random.random() >= self.sample_rate or not self._busy.acquire(
+            blocking=False
+        ):
+            yield
+            return
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+            self._record(name, time.perf_counter() - start, profiler)
+        finally:
+            self._busy.release()
+
+    def _record(self, name: str, seconds: float, profiler: cProfile.Profile) -> None:
+        with self._lock:
+            if len(self._slowest) >= self.keep and seconds <= self._slowest[0][0]:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = (
+                self.directory / f"{name}-{int(seconds * 1e3)}ms-{time.time_ns()}.prof"
+            )
+            profiler.dump_stats(str(path))
+            heapq.heappush(self._slowest, (seconds, str(path)))
+            if len(self._slowest) > self.keep:
+                _, evicted = heapq.heappop(self._slowest)
+                Path(evicted).unlink(missing_ok=True)
+
+    def slowest(self) -> List[Tuple[float, str]]:
+        """``(seconds, file)`` of the kept profiles, slowest first."""
+        with self._lock:
+            return sorted(self._slowest, reverse=True)
+
+
+_profiler: Optional[SlowRequestProfiler] = None
+
+
+@contextmanager
+def profiled(name: str) -> Iterator[None]:
+    """
+    Time a whole request under ``request.<name>`` and, when
+    ``settings.profile_slowest`` > 0, profile it for the slowest-N dumps.
+    """
+    global _profiler
+    with span(f"request.{name}"):
+        if settings.profile_slowest <= 0:
+            yield
+            return
+        if _profiler is None:
+            _profiler = SlowRequestProfiler(
+                settings.profile_slowest,
+                Path(__file__).resolve().parents[2] / settings.profile_dir,
+                settings.profile_sample_rate,
+            )
+        with _profiler.profile(name):
+            yield
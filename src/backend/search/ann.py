@@ -0,0 +1,325 @@
+"""
+Approximate nearest-neighbour candidate generation over the index.
+
+Backends index ``VectorIndex.item_matrix()`` by inner product and return
+candidate rows only; the search functions then score those rows exactly, so
+the ANN knobs trade recall for latency but never change a candidate's score.
+
+Backends (``settings.ann_backend``):
+
+- ``exact``: no candidate pruning (brute force), the recall baseline.
+- ``ivf``: spherical k-means inverted lists in NumPy; ``ivf_nlist`` lists,
+  ``ivf_nprobe`` probed per query.
+- ``hnsw``: an ``hnswlib`` graph (optional dependency); ``hnsw_m``,
+  ``hnsw_ef_construction`` and ``hnsw_ef_search``.
+
+Built indexes are persisted under ``settings.ann_dir`` together with the
+ingest fingerprint and their parameters, and rebuilt when either changes.
+IVF lists are memory-mapped on load; an HNSW graph is read into each
+process's own memory by ``hnswlib``.
+"""
+
+from __future__ import annotations
+import abc
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+from ..config import settings
+from ..ingest.snapshot import publish_dir
+from .vectors import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+
+
+class AnnIndex(abc.ABC):
+    """
+    Base class of the candidate generators.
+
+    Attributes:
+        name: Backend name as used in ``settings.ann_backend``.
+    """
+
+    name = "base"
+
+    def params(self) -> Dict[str, int]:
+        """Build parameters recorded in the manifest."""
+        return {}
+
+    @abc.abstractmethod
+    def candidates(self, queries: np.ndarray, n: int) -> Optional[np.ndarray]:
+        """
+        Return candidate row positions for the concatenated ``queries``.
+
+        Args:
+            queries (np.ndarray): ``VectorIndex.query_matrix`` rows, ``(b, D)``.
+            n (int): Candidates wanted per query.
+
+        Returns:
+            Optional[np.ndarray]: Sorted unique rows covering every query, or
+            ``None`` for "all rows".
+        """
+
+    def save(self, directory: Path) -> None:
+        pass
+
+
+class ExactIndex(AnnIndex):
+    """Brute force: every row is a candidate."""
+
+    name = "exact"
+
+    def candidates(self, queries: np.ndarray, n: int) -> Optional[np.ndarray]:
+        return None
+
+
+class IvfIndex(AnnIndex):
+    """
+    Inverted lists over spherical k-means centroids.
+
+    Attributes:
+        centroids: Unit-norm centroids, ``(nlist, D)``.
+        offsets: ``list_rows[offsets[i]:offsets[i + 1]]`` are the rows of list ``i``.
+        list_rows: Row positions grouped by list.
+        nprobe: Lists scanned per query.
+    """
+
+    name = "ivf"
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+        list_rows: np.ndarray,
+        nprobe: int,
+    ):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.list_rows = list_rows
+        self.nprobe = nprobe
+
+    def params(self) -> Dict[str, int]:
+        return {"nlist": len(self.centroids)}
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        nlist: int,
+        nprobe: int,
+        iterations: int = 10,
+        seed: int = 0,
+    ) -> "IvfIndex":
+        rng = np.random.default_rng(seed)
+        nlist = max(1, min(nlist, len(matrix)))
+        sample = matrix[
+            rng.choice(len(matrix), size=min(len(matrix), 64 * nlist), replace=False)
+        ]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+        for _ in range(iterations):
+            centroids = _unit(centroids)
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            empty = np.bincount(assign, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = sums
+        centroids = _unit(centroids)
+        assign = np.concatenate(
+            [
+                np.argmax(matrix[i : i + 65536] @ centroids.T, axis=1)
+                for i in range(0, len(matrix), 65536)
+            ]
+        )
+        list_rows = np.argsort(assign, kind="stable")
+        offsets = np.searchsorted(assign[list_rows], np.arange(nlist + 1))
+        return cls(centroids.astype(np.float32), offsets, list_rows, nprobe)
+
+    def candidates(self, queries: np.ndarray, n: int) -> Optional[np.ndarray]:
+        nprobe = min(self.nprobe, len(self.centroids))
+        probed = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[
+            :, :nprobe
+        ]
+        lists = np.unique(probed)
+        return np.sort(
+            np.concatenate(
+                [self.list_rows[self.offsets[i] : self.offsets[i + 1]] for i in lists]
+            )
+        )
+
+    _ARRAYS = ("centroids", "offsets", "list_rows")
+
+    def save(self, directory: Path) -> None:
+        for name in self._ARRAYS:
+            np.save(directory / f"ivf_{name}.npy", getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: Path, nprobe: int) -> "IvfIndex":
+        # memory-mapped, so worker processes share one copy of the lists
+        arrays = [
+            np.load(directory / f"ivf_{name}.npy", mmap_mode="r")
+            for name in cls._ARRAYS
+        ]
+        return cls(*arrays, nprobe)
+
+
+class HnswIndex(AnnIndex):
+    """
+    ``hnswlib`` graph with inner-product distance.
+
+    The search beam is set once (``settings.hnsw_ef_search``) when the graph is
+    built or loaded, never per query: ``set_ef`` is not safe against queries
+    running on other threads, and ``knn_query`` widens the beam to ``k`` by itself.
+
+    Attributes:
+        graph: The ``hnswlib.Index``.
+        m: Graph out-degree used at build time.
+        ef_construction: Build-time beam width.
+    """
+
+    name = "hnsw"
+
+    def __init__(self, graph, m: int, ef_construction: int):
+        self.graph = graph
+        self.m = m
+        self.ef_construction = ef_construction
+
+    def params(self) -> Dict[str, int]:
+        return {"m": self.m, "ef_construction": self.ef_construction}
+
+    @staticmethod
+    def _hnswlib():
+        try:
+            import hnswlib
+        except ImportError as exc:
+            raise ImportError(
+                "ann_backend='hnsw' requires `pip install hnswlib`"
+            ) from exc
+        return hnswlib
+
+    @classmethod
+    def build(
+        cls, matrix: np.ndarray, m: int, ef_construction: int, ef_search: int
+    ) -> "HnswIndex":
+        graph = cls._hnswlib().Index(space="ip", dim=matrix.shape[1])
+        graph.init_index(
+            max_elements=len(matrix),
+            M=m,
+            ef_construction=ef_construction,
+            random_seed=0,
+        )
+        graph.add_items(matrix, np.arange(len(matrix)))
+        graph.set_ef(ef_search)
+        return cls(graph, m, ef_construction)
+
+    def candidates(self, queries: np.ndarray, n: int) -> Optional[np.ndarray]:
+        n = min(n, self.graph.get_current_count())
+        labels, _ = self.graph.knn_query(queries, k=n)
+        return np.unique(labels.astype(np.int64))
+
+    def save(self, directory: Path) -> None:
+        self.graph.save_index(str(directory / "hnsw.bin"))
+
+    @classmethod
+    def load(
+        cls, directory: Path, dim: int, n_rows: int, m: int, ef_construction: int
+    ) -> "HnswIndex":
+        graph = cls._hnswlib().Index(space="ip", dim=dim)
+        graph.load_index(str(directory / "hnsw.bin"), max_elements=n_rows)
+        graph.set_ef(settings.hnsw_ef_search)
+        return cls(graph, m, ef_construction)
+
+
+def _unit(m: np.ndarray) -> np.ndarray:
+    return m / np.maximum(np.linalg.norm(m, axis=1, keepdims=True), 1e-12)
+
+
+# ───────────────────────── build / persist ─────────────────────────────
+def _build_params(backend: str) -> Dict[str, int]:
+    if backend == "ivf":
+        return {"nlist": settings.ivf_nlist}
+    if backend == "hnsw":
+        return {"m": settings.hnsw_m, "ef_construction": settings.hnsw_ef_construction}
+    return {}
+
+
+def build_ann_index(vi: VectorIndex, backend: str) -> AnnIndex:
+    """Build a fresh ``backend`` index over ``vi``."""
+    if backend == "exact":
+        return ExactIndex()
+    matrix = vi.item_matrix()
+    if backend == "ivf":
+        return IvfIndex.build(
+            matrix, nlist=settings.ivf_nlist, nprobe=settings.ivf_nprobe
+        )
+    if backend == "hnsw":
+        return HnswIndex.build(
+            matrix,
+            m=settings.hnsw_m,
+            ef_construction=settings.hnsw_ef_construction,
+            ef_search=settings.hnsw_ef_search,
+        )
+    raise ValueError(f"unknown ann_backend: {backend!r}")
+
+
+def load_or_build_ann(
+    vi: VectorIndex, fingerprint: str, backend: Optional[str] = None
+) -> Optional[AnnIndex]:
+    """
+    Return the configured ANN index for ``vi``, loading it from
+    ``settings.ann_dir`` when it was built for the same fingerprint and
+    parameters, and building (and persisting) it otherwise.
+
+    Returns:
+        Optional[AnnIndex]: ``None`` when ``backend`` is ``"none"``.
+    """
+    backend = backend or settings.ann_backend
+    if backend == "none":
+        return None
+    if backend == "exact" or len(vi) == 0:
+        return ExactIndex()
+
+    link = Path(__file__).resolve().parents[3] / settings.ann_dir / backend
+    directory = link.resolve()  # one version, even if republished meanwhile
+    params = _build_params(backend)
+    manifest_file = directory / MANIFEST
+    if manifest_file.exists():
+        manifest = json.loads(manifest_file.read_text())
+        if (
+            manifest.get("fingerprint") == fingerprint
+            and manifest.get("params") == params
+        ):
+            try:
+                if backend == "ivf":
+                    return IvfIndex.load(directory, nprobe=settings.ivf_nprobe)
+                return HnswIndex.load(
+                    directory, dim=manifest["dim"], n_rows=len(vi), **params
+                )
+            except (OSError, ValueError, KeyError, RuntimeError) as exc:
+                logger.warning(
+                    "rebuilding unreadable %s index in %s: %s", backend, directory, exc
+                )
+
+    logger.info("building %s index over %d rows", backend, len(vi))
+    index = build_ann_index(vi, backend)
+    # written beside the live index and swapped in, so concurrent loaders
+    # never see a half-written one
+    tmp = link.parent / f".{backend}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    index.save(tmp)
+    dim = (
+        vi.desc.shape[1]
+        + vi.cat_text.shape[1]
+        + len(vi.categories)
+        + vi.cal_vec.shape[1]
+    )
+    manifest = {"fingerprint": fingerprint, "params": params, "dim": dim}
+    (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    publish_dir(tmp, link)
+    return index
@@ -0,0 +1,94 @@
+"""
+Caches used by the search functions.
+
+Each cache is created on first use, so importing the search modules does
+not build ``Settings``.
+"""
+
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from ..config import settings
+from ..embedding.cache import CacheStats, EmbeddingCache
+
+
+@functools.lru_cache(maxsize=1)
+def get_query_vectors() -> EmbeddingCache:
+    """
+    Return the query-text vectors, keyed by (runtime, text). desc_space and
+    cat_text_space embed with the same model, so a text cached for one is
+    reused by the other; only changing the text (not the weights) ever
+    reaches the model.
+    """
+    from ..embedding.runtime import get_runtime
+
+    return EmbeddingCache(
+        get_runtime().key,
+        max_entries=settings.query_cache_size,
+        ttl_seconds=settings.query_cache_ttl_seconds,
+    )
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of converted search results.
+
+    Keys are built by the search functions from the index fingerprint, the
+    search mode, the full ``SearchInputs`` and the weights, so re-ingesting
+    different data never serves stale rows.
+
+    Attributes:
+        max_entries: Results kept before the least recently used are evicted;
+                     ``0`` disables the cache.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for ``key`` or ``None``."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached result; called whenever the index is re-ingested."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._misses, len(self._entries))
+
+
+@functools.lru_cache(maxsize=1)
+def get_search_results() -> ResultCache:
+    """Return the cache of converted search results."""
+    return ResultCache(settings.result_cache_size)
+
+
+@functools.lru_cache(maxsize=1)
+def get_score_pools() -> ResultCache:
+    """Return the per-space score pools of ``score_pool``, keyed by query."""
+    return ResultCache(settings.score_pool_cache_size)
@@ -0,0 +1,153 @@
+"""
+Scalar quantization of the text-embedding blocks of a ``VectorIndex``.
+
+``float16`` halves and ``int8`` (symmetric, one scale per row) quarters the
+bytes scanned per row. Quantized scores are only used to shortlist
+candidates; the search functions rescore the shortlist exactly against the
+float32 vectors, which stay memory-mapped in the snapshot and are only
+paged in for those rows.
+
+``save_quantized`` writes a block straight into ``.npy`` files at ingest and
+``load_quantized`` memory-maps it, so worker processes share one copy.
+"""
+
+from __future__ import annotations
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+import numpy as np
+
+# rows converted back to float32 per matrix product, bounds temporary memory
+_CHUNK = 65536
+
+
+@dataclass(frozen=True)
+class QuantizedMatrix:
+    """
+    A row-major matrix stored at reduced precision.
+
+    Attributes:
+        data: ``float16`` or ``int8`` values, shape ``(n, d)``.
+        scale: Per-row ``float32`` scale for ``int8`` (``None`` for ``float16``).
+    """
+
+    data: np.ndarray
+    scale: Optional[np.ndarray] = None
+
+    @property
+    def precision(self) -> str:
+        return self.data.dtype.name
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (0 if self.scale is None else self.scale.nbytes)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def dot(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Approximate ``matrix[rows] @ queries.T``, shape ``(n_rows, n_queries)``.
+        """
+        data = self.data if rows is None else self.data[rows]
+        scale = self.scale if rows is None or self.scale is None else self.scale[rows]
+        queries = np.asarray(queries, dtype=np.float32).T
+        out = np.empty((len(data), queries.shape[1]), dtype=np.float32)
+        for start in range(0, len(data), _CHUNK):
+            part = slice(start, start + _CHUNK)
+            out[part] = data[part].astype(np.float32) @ queries
+        if scale is not None:
+            out *= scale[:, None]
+        return out
+
+
+def _fill(matrix: np.ndarray, data: np.ndarray, scale: Optional[np.ndarray]) -> None:
+    """Quantize ``matrix`` into the preallocated ``data`` (and int8 ``scale``)."""
+    for start in range(0, len(matrix), _CHUNK):
+        part = slice(start, start + _CHUNK)
+        block = np.asarray(matrix[part], dtype=np.float32)
+        if scale is None:
+            data[part] = block
+            continue
+        s = np.maximum(np.abs(block).max(axis=1), 1e-12) / 127.0
+        data[part] = np.rint(block / s[:, None])
+        scale[part] = s
+
+
+def _check(precision: str) -> None:
+    if precision not in ("float32", "float16", "int8"):
+        raise ValueError(f"unknown vector precision: {precision!r}")
+
+
+def quantize(matrix: np.ndarray, precision: str) -> Optional[QuantizedMatrix]:
+    """
+    Quantize ``matrix`` to ``precision``.
+
+    Args:
+        matrix (np.ndarray): Float32 rows, e.g. unit-norm embeddings.
+        precision (str): ``"float32"`` (no quantization), ``"float16"`` or ``"int8"``.
+
+    Returns:
+        Optional[QuantizedMatrix]: ``None`` for ``"float32"``.
+    """
+    _check(precision)
+    if precision == "float32":
+        return None
+    data = np.empty(matrix.shape, dtype=precision)
+    scale = np.empty(len(matrix), dtype=np.float32) if precision == "int8" else None
+    _fill(matrix, data, scale)
+    return QuantizedMatrix(data, scale)
+
+
+def _paths(stem: Path, precision: str):
+    return stem.with_name(f"{stem.name}.{precision}.npy"), stem.with_name(
+        f"{stem.name}.{precision}.scale.npy"
+    )
+
+
+def save_quantized(matrix: np.ndarray, precision: str, stem: Path) -> None:
+    """
+    Quantize ``matrix`` into ``<stem>.<precision>.npy`` (plus
+    ``<stem>.int8.scale.npy``) without holding the block in memory. Files
+    already there are kept; new ones appear atomically.
+    """
+    _check(precision)
+    data_path, scale_path = _paths(Path(stem), precision)
+    if precision == "float32" or data_path.exists():
+        return
+    pid = os.getpid()
+    tmp_data = data_path.with_name(f".{data_path.name}.tmp-{pid}")
+    tmp_scale = scale_path.with_name(f".{scale_path.name}.tmp-{pid}")
+    data = np.lib.format.open_memmap(
+        tmp_data, mode="w+", dtype=precision, shape=matrix.shape
+    )
+    scale = None
+    if precision == "int8":
+        scale = np.lib.format.open_memmap(
+            tmp_scale, mode="w+", dtype=np.float32, shape=(len(matrix),)
+        )
+    _fill(matrix, data, scale)
+    data.flush()
+    if scale is not None:
+        scale.flush()
+        os.replace(
+            tmp_scale, scale_path
+        )  # before the data file, which marks the block complete
+    os.replace(tmp_data, data_path)
+
+
+def load_quantized(stem: Path, precision: str) -> Optional[QuantizedMatrix]:
+    """Memory-map a block written by ``save_quantized``, ``None`` if there is none."""
+    _check(precision)
+    if precision == "float32":
+        return None
+    data_path, scale_path = _paths(Path(stem), precision)
+    try:
+        data = np.load(data_path, mmap_mode="r")
+        scale = np.load(scale_path, mmap_mode="r") if precision == "int8" else None
+    except (OSError, ValueError):
+        return None
+    if scale is not None and len(scale) != len(data):
+        return None
+    return QuantizedMatrix(data, scale)
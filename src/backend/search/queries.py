@@ -3,17 +3,202 @@ Query functions for semantic search using Superlinked.
 """
 
 from __future__ import annotations
-from typing import Tuple
+import functools
+from dataclasses import astuple, replace
+from typing import List, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
-from superlinked import framework as sl
-from .types import SearchInputs, SearchCtx, CategoryWeights, NumericWeights
+from ..config import settings
+from ..embedding.cache import using_cache
+from ..embedding.encoder import encode_texts
+from ..metrics import span
+from .cache import get_query_vectors, get_score_pools, get_search_results
+from .types import (
+    BatchResults,
+    ScorePool,
+    SearchInputs,
+    SearchCtx,
+    CategoryWeights,
+    NumericWeights,
+    QueryTemplates,
+)
+from .vectors import VectorIndex, calorie_vectors, unit_rows
 
+_COLS = ["description", "food_category", "calories", "similarity_score"]
 
 
-_COLS = ["description", "food_category", "calories", "similarity_score"]
+def _superlinked():
+    # deferred: store-backed (``open_store``) processes never load Superlinked
+    from superlinked import framework
+
+    return framework
+
+
+def _run(ctx: SearchCtx, query, **params) -> pd.DataFrame:
+    """
+    Execute ``query``, serving query-text embeddings from ``get_query_vectors()``.
+    Rows tombstoned by ``sync_index`` are dropped, over-fetching to keep the limit.
+    """
+    limit = params.get("limit")
+    if ctx.deleted_ids and limit is not None:
+        params["limit"] = limit + len(ctx.deleted_ids)
+    with using_cache(get_query_vectors()), span("query"):
+        res = ctx.app.query(query, **params)
+    with span("to_pandas"):
+        df = _superlinked().PandasConverter.to_pandas(res)
+    if ctx.deleted_ids:
+        df = df[~df["id"].astype(np.int64).isin(ctx.deleted_ids)]
+        if limit is not None:
+            df = df.head(limit)
+    return df
+
+
+def _copy(result):
+    if isinstance(result, tuple):
+        return tuple(_copy(r) for r in result)
+    return result.copy() if isinstance(result, pd.DataFrame) else result
+
+
+def _cached(fn):
+    """
+    Serve repeated calls from ``get_search_results()``. The key covers the index
+    fingerprint, the search mode, every ``SearchInputs`` field and the weights;
+    callers always get their own copy of the cached frame.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(ctx: SearchCtx, inp: SearchInputs, *args):
+        search_results = get_search_results()
+        with span(f"search.{fn.__name__}"):
+            if not search_results.enabled:
+                return fn(ctx, inp, *args)
+            key = (
+                fn.__name__,
+                ctx.fingerprint or id(ctx),
+                astuple(inp),
+                *(astuple(a) for a in args),
+            )
+            result = search_results.get(key)
+            if result is None:
+                result = fn(ctx, inp, *args)
+                search_results.put(key, result)
+            return _copy(result)
+
+    return wrapper
+
+
+# ───────────────────────── query templates ──────────────────────────────
+def compile_queries(ctx: SearchCtx) -> QueryTemplates:
+    """
+    Build the four query shapes once for ``ctx``.
+
+    Query texts, category, calories, every space weight and the result limit
+    are ``sl.Param``s, so a search only binds values instead of rebuilding the
+    ``sl.Query`` chain. Only the displayed fields are selected, so the top-k
+    cut and the projection happen inside the query rather than in pandas.
+    Every shape also carries the hard filters (``categories``, ``cal_min``,
+    ``cal_max``) as ``.filter`` clauses; Superlinked skips a clause whose
+    parameter is bound to ``None``.
+
+    Args:
+        ctx (SearchCtx): The search context containing the index and spaces.
+
+    Returns:
+        QueryTemplates: The compiled simple / weighted / numeric / combined queries.
+    """
+    sl = _superlinked()
+    item = ctx.food_item
+    fields = [item.description, item.food_category, item.calories]
+
+    def filtered(query):
+        return (
+            query.filter(item.food_category.in_(sl.Param("categories")))
+            .filter(item.calories >= sl.Param("cal_min"))
+            .filter(item.calories <= sl.Param("cal_max"))
+        )
+
+    simple = (
+        sl.Query(ctx.index)
+        .find(ctx.food_item)
+        .similar(ctx.desc_space, sl.Param("q"))
+        .select(fields)
+        .limit(sl.Param("limit"))
+    )
+    weighted = (
+        sl.Query(
+            ctx.index,
+            weights={
+                ctx.desc_space: sl.Param("desc_weight"),
+                ctx.cat_text_space: sl.Param("cat_weight"),
+            },
+        )
+        .find(ctx.food_item)
+        .similar(ctx.desc_space, sl.Param("q"))
+        .similar(ctx.cat_text_space, sl.Param("cat"))
+        .select(fields)
+        .limit(sl.Param("limit"))
+    )
+    numeric = (
+        sl.Query(
+            ctx.index,
+            weights={
+                ctx.desc_space: sl.Param("desc_weight"),
+                ctx.cal_space: sl.Param("cal_weight"),
+            },
+        )
+        .find(ctx.food_item)
+        .similar(ctx.desc_space, sl.Param("q"))
+        .similar(ctx.cal_space, sl.Param("cal"))
+        .select(fields)
+        .limit(sl.Param("limit"))
+    )
+    combined = (
+        sl.Query(
+            ctx.index,
+            weights={
+                ctx.desc_space: sl.Param("desc_weight"),
+                ctx.cal_space: sl.Param("cal_weight"),
+            },
+        )
+        .find(ctx.food_item)
+        .similar(ctx.cat_cat_space.category, sl.Param("cat"))
+        .similar(ctx.desc_space, sl.Param("q"))
+        .similar(ctx.cal_space, sl.Param("cal"))
+        .select(fields)
+        .limit(sl.Param("limit"))
+    )
+    return QueryTemplates(
+        simple=filtered(simple),
+        weighted=filtered(weighted),
+        numeric=filtered(numeric),
+        combined=filtered(combined),
+    )
+
+
+def _queries(ctx: SearchCtx) -> QueryTemplates:
+    # Contexts built by build_superlinked_app carry their templates; hand-built
+    # ones fall back to compiling per call.
+    return ctx.queries if ctx.queries is not None else compile_queries(ctx)
+
+
+def _filters(inp: SearchInputs) -> dict:
+    """Bind the hard filters of ``inp`` to the template parameters."""
+    lo, hi = inp.calories_between if inp.calories_between is not None else (None, None)
+    return {
+        "categories": None if inp.categories is None else list(inp.categories),
+        "cal_min": None if lo is None else float(lo),
+        "cal_max": None if hi is None else float(hi),
+    }
+
+
+def _limit(inp: SearchInputs, default: Optional[int] = None) -> int:
+    if inp.limit is not None:
+        return inp.limit
+    return default if default is not None else settings.search_limit
 
 
 # ───────────────────────── search functions ─────────────────────────────
+@_cached
 def simple_search(ctx: SearchCtx, inp: SearchInputs) -> pd.DataFrame:
     """
     Perform a simple search based on the description query.
@@ -25,16 +210,18 @@ def simple_search(ctx: SearchCtx, inp: SearchInputs) -> pd.DataFrame:
     Returns:
         pd.DataFrame: A DataFrame containing the search results with specified columns.
     """
-    q = (
-        sl.Query(ctx.index)
-        .find(ctx.food_item)
-        .similar(ctx.desc_space, sl.Param("q"))
-        .select_all()
-    )
-    res = ctx.app.query(q, q=inp.description_query)
-    return sl.PandasConverter.to_pandas(res)[_COLS]
+    if _use_vectors(ctx):
+        return _vector_search(ctx, inp, None)[_COLS]
+    return _run(
+        ctx,
+        _queries(ctx).simple,
+        q=inp.description_query,
+        limit=_limit(inp),
+        **_filters(inp),
+    )[_COLS]
 
 
+@_cached
 def weighted_search(ctx: SearchCtx, inp: SearchInputs, p: CategoryWeights) -> pd.DataFrame:
     """
     Perform a weighted search based on description and category queries.
@@ -47,23 +234,22 @@ def weighted_search(ctx: SearchCtx, inp: SearchInputs, p: CategoryWeights) -> pd
     Returns:
         pd.DataFrame: A DataFrame containing the search results with specified columns.
     """
-    q = (
-        sl.Query(
-            ctx.index,
-            weights={
-                ctx.desc_space: p.desc_weight,
-                ctx.cat_text_space: p.cat_weight,   
-            },
-        )
-        .find(ctx.food_item)
-        .similar(ctx.desc_space, sl.Param("q"))
-        .similar(ctx.cat_text_space, sl.Param("cat"))
-        .select_all()
+    if _use_vectors(ctx):
+        return _vector_search(ctx, inp, p)[_COLS + ["id"]]
+    res = _run(
+        ctx,
+        _queries(ctx).weighted,
+        q=inp.description_query,
+        cat=inp.category_query,
+        desc_weight=p.desc_weight,
+        cat_weight=p.cat_weight,
+        limit=_limit(inp),
+        **_filters(inp),
     )
-    res = ctx.app.query(q, q=inp.description_query, cat=inp.category_query)
-    return sl.PandasConverter.to_pandas(res)[_COLS+['id']] #need the id for umap filtering
+    return res[_COLS + ["id"]]  # need the id for umap filtering
 
 
+@_cached
 def numeric_search(ctx: SearchCtx, inp: SearchInputs, p: NumericWeights) -> Tuple[pd.DataFrame, float]:
     """
     Perform a numeric search based on description and calories queries.
@@ -75,24 +261,29 @@ def numeric_search(ctx: SearchCtx, inp: SearchInputs, p: NumericWeights) -> Tupl
 
     Returns:
         Tuple[pd.DataFrame, float]: A tuple containing a DataFrame with the top 10 search results
-                                    and the mean calories of these results.
+                                    (or ``inp.limit``) and the mean calories of
+                                    these results.
     """
-    q = (
-        sl.Query(
-            ctx.index,
-            weights={ctx.desc_space: p.desc_weight, ctx.cal_space: p.cal_weight},
-        )
-        .find(ctx.food_item)
-        .similar(ctx.desc_space, sl.Param("q"))
-        .similar(ctx.cal_space, sl.Param("cal"))
-        .select_all()
-    )
-    res = ctx.app.query(q, q=inp.description_query, cal=inp.calories_val)
-    df = sl.PandasConverter.to_pandas(res)[_COLS]
-    top10 = df.head(10)
+    if _use_vectors(ctx):
+        # the numeric template has no category term; with NumericWeights the
+        # NumPy path adds one whenever category_query is set (combined mode)
+        inp = replace(inp, category_query=None, limit=_limit(inp, default=10))
+        top10 = _vector_search(ctx, inp, p)[_COLS]
+        return top10, top10["calories"].mean() if not top10.empty else 0.0
+    top10 = _run(
+        ctx,
+        _queries(ctx).numeric,
+        q=inp.description_query,
+        cal=inp.calories_val,
+        desc_weight=p.desc_weight,
+        cal_weight=p.cal_weight,
+        limit=_limit(inp, default=10),
+        **_filters(inp),
+    )[_COLS]
     return top10, top10["calories"].mean() if not top10.empty else 0.0
 
 
+@_cached
 def combined_search(ctx: SearchCtx, inp: SearchInputs, p:NumericWeights) -> pd.DataFrame:
     """
     Perform a combined search based on category, description, and calories queries.
@@ -105,22 +296,466 @@ def combined_search(ctx: SearchCtx, inp: SearchInputs, p:NumericWeights) -> pd.D
     Returns:
         pd.DataFrame: A DataFrame containing the search results with specified columns.
     """
-    q = (
-        sl.Query(
-            ctx.index,
-            weights={ctx.desc_space: p.desc_weight, ctx.cal_space: p.cal_weight},
-        )
-        .find(ctx.food_item)
-        .similar(ctx.cat_cat_space.category, sl.Param("cat"))
-        .similar(ctx.desc_space, sl.Param("q"))
-        .similar(ctx.cal_space, sl.Param("cal"))
-        .select_all()
-    )
-    res = ctx.app.query(
-        q,
+    if _use_vectors(ctx):
+        return _vector_search(ctx, inp, p)[_COLS]
+    res = _run(
+        ctx,
+        _queries(ctx).combined,
         q=inp.description_query,
         cat=inp.category_query,
         cal=inp.calories_val,
+        desc_weight=p.desc_weight,
+        cal_weight=p.cal_weight,
+        limit=_limit(inp),
+        **_filters(inp),
+    )
+    return res[_COLS]
+
+
+# ───────────────────────── batch search ─────────────────────────────────
+def encode_queries(texts: List[str]) -> np.ndarray:
+    """Embed query texts in one model batch, through ``get_query_vectors()``."""
+    with using_cache(get_query_vectors()):
+        return unit_rows(encode_texts(texts))
+
+
+def search_vectors(
+    ctx: SearchCtx,
+    inputs: List[SearchInputs],
+    weights: Union[CategoryWeights, NumericWeights, None] = None,
+) -> np.ndarray:
+    """
+    Return the concatenated query row of each input, in the layout of
+    ``VectorIndex.item_matrix`` (e.g. to project a query into the UMAP space).
+
+    Args:
+        ctx (SearchCtx): A context built by ``build_superlinked_app``.
+        inputs (List[SearchInputs]): One entry per query.
+        weights (CategoryWeights | NumericWeights, optional): Space weights of
+            the search mode.
+
+    Returns:
+        np.ndarray: Shape ``(len(inputs), D)``.
+    """
+    vi = ctx.vectors
+    q_desc, q_cat = _query_vectors(inputs, weights)
+    codes = [
+        vi.category_code(inp.category_query) if inp.category_query is not None else -1
+        for inp in inputs
+    ]
+    return vi.query_matrix(
+        q_desc,
+        q_cat,
+        codes,
+        [inp.calories_val for inp in inputs],
+        _space_weights(weights),
+    )
+
+
+def _batch_scores(
+    vi: VectorIndex,
+    inputs: List[SearchInputs],
+    weights: Union[CategoryWeights, NumericWeights, None],
+    q_desc: np.ndarray,
+    q_cat: Optional[np.ndarray],
+    rows: Optional[np.ndarray] = None,
+    quantized: bool = False,
+) -> np.ndarray:
+    """
+    Score a chunk of queries against every row, or only against ``rows``;
+    returns shape ``(n_rows, n_queries)``. ``quantized`` scores the text
+    spaces on the reduced-precision blocks (approximate, for shortlisting).
+    """
+    take = (lambda a: a) if rows is None else (lambda a: a[rows])
+
+    def cat_scores() -> np.ndarray:
+        if quantized:
+            return vi.cat_text_q.dot(q_cat, rows)
+        return take(vi.cat_text) @ q_cat.T
+
+    if quantized:
+        desc_scores = vi.desc_q.dot(q_desc, rows)
+    else:
+        desc_scores = take(vi.desc) @ q_desc.T
+    scores = (1.0 if weights is None else weights.desc_weight) * desc_scores
+    if isinstance(weights, CategoryWeights):
+        scores += weights.cat_weight * cat_scores()
+    elif isinstance(weights, NumericWeights):
+        cal = [inp.calories_val for inp in inputs]
+        has_cal = np.array([c is not None for c in cal], dtype=np.float32)[:, None]
+        q_cal = (
+            calorie_vectors([c or 0 for c in cal], vi.calories_min, vi.calories_max)
+            * has_cal
+        )
+        scores += weights.cal_weight * (take(vi.cal_vec) @ q_cal.T)
+        # -2 never matches a row, so a missing or unknown category adds nothing.
+        codes = np.array([vi.category_code(inp.category_query) for inp in inputs])
+        codes[codes < 0] = -2
+        scores += take(vi.cat_codes)[:, None] == codes[None, :]
+    return scores
+
+
+def _query_vectors(
+    inputs: List[SearchInputs], weights: Union[CategoryWeights, NumericWeights, None]
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Embed the description (and, for ``CategoryWeights``, category) texts in
+    one batch.
+    """
+    n_q = len(inputs)
+    texts = [inp.description_query for inp in inputs]
+    with_cat_text = isinstance(weights, CategoryWeights)
+    if with_cat_text:
+        texts += [inp.category_query or "" for inp in inputs]
+    encoded = encode_queries(texts)
+    if not with_cat_text:
+        return encoded[:n_q], None
+    has_cat = np.array(
+        [inp.category_query is not None for inp in inputs], dtype=np.float32
+    )
+    return encoded[:n_q], encoded[n_q:] * has_cat[:, None]
+
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per column of ``scores``, the best ``k`` row positions and scores, best first."""
+    top = np.argpartition(-scores, k - 1, axis=0)[:k]
+    top_scores = np.take_along_axis(scores, top, axis=0)
+    order = np.argsort(-top_scores, axis=0, kind="stable")
+    return np.take_along_axis(top, order, axis=0), np.take_along_axis(
+        top_scores, order, axis=0
+    )
+
+
+def _shortlist(
+    vi: VectorIndex,
+    inputs: List[SearchInputs],
+    weights: Union[CategoryWeights, NumericWeights, None],
+    q_desc: np.ndarray,
+    q_cat: Optional[np.ndarray],
+    rows: Optional[np.ndarray],
+    k: int,
+) -> Optional[np.ndarray]:
+    """
+    Narrow ``rows`` (``None`` = all) to the best ``settings.rescore_candidates``
+    (at least ``k``) of a single query by quantized score, or return them
+    unchanged when the index is not quantized or they are few already.
+    """
+    n = len(vi) if rows is None else len(rows)
+    keep = max(settings.rescore_candidates, k)
+    if not vi.quantized or n <= keep:
+        return rows
+    approx = _batch_scores(
+        vi, inputs, weights, q_desc, q_cat, rows=rows, quantized=True
+    )[:, 0]
+    best = np.argpartition(-approx, keep - 1)[:keep]
+    return np.sort(best if rows is None else rows[best])
+
+
+def _space_weights(
+    weights: Union[CategoryWeights, NumericWeights, None],
+) -> Tuple[float, float, float, float]:
+    """``(desc, cat_text, category, calories)`` weights of a search mode."""
+    if weights is None:
+        return (1.0, 0.0, 0.0, 0.0)
+    if isinstance(weights, CategoryWeights):
+        return (weights.desc_weight, weights.cat_weight, 0.0, 0.0)
+    return (weights.desc_weight, 0.0, 1.0, weights.cal_weight)
+
+
+def _use_vectors(ctx: SearchCtx) -> bool:
+    # store-backed contexts (``open_store``) have no Superlinked app; hard
+    # filters run inside the Superlinked templates otherwise
+    return ctx.app is None or ctx.ann is not None
+
+
+def _vector_search(
+    ctx: SearchCtx,
+    inp: SearchInputs,
+    weights: Union[CategoryWeights, NumericWeights, None],
+) -> pd.DataFrame:
+    """
+    Run one search with NumPy over ``ctx.vectors`` instead of the Superlinked app.
+
+    Candidate rows come from the hard filters when ``inp`` has any (resolved
+    through the posting index), otherwise from the ANN backend ``ctx.ann``.
+    On a quantized index they are shortlisted on the quantized text blocks
+    first; only the shortlist is scored exactly, in float32.
+
+    Returns:
+        pd.DataFrame: ``_COLS`` plus ``id``, best first.
+    """
+    vi = ctx.vectors
+    if vi is None:
+        raise ValueError(
+            "hard filters and ANN search need a SearchCtx built by "
+            "build_superlinked_app"
+        )
+    q_desc, q_cat = _query_vectors([inp], weights)
+    if inp.has_filters:
+        codes = (
+            None
+            if inp.categories is None
+            else [vi.category_code(c) for c in inp.categories]
+        )
+        rows = vi.filters.candidates(codes, inp.calories_between)
+    else:
+        code = (
+            vi.category_code(inp.category_query)
+            if inp.category_query is not None
+            else -1
+        )
+        queries = vi.query_matrix(
+            q_desc, q_cat, [code], [inp.calories_val], _space_weights(weights)
+        )
+        rows = (
+            None
+            if ctx.ann is None
+            else ctx.ann.candidates(queries, max(settings.ann_candidates, _limit(inp)))
+        )
+    k = min(_limit(inp), len(vi) if rows is None else len(rows))
+    if k == 0:
+        return vi.rows(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+    with span("vector_search"):
+        rows = _shortlist(vi, [inp], weights, q_desc, q_cat, rows, k)
+        top, top_scores = _top_k(
+            _batch_scores(vi, [inp], weights, q_desc, q_cat, rows=rows), k
+        )
+        positions = top[:, 0] if rows is None else rows[top[:, 0]]
+    return vi.rows(positions, top_scores[:, 0])
+
+
+def batch_search(
+    ctx: SearchCtx,
+    inputs: List[SearchInputs],
+    weights: Union[CategoryWeights, NumericWeights, None] = None,
+    k: Optional[int] = None,
+) -> BatchResults:
+    """
+    Run many searches as one vectorised scoring pass over ``ctx.vectors``.
+
+    All query texts are embedded in a single model batch and each chunk of
+    ``settings.batch_search_chunk`` queries is scored against every row as
+    one matrix product. ``weights`` selects the search mode: ``None`` scores
+    descriptions only (as ``simple_search``), ``CategoryWeights`` adds the
+    category text (as ``weighted_search``), and ``NumericWeights`` adds
+    calories (as ``numeric_search``) plus an exact category match when
+    ``category_query`` is set (as ``combined_search``).
+
+    Args:
+        ctx (SearchCtx): A context built by ``build_superlinked_app``.
+        inputs (List[SearchInputs]): One entry per query.
+        weights (CategoryWeights | NumericWeights, optional): Space weights
+            shared by all queries.
+        k (int, optional): Hits per query. Defaults to ``settings.search_limit``.
+
+    Returns:
+        BatchResults: Top-``k`` ids and scores per query, best first.
+    """
+    vi = ctx.vectors
+    if vi is None:
+        raise ValueError(
+            "batch_search needs a SearchCtx built by build_superlinked_app"
+        )
+    n_q = len(inputs)
+    k = min(settings.search_limit if k is None else k, len(vi))
+    ids = np.empty((n_q, k), dtype=np.int64)
+    scores = np.empty((n_q, k), dtype=np.float32)
+    if n_q == 0 or k == 0:
+        return BatchResults(ids=ids, scores=scores)
+
+    q_desc, q_cat = _query_vectors(inputs, weights)
+    chunk = settings.batch_search_chunk
+    with span("batch_search"):
+        for start in range(0, n_q, chunk):
+            part = slice(start, start + chunk)
+            part_cat = None if q_cat is None else q_cat[part]
+            s = _batch_scores(
+                vi,
+                inputs[part],
+                weights,
+                q_desc[part],
+                part_cat,
+                quantized=vi.quantized,
+            )
+            if vi.quantized and len(vi) > max(settings.rescore_candidates, k):
+                top, top_scores = _rescore(
+                    vi, inputs[part], weights, q_desc[part], part_cat, s, k
+                )
+            else:
+                top, top_scores = _top_k(s, k)
+            ids[part] = vi.ids[top].T
+            scores[part] = top_scores.T
+    return BatchResults(ids=ids, scores=scores)
+
+
+def _rescore(
+    vi: VectorIndex,
+    inputs: List[SearchInputs],
+    weights: Union[CategoryWeights, NumericWeights, None],
+    q_desc: np.ndarray,
+    q_cat: Optional[np.ndarray],
+    approx: np.ndarray,
+    k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rescore the best ``settings.rescore_candidates`` rows of each query's
+    quantized ``approx`` column exactly and return the top ``k`` as ``_top_k`` does.
+    """
+    keep = max(settings.rescore_candidates, k)
+    candidates = np.sort(np.argpartition(-approx, keep - 1, axis=0)[:keep], axis=0)
+    top = np.empty((k, len(inputs)), dtype=np.int64)
+    top_scores = np.empty((k, len(inputs)), dtype=np.float32)
+    for j, inp in enumerate(inputs):
+        rows = candidates[:, j]
+        cat = None if q_cat is None else q_cat[j : j + 1]
+        exact = _batch_scores(vi, [inp], weights, q_desc[j : j + 1], cat, rows=rows)
+        best, best_scores = _top_k(exact, k)
+        top[:, j] = rows[best[:, 0]]
+        top_scores[:, j] = best_scores[:, 0]
+    return top, top_scores
+
+
+# ───────────────────────── live re-weighting ─────────────────────────────
+def score_pool(
+    ctx: SearchCtx,
+    inp: SearchInputs,
+    weights: Union[CategoryWeights, NumericWeights, None] = None,
+) -> ScorePool:
+    """
+    Compute the per-space similarities of ``inp`` once, for ``rerank``.
+
+    Pools are cached per query (text, category, calories, filters), not per
+    weight vector. Rows passing the hard filters form the pool; if there are
+    more than ``settings.rerank_pool_size``, only the best and worst rows of
+    each active space are kept, so positive and negative weights both rank
+    from the pool; on a quantized index that selection runs on the quantized
+    text blocks and only the kept rows are scored in float32.
+
+    Args:
+        ctx (SearchCtx): A context built by ``build_superlinked_app``.
+        inp (SearchInputs): The query; ``limit`` and weights do not matter here.
+        weights (CategoryWeights | NumericWeights, optional): Selects the search
+            mode, as in ``batch_search``; only its type is used.
+
+    Returns:
+        ScorePool: Candidate rows and their ``(n, 4)`` per-space scores.
+    """
+    vi = ctx.vectors
+    if vi is None:
+        raise ValueError("score_pool needs a SearchCtx built by build_superlinked_app")
+    key = (
+        ctx.fingerprint or id(ctx),
+        type(weights).__name__,
+        inp.description_query,
+        inp.category_query,
+        inp.calories_val,
+        inp.categories,
+        inp.calories_between,
     )
-    return sl.PandasConverter.to_pandas(res)[_COLS]
+    score_pools = get_score_pools()
+    pool = score_pools.get(key) if score_pools.enabled else None
+    if pool is not None:
+        return pool
+
+    q_desc, q_cat = _query_vectors([inp], weights)
+    with span("score_pool"):
+        rows = None
+        if inp.has_filters:
+            codes = (
+                None
+                if inp.categories is None
+                else [vi.category_code(c) for c in inp.categories]
+            )
+            rows = vi.filters.candidates(codes, inp.calories_between)
+        take = (lambda a: a) if rows is None else (lambda a: a[rows])
+        n = len(vi) if rows is None else len(rows)
+        limit = settings.rerank_pool_size
+        # a pool that gets pruned is shortlisted on the quantized text blocks
+        # and only its kept rows are rescored in float32
+        approx = vi.quantized and n > limit
+        scores = np.zeros((n, 4), dtype=np.float32)
+        if approx:
+            scores[:, 0] = vi.desc_q.dot(q_desc, rows)[:, 0]
+            if q_cat is not None:
+                scores[:, 1] = vi.cat_text_q.dot(q_cat, rows)[:, 0]
+        else:
+            scores[:, 0] = take(vi.desc) @ q_desc[0]
+            if q_cat is not None:
+                scores[:, 1] = take(vi.cat_text) @ q_cat[0]
+        if isinstance(weights, NumericWeights):
+            code = (
+                vi.category_code(inp.category_query)
+                if inp.category_query is not None
+                else -1
+            )
+            if code >= 0:
+                scores[:, 2] = take(vi.cat_codes) == code
+            if inp.calories_val is not None:
+                q_cal = calorie_vectors(
+                    [inp.calories_val], vi.calories_min, vi.calories_max
+                )[0]
+                scores[:, 3] = take(vi.cal_vec) @ q_cal
+        if rows is None:
+            rows = np.arange(len(vi))
+
+        active = [j for j in range(4) if scores[:, j].any()]
+        if n > limit and active:
+            per_end = max(1, limit // (2 * len(active)))
+            keep = np.unique(
+                np.concatenate(
+                    [
+                        np.argpartition(side * scores[:, j], per_end - 1)[:per_end]
+                        for j in active
+                        for side in (-1, 1)
+                    ]
+                )
+            )
+            rows, scores = rows[keep], scores[keep]
+        if approx:
+            scores[:, 0] = vi.desc[rows] @ q_desc[0]
+            if q_cat is not None:
+                scores[:, 1] = vi.cat_text[rows] @ q_cat[0]
+        pool = ScorePool(rows=rows, scores=scores)
+    if score_pools.enabled:
+        score_pools.put(key, pool)
+    return pool
 
+
+def rerank(
+    ctx: SearchCtx,
+    pool: ScorePool,
+    weights: Union[CategoryWeights, NumericWeights, None] = None,
+    k: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Rank ``pool`` under ``weights`` as one weighted sum over its space scores.
+
+    Args:
+        ctx (SearchCtx): The context ``pool`` was scored on.
+        pool (ScorePool): Output of ``score_pool``.
+        weights (CategoryWeights | NumericWeights, optional): Space weights.
+        k (int, optional): Rows returned. Defaults to ``settings.search_limit``.
+
+    Returns:
+        pd.DataFrame: ``_COLS`` plus ``id``, best first.
+    """
+    vi = ctx.vectors
+    k = min(settings.search_limit if k is None else k, len(pool))
+    if k == 0:
+        return vi.rows(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+    total = pool.scores @ np.asarray(_space_weights(weights), dtype=np.float32)
+    top, top_scores = _top_k(total[:, None], k)
+    return vi.rows(pool.rows[top[:, 0]], top_scores[:, 0])
+
+
+def live_search(
+    ctx: SearchCtx,
+    inp: SearchInputs,
+    weights: Union[CategoryWeights, NumericWeights, None] = None,
+) -> pd.DataFrame:
+    """
+    ``rerank(score_pool(...))``: the first call per query scores the pool,
+    every later call with other weights only re-ranks it.
+    """
+    with span("live_search"):
+        return rerank(ctx, score_pool(ctx, inp, weights), weights, inp.limit)
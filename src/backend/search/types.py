@@ -3,8 +3,27 @@ Types for semantic search using Superlinked.
 """
 
 from dataclasses import dataclass
-from typing import Optional
-import superlinked as sl
+from typing import FrozenSet, Optional, Tuple
+import numpy as np
+
+
+@dataclass(frozen=True)
+class QueryTemplates:
+    """
+    The four search query shapes, compiled once per index.
+
+    Attributes:
+        simple: Description-only similarity.
+        weighted: Description + category text, weights as params.
+        numeric: Description + calories, weights as params.
+        combined: Category filter + description + calories, weights as params.
+    """
+
+    simple: object
+    weighted: object
+    numeric: object
+    combined: object
+
 
 @dataclass(frozen=True)
 class SearchCtx:
@@ -19,6 +38,14 @@ class SearchCtx:
         cat_text_space: The text similarity space for categories.
         cat_cat_space: The categorical similarity space for categories.
         cal_space: The numerical similarity space for calories.
+        fingerprint: Fingerprint of the ingested rows and space config.
+        queries: Precompiled query templates for the search functions.
+        vectors: NumPy view of the index (``backend.search.vectors.VectorIndex``).
+        ann: Optional ANN candidate generator (``backend.search.ann.AnnIndex``);
+             when set, unfiltered searches are served from ``vectors``.
+        source: The Superlinked source rows are upserted into.
+        deleted_ids: ``fdc_id``s removed by ``sync_index`` but still held by
+                     the Superlinked source; filtered out of its results.
     """
     app: object
     index: object
@@ -27,6 +54,12 @@ class SearchCtx:
     cat_text_space: object
     cat_cat_space: object
     cal_space: object
+    fingerprint: Optional[str] = None
+    queries: Optional[QueryTemplates] = None
+    vectors: object = None
+    ann: object = None
+    source: object = None
+    deleted_ids: FrozenSet[int] = frozenset()
 
 
 @dataclass
@@ -38,10 +71,65 @@ class SearchInputs:
         description_query: The query string for the description.
         category_query: An optional query string for the category.
         calories_val: An optional integer value for calories.
+        limit: Maximum number of results, applied inside the query
+               (defaults to ``settings.search_limit``).
+        categories: Hard filter: only return items in one of these categories.
+        calories_between: Hard filter: inclusive ``(min, max)`` calories.
     """
     description_query: str
     category_query: Optional[str] = None
     calories_val: Optional[int] = None
+    limit: Optional[int] = None
+    categories: Optional[Tuple[str, ...]] = None
+    calories_between: Optional[Tuple[float, float]] = None
+
+    def __post_init__(self):
+        # lists are accepted, but the search caches key on the (hashable) fields
+        if self.categories is not None:
+            self.categories = tuple(self.categories)
+        if self.calories_between is not None:
+            self.calories_between = tuple(self.calories_between)
+
+    @property
+    def has_filters(self) -> bool:
+        return self.categories is not None or self.calories_between is not None
+
+
+@dataclass(frozen=True)
+class BatchResults:
+    """
+    Columnar top-k results of ``batch_search``; row ``i`` belongs to ``inputs[i]``.
+
+    Attributes:
+        ids: ``fdc_id`` of each hit, shape ``(n_queries, k)``.
+        scores: Similarity score of each hit, best first, shape ``(n_queries, k)``.
+    """
+
+    ids: np.ndarray
+    scores: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+@dataclass(frozen=True)
+class ScorePool:
+    """
+    Per-space similarities of one query against a candidate pool, from
+    ``score_pool``; any weight vector is ranked as ``scores @ weights``.
+
+    Attributes:
+        rows: ``VectorIndex`` row positions in the pool.
+        scores: ``(len(rows), 4)`` similarities per space, columns
+                ``(description, category text, category match, calories)``.
+    """
+
+    rows: np.ndarray
+    scores: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
 
 @dataclass
 class CategoryWeights:
@@ -66,3 +154,41 @@ class NumericWeights:
     """
     desc_weight: float = 1.0
     cal_weight:  float = 1.0
+
+
+@dataclass(frozen=True)
+class ParsedQuery:
+    """
+    A raw (possibly non-English) query turned into search fields by a
+    translator (``backend.search.understanding``).
+
+    Attributes:
+        raw: The query as typed.
+        description: English food description.
+        food_category: Category name, or ``None`` if unknown.
+        calories: Estimated kcal per 100 g, or ``None`` if unknown.
+    """
+
+    raw: str
+    description: str
+    food_category: Optional[str] = None
+    calories: Optional[float] = None
+
+    def to_inputs(
+        self, limit: Optional[int] = None, filter_category: bool = False
+    ) -> SearchInputs:
+        """
+        ``SearchInputs`` for ``combined_search``; with ``filter_category`` the
+        category is also a hard filter.
+        """
+        return SearchInputs(
+            description_query=self.description,
+            category_query=self.food_category,
+            calories_val=self.calories,
+            limit=limit,
+            categories=(
+                (self.food_category,)
+                if filter_category and self.food_category
+                else None
+            ),
+        )
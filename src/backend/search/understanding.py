@@ -0,0 +1,434 @@
+"""
+Query understanding: raw (possibly non-English) queries to search fields.
+
+A ``Translator`` turns a query such as "マンゴー", "جبنة" or "Pão" into an
+English description, a food category and a calories estimate
+(``ParsedQuery``), which ``ParsedQuery.to_inputs`` hands to
+``combined_search``. Translators are pluggable:
+
+- ``local``: an offline phrase table that passes unknown queries through
+  unchanged, the stand-in for tests, benchmarks and offline runs.
+- ``openai``: structured output from ``settings.translator_model`` through
+  ``instructor`` (optional dependencies, ``pip install .[translate]``; the
+  client reads ``OPENAI_API_KEY``).
+
+``QueryUnderstanding`` puts a persistent SQLite cache keyed by the raw query
+(``settings.translation_cache_path``) in front of the translator and fans
+the uncached queries of a batch out concurrently, at most
+``settings.translate_concurrency`` in flight.
+"""
+
+from __future__ import annotations
+import abc
+import asyncio
+import functools
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+import pandas as pd
+from ..config import settings
+from ..embedding.cache import CacheStats
+from ..metrics import span
+from .queries import combined_search
+from .types import NumericWeights, ParsedQuery, SearchCtx
+
+logger = logging.getLogger(__name__)
+
+# the category set the LLM picks from (USDA SR Legacy food groups)
+USDA_CATEGORIES = (
+    "Dairy and Egg Products",
+    "Spices and Herbs",
+    "Baby Foods",
+    "Fats and Oils",
+    "Poultry Products",
+    "Soups, Sauces, and Gravies",
+    "Sausages and Luncheon Meats",
+    "Breakfast Cereals",
+    "Fruits and Fruit Juices",
+    "Pork Products",
+    "Vegetables and Vegetable Products",
+    "Nut and Seed Products",
+    "Beef Products",
+    "Beverages",
+    "Finfish and Shellfish Products",
+    "Legumes and Legume Products",
+    "Lamb, Veal, and Game Products",
+    "Baked Products",
+    "Sweets",
+    "Cereal Grains and Pasta",
+    "Fast Foods",
+    "Meals, Entrees, and Side Dishes",
+    "Snacks",
+    "American Indian/Alaska Native Foods",
+    "Restaurant Foods",
+    "Branded Food Products Database",
+    "Quality Control Materials",
+    "Alcoholic Beverages",
+    "Dietary Supplements",
+)
+
+# raw query -> (description, food category, kcal per 100 g)
+DEFAULT_PHRASES: Dict[str, Tuple[str, str, float]] = {
+    "マンゴー": ("mango, raw", "Fruits and Fruit Juices", 60),
+    "たまご": ("egg, whole, raw", "Dairy and Egg Products", 143),
+    "جبنة": ("cheese", "Dairy and Egg Products", 402),
+    "pão": ("bread, white", "Baked Products", 266),
+}
+
+
+# ───────────────────────── translators ─────────────────────────────────
+class Translator(abc.ABC):
+    """
+    Base class of the query translators.
+
+    Attributes:
+        name: Translator name as used in ``settings.translator``.
+    """
+
+    name = "base"
+
+    @property
+    def key(self) -> str:
+        """Cache namespace: parses from different translators are kept apart."""
+        return self.name
+
+    @abc.abstractmethod
+    def translate(self, query: str) -> ParsedQuery:
+        """Parse one raw query."""
+
+    async def atranslate(self, query: str) -> ParsedQuery:
+        """Async ``translate``; the default runs it on a worker thread."""
+        return await asyncio.to_thread(self.translate, query)
+
+
+class LocalTranslator(Translator):
+    """Offline stand-in: a case-insensitive phrase table, others pass through."""
+
+    name = "local"
+
+    def __init__(self, phrases: Optional[Mapping[str, Tuple[str, str, float]]] = None):
+        phrases = DEFAULT_PHRASES if phrases is None else phrases
+        self.phrases = {k.casefold(): v for k, v in phrases.items()}
+
+    def translate(self, query: str) -> ParsedQuery:
+        hit = self.phrases.get(query.strip().casefold())
+        if hit is None:
+            return ParsedQuery(raw=query, description=query)
+        description, category, calories = hit
+        return ParsedQuery(
+            raw=query,
+            description=description,
+            food_category=category,
+            calories=float(calories),
+        )
+
+
+class OpenAITranslator(Translator):
+    """
+    Structured LLM output via ``instructor``; the category is constrained to
+    ``categories``.
+
+    Attributes:
+        model: Chat model name.
+        categories: Allowed ``food_category`` values.
+    """
+
+    name = "openai"
+
+    def __init__(
+        self, model: Optional[str] = None, categories: Sequence[str] = USDA_CATEGORIES
+    ):
+        self.model = model or settings.translator_model
+        self.categories = tuple(categories)
+        self._client = None
+        # AsyncOpenAI's connection pool is bound to the event loop it first ran
+        # on, and parse_many runs each batch on a fresh loop
+        self._aclients: Dict[asyncio.AbstractEventLoop, object] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.model}"
+
+    @staticmethod
+    def _libs():
+        try:
+            import instructor
+            import openai
+        except ImportError as exc:
+            raise ImportError(
+                "translator='openai' requires `pip install .[translate]` "
+                "(openai, instructor)"
+            ) from exc
+        return instructor, openai
+
+    @functools.cached_property
+    def _response_model(self):
+        from pydantic import Field, create_model
+
+        return create_model(
+            "FoodQuery",
+            description=(
+                str,
+                Field(..., description="Translate the food item to English."),
+            ),
+            food_category=(
+                Literal[self.categories],  # type: ignore[valid-type]
+                Field(..., description="The category of the food item in English."),
+            ),
+            calories=(
+                int,
+                Field(
+                    ..., description="The calories of the food item in kcal per 100g."
+                ),
+            ),
+        )
+
+    def _request(self, query: str) -> dict:
+        return {
+            "model": self.model,
+            "response_model": self._response_model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": f"Convert this food item to the given format:\n{query}",
+                }
+            ],
+        }
+
+    def _parsed(self, query: str, out) -> ParsedQuery:
+        return ParsedQuery(
+            raw=query,
+            description=out.description,
+            food_category=out.food_category,
+            calories=float(out.calories),
+        )
+
+    def translate(self, query: str) -> ParsedQuery:
+        if self._client is None:
+            instructor, openai = self._libs()
+            self._client = instructor.from_openai(openai.OpenAI())
+        return self._parsed(
+            query, self._client.chat.completions.create(**self._request(query))
+        )
+
+    def _async_client(self):
+        """The async client of the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._aclients = {
+                other: client
+                for other, client in self._aclients.items()
+                if not other.is_closed()
+            }
+            if loop not in self._aclients:
+                instructor, openai = self._libs()
+                self._aclients[loop] = instructor.from_openai(openai.AsyncOpenAI())
+            return self._aclients[loop]
+
+    async def atranslate(self, query: str) -> ParsedQuery:
+        client = self._async_client()
+        return self._parsed(
+            query, await client.chat.completions.create(**self._request(query))
+        )
+
+
+TRANSLATORS = {"local": LocalTranslator, "openai": OpenAITranslator}
+
+
+# ───────────────────────── persistent cache ────────────────────────────
+class TranslationCache:
+    """
+    ``(translator key, raw query) -> ParsedQuery`` in a SQLite table, shared
+    by threads (and, through the file, by processes and restarts).
+
+    Attributes:
+        path: Database file, or ``None`` for an in-memory database.
+    """
+
+    _CHUNK = 500  # bound on SQL parameters per statement
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = None if path is None else Path(path)
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            ":memory:" if self.path is None else str(self.path), check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        with self._lock, self._db:
+            if self.path is not None:
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " translator TEXT NOT NULL, query TEXT NOT NULL,"
+                " description TEXT NOT NULL, food_category TEXT, calories REAL,"
+                " PRIMARY KEY (translator, query))"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def stats(self) -> CacheStats:
+        return CacheStats(self._hits, self._misses, len(self))
+
+    def get_many(
+        self, translator: str, queries: Sequence[str]
+    ) -> Dict[str, ParsedQuery]:
+        """Cached parses of the unique ``queries`` that have one."""
+        queries = list(dict.fromkeys(queries))
+        found: Dict[str, ParsedQuery] = {}
+        with self._lock:
+            for i in range(0, len(queries), self._CHUNK):
+                chunk = queries[i : i + self._CHUNK]
+                rows = self._db.execute(
+                    "SELECT query, description, food_category, calories"
+                    " FROM translations WHERE translator = ?"
+                    f" AND query IN ({','.join('?' * len(chunk))})",
+                    [translator, *chunk],
+                )
+                found.update((row[0], ParsedQuery(*row)) for row in rows)
+            self._hits += len(found)
+            self._misses += len(queries) - len(found)
+        return found
+
+    def put_many(self, translator: str, parsed: Iterable[ParsedQuery]) -> None:
+        rows = [
+            (translator, p.raw, p.description, p.food_category, p.calories)
+            for p in parsed
+        ]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM translations")
+
+
+# ───────────────────────── pipeline stage ──────────────────────────────
+class QueryUnderstanding:
+    """
+    Cache-first, concurrent parsing of raw queries.
+
+    Attributes:
+        translator: Parses cache misses.
+        cache: Persistent parse cache.
+        concurrency: Translator calls in flight per batch.
+    """
+
+    def __init__(
+        self, translator: Translator, cache: TranslationCache, concurrency: int = 8
+    ):
+        self.translator = translator
+        self.cache = cache
+        self.concurrency = concurrency
+
+    async def aparse_many(self, queries: Sequence[str]) -> List[ParsedQuery]:
+        """
+        Parse ``queries`` (duplicates allowed), translating each uncached
+        unique query once and all of them concurrently.
+
+        Raises:
+            Exception: The first translator error; parses that succeeded are
+                cached before it is raised.
+        """
+        # SQLite calls (and the WAL commit) run off the event loop
+        found = await asyncio.to_thread(
+            self.cache.get_many, self.translator.key, queries
+        )
+        missing = [q for q in dict.fromkeys(queries) if q not in found]
+        if missing:
+            gate = asyncio.Semaphore(self.concurrency)
+
+            async def one(query: str) -> ParsedQuery:
+                async with gate:
+                    return await self.translator.atranslate(query)
+
+            with span("translate"):
+                parsed = await asyncio.gather(
+                    *(one(q) for q in missing), return_exceptions=True
+                )
+            ok = [p for p in parsed if isinstance(p, ParsedQuery)]
+            await asyncio.to_thread(self.cache.put_many, self.translator.key, ok)
+            found.update((p.raw, p) for p in ok)
+            errors = [p for p in parsed if isinstance(p, BaseException)]
+            if errors:
+                logger.warning(
+                    "%d of %d translations failed", len(errors), len(missing)
+                )
+                raise errors[0]
+        return [found[q] for q in queries]
+
+    def parse_many(self, queries: Sequence[str]) -> List[ParsedQuery]:
+        """Blocking ``aparse_many``, for callers without a running event loop."""
+        return asyncio.run(self.aparse_many(queries))
+
+    def parse(self, query: str) -> ParsedQuery:
+        return self.parse_many([query])[0]
+
+
+def make_translator(name: Optional[str] = None) -> Translator:
+    """Instantiate the translator ``name`` (default ``settings.translator``)."""
+    name = name or settings.translator
+    if name not in TRANSLATORS:
+        raise ValueError(
+            f"unknown translator {name!r}; expected one of {sorted(TRANSLATORS)}"
+        )
+    return TRANSLATORS[name]()
+
+
+@functools.lru_cache(maxsize=None)
+def get_understanding() -> QueryUnderstanding:
+    """Return the process-wide stage built from ``settings``."""
+    path = settings.translation_cache_path
+    return QueryUnderstanding(
+        make_translator(),
+        TranslationCache(
+            None if path is None else Path(__file__).resolve().parents[3] / path
+        ),
+        settings.translate_concurrency,
+    )
+
+
+def translated_search(
+    ctx: SearchCtx,
+    queries: Union[str, Sequence[str]],
+    p: NumericWeights,
+    limit: Optional[int] = None,
+    filter_category: bool = False,
+) -> List[pd.DataFrame]:
+    """
+    Parse raw queries and run ``combined_search`` on each.
+
+    Args:
+        ctx (SearchCtx): The search context.
+        queries (str | Sequence[str]): Raw queries in any language.
+        p (NumericWeights): Description / calories weights.
+        limit (int, optional): Results per query.
+        filter_category (bool): Also use the parsed category as a hard filter.
+
+    Returns:
+        List[pd.DataFrame]: One result frame per query, in order.
+    """
+    queries = [queries] if isinstance(queries, str) else list(queries)
+    parsed = get_understanding().parse_many(queries)
+    return [
+        combined_search(ctx, q.to_inputs(limit, filter_category), p) for q in parsed
+    ]
@@ -0,0 +1,228 @@
+"""
+NumPy view of the ingested index, for vectorised scoring outside Superlinked.
+
+Each of the four spaces is kept as its own block so any weight vector can be
+applied at query time:
+
+- ``desc`` / ``cat_text``: unit-norm text embeddings, scored by dot product.
+- ``cat_codes``: category per row, scored 1.0 on an exact match.
+- ``cal_vec``: calories mapped onto a quarter circle over
+  ``[calories_min, calories_max]`` (as ``sl.NumberSpace`` in SIMILAR mode
+  does), scored by dot product.
+"""
+
+from __future__ import annotations
+import logging
+from dataclasses import dataclass
+from typing import Optional, Sequence
+import numpy as np
+import pandas as pd
+from ..config import settings
+from .filters import FilterIndex, build_filter_index
+from .quantize import QuantizedMatrix, quantize
+
+logger = logging.getLogger(__name__)
+
+
+def is_unit(m: np.ndarray) -> bool:
+    """Whether every row of ``m`` has (close to) unit L2 norm."""
+    return m.size == 0 or bool(np.allclose(np.linalg.norm(m, axis=-1), 1.0, atol=1e-3))
+
+
+def unit_rows(m: np.ndarray) -> np.ndarray:
+    """Return ``m`` with L2-normalised rows, without copying if it already is."""
+    m = np.asarray(m, dtype=np.float32)
+    if is_unit(m):
+        return m
+    return m / np.maximum(np.linalg.norm(m, axis=-1, keepdims=True), 1e-12)
+
+
+def calorie_vectors(values, lo: float, hi: float) -> np.ndarray:
+    """Map calorie values onto unit 2-vectors; nearby values have similar vectors."""
+    x = np.clip(
+        (np.asarray(values, dtype=np.float32) - lo) / max(hi - lo, 1e-9), 0.0, 1.0
+    )
+    theta = x * (np.pi / 2)
+    return np.stack([np.cos(theta), np.sin(theta)], axis=-1).astype(np.float32)
+
+
+@dataclass(frozen=True)
+class VectorIndex:
+    """
+    Per-space matrices for every ingested row, aligned by position.
+
+    Attributes:
+        ids: ``fdc_id`` per row.
+        desc: Description embeddings, shape ``(n, d)``.
+        cat_text: Food-category embeddings, shape ``(n, d)``.
+        categories: Category names; ``cat_codes`` index into this tuple.
+        cat_codes: Category code per row (``-1`` if unknown).
+        calories: Calories per row.
+        cal_vec: ``calorie_vectors`` of ``calories``, shape ``(n, 2)``.
+        descriptions: Description text per row (NumPy, or an Arrow array
+                      mapped from the shared store).
+        calories_min: Lower bound of the calorie space.
+        calories_max: Upper bound of the calorie space.
+        filters: Category / calorie postings for hard pre-filters.
+        hashes: Content hash per ingested row, for incremental sync.
+        desc_q: Reduced-precision copy of ``desc`` for shortlisting, if enabled
+                (memory-mapped from the store when there is one).
+        cat_text_q: Reduced-precision copy of ``cat_text``, if enabled.
+    """
+
+    ids: np.ndarray
+    desc: np.ndarray
+    cat_text: np.ndarray
+    categories: tuple
+    cat_codes: np.ndarray
+    calories: np.ndarray
+    cal_vec: np.ndarray
+    descriptions: np.ndarray
+    calories_min: float
+    calories_max: float
+    filters: FilterIndex
+    hashes: np.ndarray
+    desc_q: Optional[QuantizedMatrix] = None
+    cat_text_q: Optional[QuantizedMatrix] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def quantized(self) -> bool:
+        """Whether text scores can be shortlisted on quantized blocks."""
+        return self.desc_q is not None
+
+    def category_code(self, category: Optional[str]) -> int:
+        """Return the code of ``category`` or ``-1`` if it is not in the index."""
+        try:
+            return self.categories.index(category)
+        except ValueError:
+            return -1
+
+    def item_matrix(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Concatenate the four space blocks per row:
+        ``[desc | cat_text | category one-hot | cal_vec]``.
+
+        The dot product with a ``query_matrix`` row equals the weighted sum of
+        the per-space similarities, so one matrix serves every weight setting.
+        """
+        pick = slice(None) if rows is None else rows
+        codes = self.cat_codes[pick]
+        onehot = np.zeros((len(codes), len(self.categories)), dtype=np.float32)
+        known = np.nonzero(codes >= 0)[0]
+        onehot[known, codes[known]] = 1.0
+        return np.hstack(
+            [self.desc[pick], self.cat_text[pick], onehot, self.cal_vec[pick]]
+        )
+
+    def query_matrix(
+        self,
+        q_desc: np.ndarray,
+        q_cat: Optional[np.ndarray],
+        codes: Sequence[int],
+        cal_values: Sequence[Optional[float]],
+        weights: Sequence[float],
+    ) -> np.ndarray:
+        """
+        Build one concatenated query row per query, matching ``item_matrix``.
+
+        Args:
+            q_desc (np.ndarray): Description query embeddings, ``(b, d)``.
+            q_cat (np.ndarray, optional): Category-text query embeddings.
+            codes (Sequence[int]): Category code per query (negative for none).
+            cal_values (Sequence[float | None]): Calories per query.
+            weights (Sequence[float]): ``(desc, cat_text, category, calories)`` weights.
+        """
+        w_desc, w_cat_text, w_cat, w_cal = weights
+        b = len(q_desc)
+        onehot = np.zeros((b, len(self.categories)), dtype=np.float32)
+        for i, code in enumerate(codes):
+            if code >= 0:
+                onehot[i, code] = w_cat
+        has_cal = np.array([c is not None for c in cal_values], dtype=np.float32)[
+            :, None
+        ]
+        q_cal = calorie_vectors(
+            [c or 0 for c in cal_values], self.calories_min, self.calories_max
+        )
+        cat_block = np.zeros_like(q_desc) if q_cat is None else w_cat_text * q_cat
+        return np.hstack(
+            [w_desc * q_desc, cat_block, onehot, w_cal * has_cal * q_cal]
+        ).astype(np.float32)
+
+    def rows(self, positions: np.ndarray, scores: np.ndarray) -> pd.DataFrame:
+        """Materialise result rows in the column layout of the search functions."""
+        if isinstance(self.descriptions, np.ndarray):
+            descriptions = self.descriptions[positions]
+        else:
+            descriptions = self.descriptions.take(np.asarray(positions)).to_numpy(
+                zero_copy_only=False
+            )
+        return pd.DataFrame(
+            {
+                "description": descriptions,
+                # code -1 (unknown) picks the trailing None
+                "food_category": np.asarray(self.categories + (None,), dtype=object)[
+                    self.cat_codes[positions]
+                ],
+                "calories": self.calories[positions],
+                "similarity_score": scores,
+                "id": self.ids[positions].astype(str),
+            }
+        )
+
+
+def build_vector_index(
+    ids: np.ndarray,
+    desc: np.ndarray,
+    cat_text: np.ndarray,
+    food_categories: Sequence[str],
+    categories: Sequence[str],
+    calories: np.ndarray,
+    descriptions: Sequence[str],
+    calories_min: float,
+    calories_max: float,
+    hashes: np.ndarray,
+    precision: Optional[str] = None,
+) -> VectorIndex:
+    """
+    Assemble a ``VectorIndex`` from ingested columns and text embeddings.
+
+    Embeddings are only copied if they are not unit-norm already, so
+    memory-mapped snapshot arrays stay memory-mapped. With ``precision``
+    ``"float16"`` / ``"int8"`` (default ``settings.vector_precision``) the
+    text blocks also get a quantized copy for candidate shortlisting;
+    ``"float32"`` skips it, e.g. when the copy is mapped from the store instead.
+    The float32 blocks are kept for rescoring, so a quantized copy built here
+    adds to resident memory unless the float32 ones are memory-mapped.
+    """
+    precision = precision or settings.vector_precision
+    if precision != "float32" and not isinstance(desc, np.memmap):
+        logger.warning(
+            "%s copies are built next to in-memory float32 vectors; map them "
+            "from the snapshot store (use_snapshot) to save memory",
+            precision,
+        )
+    calories = np.asarray(calories, dtype=np.float32)
+    cat_codes = pd.Categorical(
+        food_categories, categories=list(categories)
+    ).codes.astype(np.int32)
+    desc, cat_text = unit_rows(desc), unit_rows(cat_text)
+    return VectorIndex(
+        ids=np.asarray(ids, dtype=np.int64),
+        desc=desc,
+        cat_text=cat_text,
+        categories=tuple(categories),
+        cat_codes=cat_codes,
+        calories=calories,
+        cal_vec=calorie_vectors(calories, calories_min, calories_max),
+        descriptions=np.asarray(descriptions, dtype=object),
+        calories_min=float(calories_min),
+        calories_max=float(calories_max),
+        filters=build_filter_index(cat_codes, len(categories), calories),
+        hashes=np.asarray(hashes, dtype=np.uint64),
+        desc_q=quantize(desc, precision),
+        cat_text_q=quantize(cat_text, precision),
+    )
@@ -0,0 +1,71 @@
+"""
+Run the search server: ``python -m backend.server [--host H] [--port P] [--workers N]``.
+
+With ``--workers N`` (N > 1) the index is ingested once in a short-lived
+process, which writes the shared store, and N worker processes then open
+that store read-only and serve on the same port (``SO_REUSEPORT``).
+"""
+
+import argparse
+import logging
+import multiprocessing
+from ..config import settings
+from .app import create_app, web
+
+
+def _prepare_store() -> None:
+    from ..ingest.loader import build_superlinked_app
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(levelname)s %(name)s: %(message)s"
+    )
+    build_superlinked_app(use_snapshot=True)
+
+
+def _serve_worker(host: str, port: int) -> None:
+    from ..ingest.store import open_store
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(levelname)s %(name)s: %(message)s"
+    )
+    web.run_app(create_app(build=open_store), host=host, port=port, reuse_port=True)
+
+
+def main():
+    """Build the shared search context and serve the JSON API."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.server_workers,
+        help="worker processes sharing the memory-mapped store",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO, format="%(levelname)s %(name)s: %(message)s"
+    )
+    if args.workers <= 1:
+        web.run_app(create_app(), host=args.host, port=args.port)
+        return
+
+    # spawn: workers must not inherit the ingest process' memory
+    mp = multiprocessing.get_context("spawn")
+    prepare = mp.Process(target=_prepare_store)
+    prepare.start()
+    prepare.join()
+    if prepare.exitcode != 0:
+        raise SystemExit("building the search store failed")
+    workers = [
+        mp.Process(target=_serve_worker, args=(args.host, args.port))
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
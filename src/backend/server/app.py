@@ -0,0 +1,283 @@
+"""
+JSON search API over a single shared ``SearchCtx``.
+
+Endpoints:
+
+- ``POST /search/{mode}`` with ``mode`` one of ``simple``, ``weighted``,
+  ``numeric``, ``combined``. The body holds the ``SearchInputs`` fields plus
+  the weights of that mode, e.g.
+  ``{"description_query": "apple", "category_query": "dessert", "cat_weight": 0.5}``.
+  With ``"translate": true`` the ``description_query`` is a raw query in any
+  language; it is parsed first and fills the description, plus the category
+  and calories unless the body sets them.
+- ``POST /translate`` with ``{"queries": [...]}``: the parsed fields per query.
+- ``GET /health``: index size and cache / batching counters.
+- ``GET /metrics``: per-stage latency histograms in Prometheus text format.
+
+Query embeddings of concurrent requests are computed together by a
+``MicroBatcher``; the (synchronous) search functions then run on a thread
+pool with every query vector already cached.
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, fields, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    from aiohttp import web
+except ImportError as exc:
+    raise ImportError(
+        "the search server requires `pip install .[server]` (aiohttp)"
+    ) from exc
+
+from ..config import settings
+from ..embedding.encoder import warm_up
+from ..metrics import profiled, registry, span
+from ..search.cache import get_query_vectors, get_search_results
+from ..search.queries import (
+    combined_search,
+    encode_queries,
+    numeric_search,
+    simple_search,
+    weighted_search,
+)
+from ..search.types import CategoryWeights, NumericWeights, SearchCtx, SearchInputs
+from ..search.understanding import get_understanding
+from .batcher import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+CTX = web.AppKey("ctx", SearchCtx)
+BATCHER = web.AppKey("batcher", MicroBatcher)
+EXECUTOR = web.AppKey("executor", ThreadPoolExecutor)
+
+Weights = Union[CategoryWeights, NumericWeights, None]
+
+# mode -> (search function, weights type)
+MODES = {
+    "simple": (simple_search, None),
+    "weighted": (weighted_search, CategoryWeights),
+    "numeric": (numeric_search, NumericWeights),
+    "combined": (combined_search, NumericWeights),
+}
+
+
+# ───────────────────────── request handling ────────────────────────────
+def parse_request(mode: str, body: Dict[str, Any]) -> Tuple[SearchInputs, Weights]:
+    """
+    Build the search arguments of ``mode`` from a JSON body.
+
+    Raises:
+        ValueError: If ``description_query`` is missing, a field has the wrong
+            type or ``limit`` is below 1. Larger limits than
+            ``settings.server_max_limit`` are clamped to it.
+    """
+    if not isinstance(body, dict) or not isinstance(body.get("description_query"), str):
+        raise ValueError("body must be an object with a string 'description_query'")
+    categories = body.get("categories")
+    if categories is not None and (
+        not isinstance(categories, list)
+        or not all(isinstance(c, str) for c in categories)
+    ):
+        raise ValueError("'categories' must be a list of strings")
+    calories_between = body.get("calories_between")
+    if calories_between is not None and (
+        not isinstance(calories_between, list) or len(calories_between) != 2
+    ):
+        raise ValueError("'calories_between' must be [low, high]")
+    limit = None if body.get("limit") is None else int(body["limit"])
+    if limit is not None:
+        if limit < 1:
+            raise ValueError("'limit' must be at least 1")
+        limit = min(limit, settings.server_max_limit)
+    inp = SearchInputs(
+        description_query=body["description_query"],
+        category_query=body.get("category_query"),
+        calories_val=(
+            None if body.get("calories_val") is None else float(body["calories_val"])
+        ),
+        limit=limit,
+        categories=categories,
+        calories_between=(
+            None
+            if calories_between is None
+            else tuple(float(v) for v in calories_between)
+        ),
+    )
+    weights_type = MODES[mode][1]
+    if weights_type is None:
+        return inp, None
+    weights = weights_type(
+        **{f.name: float(body[f.name]) for f in fields(weights_type) if f.name in body}
+    )
+    return inp, weights
+
+
+def query_texts(mode: str, inp: SearchInputs) -> List[str]:
+    """Texts the search of ``mode`` embeds (the category text only in weighted mode)."""
+    texts = [inp.description_query]
+    if mode == "weighted" and inp.category_query:
+        texts.append(inp.category_query)
+    return texts
+
+
+async def translate_inputs(inp: SearchInputs) -> SearchInputs:
+    """Replace the raw ``description_query`` of ``inp`` with its parsed fields."""
+    parsed = (await get_understanding().aparse_many([inp.description_query]))[0]
+    return replace(
+        inp,
+        description_query=parsed.description,
+        category_query=(
+            inp.category_query
+            if inp.category_query is not None
+            else parsed.food_category
+        ),
+        calories_val=(
+            inp.calories_val if inp.calories_val is not None else parsed.calories
+        ),
+    )
+
+
+def run_search(
+    ctx: SearchCtx, mode: str, inp: SearchInputs, weights: Weights
+) -> Dict[str, Any]:
+    """Run one search synchronously and return its JSON payload."""
+    search = MODES[mode][0]
+    with profiled(mode):
+        out = search(ctx, inp) if weights is None else search(ctx, inp, weights)
+    payload: Dict[str, Any] = {}
+    if mode == "numeric":
+        out, payload["mean_calories"] = out
+        payload["mean_calories"] = float(payload["mean_calories"])
+    payload["results"] = out.to_dict(orient="records")
+    return payload
+
+
+def _bad_request(message: str) -> web.HTTPBadRequest:
+    return web.HTTPBadRequest(
+        text=json.dumps({"error": message}), content_type="application/json"
+    )
+
+
+async def handle_search(request: web.Request) -> web.Response:
+    mode = request.match_info["mode"]
+    if mode not in MODES:
+        raise web.HTTPNotFound(
+            text=json.dumps({"error": f"unknown mode {mode!r}"}),
+            content_type="application/json",
+        )
+    try:
+        body = await request.json()
+        inp, weights = parse_request(mode, body)
+    except (ValueError, TypeError) as exc:
+        raise _bad_request(str(exc))
+
+    app = request.app
+    if body.get("translate"):
+        inp = await translate_inputs(inp)
+    with span("embed.batched"):
+        await app[BATCHER].embed(query_texts(mode, inp))
+    loop = asyncio.get_running_loop()
+    payload = await loop.run_in_executor(
+        app[EXECUTOR], run_search, app[CTX], mode, inp, weights
+    )
+    return web.json_response(payload)
+
+
+async def handle_translate(request: web.Request) -> web.Response:
+    try:
+        body = await request.json()
+    except ValueError as exc:
+        raise _bad_request(str(exc))
+    queries = body.get("queries") if isinstance(body, dict) else None
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        raise _bad_request("body must be an object with a list of strings 'queries'")
+    parsed = await get_understanding().aparse_many(queries)
+    return web.json_response({"results": [asdict(p) for p in parsed]})
+
+
+async def handle_health(request: web.Request) -> web.Response:
+    app = request.app
+    ctx = app[CTX]
+    query_vectors = get_query_vectors()
+    return web.json_response(
+        {
+            "rows": None if ctx.vectors is None else len(ctx.vectors),
+            "fingerprint": ctx.fingerprint,
+            "batching": app[BATCHER].stats(),
+            "query_vectors": {
+                "hit_rate": query_vectors.stats().hit_rate,
+                "size": len(query_vectors),
+            },
+            "search_results": {"hit_rate": get_search_results().stats().hit_rate},
+            "translations": {"hit_rate": get_understanding().cache.stats().hit_rate},
+        }
+    )
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(
+        text=registry.to_prometheus(), content_type="text/plain", charset="utf-8"
+    )
+
+
+# ───────────────────────── application ─────────────────────────────────
+def create_app(
+    ctx: Optional[SearchCtx] = None,
+    build: Optional[Callable[[], Optional[SearchCtx]]] = None,
+) -> web.Application:
+    """
+    Create the aiohttp application.
+
+    Args:
+        ctx (SearchCtx, optional): Context to serve. By default one is made
+            by ``build`` at startup and shared by all requests.
+        build (Callable, optional): Context factory, ``build_superlinked_app``
+            by default; worker processes pass ``open_store``.
+    """
+    app = web.Application()
+    app[BATCHER] = MicroBatcher(
+        encode_queries,
+        max_batch=settings.batch_max_size,
+        max_wait=settings.batch_max_wait_ms / 1000,
+    )
+    app[EXECUTOR] = ThreadPoolExecutor(
+        max_workers=settings.server_threads, thread_name_prefix="search"
+    )
+
+    async def _startup(app: web.Application) -> None:
+        warm_up()
+        if ctx is not None:
+            app[CTX] = ctx
+            return
+        logger.info("building search context")
+        if build is None:
+            from ..ingest.loader import build_superlinked_app
+
+            factory = build_superlinked_app
+        else:
+            factory = build
+        built = await asyncio.get_running_loop().run_in_executor(None, factory)
+        if built is None:
+            raise RuntimeError(
+                "no search context to serve; "
+                "run build_superlinked_app once to write the store"
+            )
+        app[CTX] = built
+        logger.info("serving %s rows", len(app[CTX].vectors))
+
+    async def _cleanup(app: web.Application) -> None:
+        app[BATCHER].close()
+        app[EXECUTOR].shutdown(wait=False)
+
+    app.on_startup.append(_startup)
+    app.on_cleanup.append(_cleanup)
+    app.router.add_post("/search/{mode}", handle_search)
+    app.router.add_post("/translate", handle_translate)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    return app
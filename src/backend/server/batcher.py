@@ -0,0 +1,95 @@
+"""
+Micro-batching of query embeddings across concurrent requests.
+"""
+
+from __future__ import annotations
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class MicroBatcher:
+    """
+    Groups the query texts of concurrent requests into one model call.
+
+    Each request awaits ``embed`` with its texts; texts arriving within
+    ``max_wait`` seconds of the first one (or until ``max_batch`` texts are
+    pending) are deduplicated and encoded together on a single worker
+    thread. ``encode`` is expected to fill the query-vector cache, so the
+    search functions that run afterwards find every vector cached.
+
+    Attributes:
+        max_batch: Pending texts that trigger an immediate flush.
+        max_wait: Seconds the first pending text waits for company.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], object],
+        max_batch: int,
+        max_wait: float,
+        executor: Optional[Executor] = None,
+    ):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._encode = encode
+        # one thread: batches run back to back instead of contending for the model
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="embed"
+        )
+        self._pending: List[Tuple[Sequence[str], asyncio.Future]] = []
+        self._n_pending = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches = 0
+        self._texts = 0
+
+    async def embed(self, texts: Sequence[str]) -> None:
+        """Wait until ``texts`` have been encoded as part of a batch."""
+        texts = [t for t in texts if t]
+        if not texts:
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((texts, future))
+        self._n_pending += len(texts)
+        if self._n_pending >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._n_pending = self._pending, [], 0
+        if not batch:
+            return
+        texts = list(dict.fromkeys(t for request, _ in batch for t in request))
+        self._batches += 1
+        self._texts += len(texts)
+        done = asyncio.get_running_loop().run_in_executor(
+            self._executor, self._encode, texts
+        )
+
+        def _resolve(task: asyncio.Future) -> None:
+            for _, future in batch:
+                if future.done():
+                    continue
+                if task.exception() is not None:
+                    future.set_exception(task.exception())
+                else:
+                    future.set_result(None)
+
+        done.add_done_callback(_resolve)
+
+    def stats(self) -> Dict[str, float]:
+        """Batches flushed, unique texts encoded and the mean batch size."""
+        return {
+            "batches": self._batches,
+            "texts": self._texts,
+            "mean_batch": self._texts / self._batches if self._batches else 0.0,
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
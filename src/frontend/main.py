@@ -1,13 +1,23 @@
+import threading
+from dataclasses import replace
+import pandas as pd
 import streamlit as st
 st.set_page_config(page_title="Semantic Food Search", page_icon="🥦")
 
-from backend.ingest.loader import load_data, build_superlinked_app
-from backend.features.umap import plot_umap_scatter, load_umap_df, subset_top_n_umap
+from backend.embedding.encoder import warm_up
+from backend.ingest.loader import (
+    load_data,
+    build_superlinked_app,
+    data_version,
+    sync_index,
+)
 from backend.search.queries import (
     simple_search,
     weighted_search,
     numeric_search,
     combined_search,
+    live_search,
+    search_vectors,
 )
 from backend.search.types import (
     SearchCtx,
@@ -17,26 +27,56 @@ from backend.search.types import (
 )
 
 from backend.config import settings
+from backend.metrics import profiled, registry, span
 
 # ───────────────────────── setup ─────────────────────────
 
-@st.cache_data()
+# cache_resource: one shared frame per process (cache_data would hand every
+# rerun its own unpickled copy); nothing below mutates it
+@st.cache_resource
 def get_df():
-    """Load the food database from a Parquet file."""
+    """Load the food metadata store from the Parquet file."""
     return load_data()
 
 @st.cache_resource
 def build_context():
+    warm_up()  # model loads in the background while the data is read
     df = get_df()
     ctx = build_superlinked_app(df)
-    return df, ctx
+    # UMAP (numba) is only needed in Weighted mode: load + warm it off the request path
+    threading.Thread(target=_warm_umap, name="umap-warm-up", daemon=True).start()
+    return {"df": df, "ctx": ctx, "version": data_version(), "lock": threading.Lock()}
 
-@st.cache_data(show_spinner=False)
+def _warm_umap():
+    from backend.features.umap import get_umap_model
+    get_umap_model()
+
+@st.cache_resource(show_spinner=False)
 def get_umap():
-    return load_umap_df()
+    from backend.features.umap import load_umap_df
+    return load_umap_df(get_df())
+
 
+def current_context():
+    """Return (df, ctx), incrementally syncing the index if the data file changed."""
+    state = build_context()
+    if data_version() != state["version"]:
+        with state["lock"]:
+            version = data_version()
+            if version != state["version"]:
+                get_df.clear()
+                df = get_df()
+                state["ctx"], changes = sync_index(state["ctx"], df)
+                state["df"], state["version"] = df, version
+                if changes:
+                    from backend.features.umap import clear_umap_images
 
-df, ctx = build_context()
+                    get_umap.clear()
+                    clear_umap_images()
+    return state["df"], state["ctx"]
+
+
+df, ctx = current_context()
 
 st.title("🥦 Semantic Search on Food Database")
 mode = st.sidebar.radio("Search Mode", ["Simple", "Weighted", "Numeric", "Combined"])
@@ -44,6 +84,45 @@ mode = st.sidebar.radio("Search Mode", ["Simple", "Weighted", "Numeric", "Combin
 
 # ───────────────────────── UI Components ─────────────────────────
 
+def render_umap(umap_top: pd.DataFrame, query_point=None):
+    """Draw the UMAP scatter with the renderer chosen by ``settings.umap_render``."""
+    from backend.features.umap import (
+        plot_umap_scatter,
+        umap_chart_data,
+        umap_chart_spec,
+        umap_png,
+    )
+
+    if settings.umap_render == "chart":
+        spec = umap_chart_spec(umap_chart_data(umap_top, query_point))
+        st.vega_lite_chart(spec, use_container_width=True)
+    elif settings.umap_render == "image":
+        st.image(umap_png(umap_top, query_point))
+    else:
+        import matplotlib.pyplot as plt
+        fig = plot_umap_scatter(umap_top, query=query_point)
+        st.pyplot(fig)
+        plt.close(fig)
+
+
+def submitted_query(key: str, submitted: bool, inputs: SearchInputs):
+    """
+    With ``settings.live_weights``, keep the last submitted query of a mode in
+    the session, so the weight sliders (outside the form) re-rank it on every
+    rerun without a resubmit. Otherwise only a submit runs a search.
+    """
+    if not settings.live_weights:
+        return inputs if submitted else None
+    if submitted:
+        st.session_state[key] = inputs
+    return st.session_state.get(key)
+
+
+def weight_sliders(first: str, second: str):
+    """Render the two weight sliders of a mode and return their values."""
+    return st.slider(first, -3.0, 3.0, 1.0), st.slider(second, -3.0, 3.0, 1.0)
+
+
 def render_simple_ui(ctx: SearchCtx):
     """Render the UI for simple search mode."""
     with st.form("simple_search_form"):
@@ -59,18 +138,42 @@ def render_weighted_ui(ctx: SearchCtx):
     with st.form("weighted_search_form"):
         q = st.text_input("Food description", "apple")
         cat = st.text_input("Food category", "dessert")
-        dw = st.slider("Description weight", -3.0, 3.0, 1.0)
-        cw = st.slider("Category weight",    -3.0, 3.0, 1.0)
+        if not settings.live_weights:  # live sliders re-rank outside the form
+            dw, cw = weight_sliders("Description weight", "Category weight")
         submitted = st.form_submit_button("🔍 Search")
-    if submitted:
-        inputs = SearchInputs(description_query=q, category_query=cat)
+    if settings.live_weights:
+        dw, cw = weight_sliders("Description weight", "Category weight")
+    inputs = submitted_query(
+        "weighted_query",
+        submitted,
+        SearchInputs(description_query=q, category_query=cat),
+    )
+    if inputs is not None:
+        q = inputs.description_query
         params = CategoryWeights(desc_weight=dw, cat_weight=cw)
-        results = weighted_search(ctx, inputs, params)
-        st.dataframe(results)
-        df_umap = get_umap()
-        df_umap_top10 = subset_top_n_umap(df_umap, results, top_n=settings.umap_top_n_food_items)
+        search = live_search if settings.live_weights else weighted_search
+        results = search(ctx, inputs, params)
+        st.dataframe(results.drop(columns="id"))  # the id is kept for UMAP
+        from backend.features.umap import (
+            get_umap_model,
+            project_query,
+            project_top_n_umap,
+        )
+
+        with span("umap.project"):
+            df_umap = get_umap()
+            model = get_umap_model()
+            df_umap_top10 = project_top_n_umap(
+                ctx, df_umap, results, model, top_n=settings.umap_top_n_food_items
+            )
+            query_point = None
+            if model is not None:
+                # the layout is unweighted; the sliders only re-rank the results
+                query_vector = search_vectors(ctx, [inputs], CategoryWeights(1.0, 1.0))
+                query_point = project_query(model, query_vector, f"“{q}”")
         st.write("#### UMAP Visualization of Top-10 Results")
-        st.pyplot(plot_umap_scatter(df_umap_top10))
+        with span("umap.render"):
+            render_umap(df_umap_top10, query_point)
 
 
 def render_numeric_ui(ctx: SearchCtx):
@@ -78,13 +181,24 @@ def render_numeric_ui(ctx: SearchCtx):
     with st.form("numeric_search_form"):
         q = st.text_input("Food description", "chicken")
         cal = st.number_input("Calories per 100 g", min_value=settings.calories_min, max_value=settings.calories_max, value=200)
-        dw = st.slider("Description weight", min_value=-3.0, max_value=3.0, value=1.0)
-        cw = st.slider("Calories weight",    min_value=-3.0, max_value=3.0, value=1.0)
+        if not settings.live_weights:
+            dw, cw = weight_sliders("Description weight", "Calories weight")
         submitted = st.form_submit_button("🔍 Search")
-    if submitted:
-        inputs = SearchInputs(description_query=q, calories_val=cal)
+    if settings.live_weights:
+        dw, cw = weight_sliders("Description weight", "Calories weight")
+    inputs = submitted_query(
+        "numeric_query",
+        submitted,
+        SearchInputs(description_query=q, calories_val=cal),
+    )
+    if inputs is not None:
         params = NumericWeights(desc_weight=dw, cal_weight=cw)
-        top10, mean_cal = numeric_search(ctx, inputs, params)
+        if settings.live_weights:
+            top10 = live_search(ctx, replace(inputs, limit=10), params)
+            top10 = top10.drop(columns="id")
+            mean_cal = top10["calories"].mean() if not top10.empty else 0.0
+        else:
+            top10, mean_cal = numeric_search(ctx, inputs, params)
         st.dataframe(top10)
         st.bar_chart(top10.set_index("description")["calories"])
         st.write(f"Mean calories (top-10): **{mean_cal:.1f}**")
@@ -97,25 +211,43 @@ def render_combined_ui(ctx: SearchCtx, df):
         cat_filter = st.selectbox("Food category filter", cats)
         q = st.text_input("Food description")
         cal = st.number_input("Calories per 100 g", min_value=settings.calories_min, max_value=settings.calories_max, value=200)
-        dw = st.slider("Description weight", -3.0, 3.0, 1.0)
-        cw = st.slider("Calories weight",    -3.0, 3.0, 1.0)
+        if not settings.live_weights:
+            dw, cw = weight_sliders("Description weight", "Calories weight")
         submitted = st.form_submit_button("🔍 Search")
-    if submitted:
-        inputs = SearchInputs(description_query=q, category_query=cat_filter, calories_val=cal)
+    if settings.live_weights:
+        dw, cw = weight_sliders("Description weight", "Calories weight")
+    inputs = submitted_query(
+        "combined_query",
+        submitted,
+        SearchInputs(
+            description_query=q,
+            category_query=cat_filter,
+            calories_val=cal,
+            categories=(cat_filter,),
+        ),
+    )
+    if inputs is not None:
         params = NumericWeights(desc_weight=dw, cal_weight=cw)
-        results = combined_search(ctx, inputs, params)
+        if settings.live_weights:
+            results = live_search(ctx, inputs, params).drop(columns="id")
+        else:
+            results = combined_search(ctx, inputs, params)
         st.dataframe(results)
 
 
 # ───────────────────────── Dispatcher ─────────────────────────
 
-if mode == "Simple":
-    render_simple_ui(ctx)
-elif mode == "Weighted":
-    render_weighted_ui(ctx)
-elif mode == "Numeric":
-    render_numeric_ui(ctx)
-else:
-    render_combined_ui(ctx, df)
+with profiled(mode.lower()):
+    if mode == "Simple":
+        render_simple_ui(ctx)
+    elif mode == "Weighted":
+        render_weighted_ui(ctx)
+    elif mode == "Numeric":
+        render_numeric_ui(ctx)
+    else:
+        render_combined_ui(ctx, df)
+
+with st.sidebar.expander("Stage timings"):
+    st.dataframe(pd.DataFrame(registry.summary()).T)
 
 # To run: streamlit run src/frontend/main.py
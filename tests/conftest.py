@@ -0,0 +1,34 @@
+"""
+Shared fixtures: every test writes its snapshots, ANN indexes and caches
+under a temporary directory, and the Superlinked contexts are built once
+per session from the bundled sample data.
+"""
+
+import pytest
+from backend.config import settings
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_paths(tmp_path_factory):
+    root = tmp_path_factory.mktemp("data")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(settings, "snapshot_dir", root / "snapshot")
+        mp.setattr(settings, "ann_dir", root / "ann")
+        mp.setattr(settings, "embedding_cache_path", None)
+        mp.setattr(settings, "translation_cache_path", None)
+        yield root
+
+
+@pytest.fixture(scope="session")
+def food_df():
+    from backend.ingest.loader import load_data
+
+    return load_data()
+
+
+@pytest.fixture(scope="session")
+def ctx(food_df):
+    """A Superlinked context over the sample data (loads the embedding model)."""
+    from backend.ingest.loader import build_superlinked_app
+
+    return build_superlinked_app(food_df)
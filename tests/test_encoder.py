@@ -0,0 +1,49 @@
+import numpy as np
+from backend.embedding.cache import get_embedding_cache
+from backend.embedding.encoder import encode_texts
+from backend.embedding.runtime import get_runtime
+
+
+def test_other_models_encode_through_their_own_runtime(monkeypatch):
+    from huggingface_hub import snapshot_download
+
+    default = get_runtime()
+    # the same weights under another name: a second runtime with its own key
+    path = snapshot_download(f"sentence-transformers/{default.model_name}")
+    other = get_runtime(path)
+    assert other.key != default.key
+
+    monkeypatch.setattr(other, "encode", lambda texts: np.zeros((len(texts), 384)))
+    text = "a text only the other model has seen"
+    vectors = encode_texts([text], model_name=other.model_name)
+
+    np.testing.assert_array_equal(vectors, np.zeros((1, 384)))
+    assert get_embedding_cache(other.model_name).model_name == other.key
+    assert len(get_embedding_cache(other.model_name)) == 1
+    assert not np.allclose(encode_texts([text]), 0)
+
+
+def test_query_encodes_hit_the_query_cache_on_any_backend(monkeypatch):
+    from backend.search.cache import get_query_vectors
+    from backend.search.queries import encode_queries
+
+    # the onnx runtime key also names the backend and graph
+    monkeypatch.setattr(get_runtime(), "backend", "onnx")
+    get_query_vectors.cache_clear()
+    try:
+        cache = get_query_vectors()
+        assert cache.model_name == get_runtime().key
+        encode_queries(["a query only the query cache sees"])
+        assert len(cache) == 1
+    finally:
+        get_query_vectors.cache_clear()
+
+
+def test_superlinked_encodes_with_the_runtime_model(ctx):
+    from superlinked.framework.common.space.embedding.model_based import (
+        singleton_embedding_engine_manager as manager,
+    )
+
+    engines = manager.SingletonEmbeddingEngineManager()._key_to_engine.values()
+    models = [e._model for e in engines if hasattr(e, "_model")]
+    assert models and all(m is get_runtime().model for m in models)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from backend.search.filters import build_filter_index
+
+
+@pytest.fixture
+def columns():
+    rng = np.random.default_rng(0)
+    cat_codes = rng.integers(-1, 6, 2000).astype(np.int32)
+    calories = rng.uniform(0, 900, 2000).astype(np.float32)
+    return cat_codes, calories, build_filter_index(cat_codes, 6, calories)
+
+
+def _expected(cat_codes, calories, codes, calorie_range):
+    mask = np.ones(len(cat_codes), dtype=bool)
+    if codes is not None:
+        mask &= np.isin(cat_codes, list(codes))
+    if calorie_range is not None:
+        mask &= (calories >= calorie_range[0]) & (calories <= calorie_range[1])
+    return np.nonzero(mask)[0]
+
+
+@pytest.mark.parametrize(
+    "codes, calorie_range",
+    [
+        ([2], None),
+        ([0, 3, 5], None),
+        (None, (100.0, 250.0)),
+        ([1], (0.0, 900.0)),  # category postings are the smaller list
+        ([0, 1, 2, 3, 4, 5], (300.0, 310.0)),  # calorie postings are the smaller list
+        ([4], (500.0, 100.0)),  # empty range
+    ],
+)
+def test_candidates_match_a_full_scan(columns, codes, calorie_range):
+    cat_codes, calories, filters = columns
+    rows = filters.candidates(codes, calorie_range)
+    np.testing.assert_array_equal(
+        rows, _expected(cat_codes, calories, codes, calorie_range)
+    )
+
+
+def test_no_filter_means_all_rows(columns):
+    assert columns[2].candidates() is None
+
+
+def test_unknown_codes_match_nothing(columns):
+    filters = columns[2]
+    assert len(filters.candidates([-1, 99])) == 0
+    assert len(filters.candidates([-1], (0.0, 900.0))) == 0
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from backend.search.quantize import load_quantized, quantize, save_quantized
+from backend.search.queries import _batch_scores, _rescore, _top_k, score_pool
+from backend.search.types import SearchCtx, SearchInputs
+from backend.search.vectors import build_vector_index, unit_rows
+
+
+def _index(precision, n=5000, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(50, dim))
+    desc = centers[rng.integers(0, 50, n)] + 0.3 * rng.normal(size=(n, dim))
+    return build_vector_index(
+        ids=np.arange(n),
+        desc=desc,
+        cat_text=rng.normal(size=(n, dim)),
+        food_categories=["a"] * n,
+        categories=["a"],
+        calories=rng.uniform(0, 900, n),
+        descriptions=[""] * n,
+        calories_min=0,
+        calories_max=1000,
+        hashes=np.zeros(n, dtype=np.uint64),
+        precision=precision,
+    )
+
+
+@pytest.mark.parametrize("precision, tolerance", [("float16", 1e-3), ("int8", 2e-2)])
+def test_quantized_dot_is_close(precision, tolerance):
+    rng = np.random.default_rng(1)
+    matrix = unit_rows(rng.normal(size=(300, 64)))
+    queries = unit_rows(rng.normal(size=(5, 64)))
+    q = quantize(matrix, precision)
+    np.testing.assert_allclose(q.dot(queries), matrix @ queries.T, atol=tolerance)
+    rows = np.array([3, 10, 299])
+    np.testing.assert_allclose(
+        q.dot(queries, rows), matrix[rows] @ queries.T, atol=tolerance
+    )
+
+
+def test_float32_is_not_quantized():
+    assert quantize(np.eye(3, dtype=np.float32), "float32") is None
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_rescore_recall(precision):
+    vi = _index(precision)
+    rng = np.random.default_rng(2)
+    q_desc = unit_rows(
+        vi.desc[rng.integers(0, len(vi), 32)] + 0.1 * rng.normal(size=(32, 64))
+    )
+    inputs = [SearchInputs("")] * len(q_desc)
+    k = 10
+
+    approx = _batch_scores(vi, inputs, None, q_desc, None, quantized=True)
+    top, top_scores = _rescore(vi, inputs, None, q_desc, None, approx, k)
+    exact, exact_scores = _top_k(_batch_scores(vi, inputs, None, q_desc, None), k)
+
+    recall = np.mean(
+        [len(np.intersect1d(top[:, j], exact[:, j])) / k for j in range(len(inputs))]
+    )
+    assert recall >= 0.98
+    # rescored hits carry exact float32 scores, best first
+    np.testing.assert_allclose(
+        top_scores, (vi.desc @ q_desc.T)[top, np.arange(len(inputs))], rtol=1e-5
+    )
+    assert (np.diff(top_scores, axis=0) <= 0).all()
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_saved_block_maps_back(tmp_path, precision):
+    matrix = unit_rows(np.random.default_rng(3).normal(size=(300, 16)))
+    save_quantized(matrix, precision, tmp_path / "description")
+    mapped = load_quantized(tmp_path / "description", precision)
+    assert isinstance(mapped.data, np.memmap)
+    expected = quantize(matrix, precision)
+    np.testing.assert_array_equal(mapped.data, expected.data)
+    if precision == "int8":
+        np.testing.assert_array_equal(mapped.scale, expected.scale)
+    assert (
+        load_quantized(
+            tmp_path / "description", "float16" if precision == "int8" else "int8"
+        )
+        is None
+    )
+
+
+def test_pruned_pool_is_rescored_exactly(monkeypatch):
+    from backend.config import settings
+
+    vi = _index("int8")
+    monkeypatch.setattr(settings, "rerank_pool_size", 500)
+    ctx = SearchCtx(
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        vectors=vi,
+        fingerprint="quantized-pool",
+    )
+    q = unit_rows(vi.desc[:1] + 0.1)
+    monkeypatch.setattr(
+        "backend.search.queries.encode_queries",
+        lambda texts: np.repeat(q, len(texts), axis=0),
+    )
+    pool = score_pool(ctx, SearchInputs("q"))
+    assert len(pool) <= 500
+    np.testing.assert_allclose(pool.scores[:, 0], vi.desc[pool.rows] @ q[0], rtol=1e-5)
+    # the quantized shortlist still holds the exact best rows
+    exact_best = np.argsort(-(vi.desc @ q[0]))[:10]
+    assert np.isin(exact_best, pool.rows).all()
@@ -0,0 +1,140 @@
+"""
+Search paths that must agree: Superlinked templates vs the NumPy index, and
+live re-ranking of a cached score pool vs a fresh search.
+"""
+
+from dataclasses import replace
+import numpy as np
+import pytest
+from backend.search.cache import get_search_results
+from backend.search.queries import (
+    combined_search,
+    live_search,
+    numeric_search,
+    rerank,
+    score_pool,
+    simple_search,
+    weighted_search,
+)
+from backend.search.types import CategoryWeights, NumericWeights, SearchInputs
+
+
+@pytest.fixture(autouse=True)
+def no_result_cache(monkeypatch):
+    monkeypatch.setattr(get_search_results(), "max_entries", 0)
+
+
+@pytest.fixture
+def np_ctx(ctx):
+    # the same index served without Superlinked, as worker processes do
+    return replace(ctx, app=None)
+
+
+def _cases(category):
+    return [
+        (simple_search, SearchInputs("apple juice", limit=10), ()),
+        (
+            weighted_search,
+            SearchInputs("apple", category_query="dessert", limit=10),
+            (CategoryWeights(1.0, 0.5),),
+        ),
+        (
+            numeric_search,
+            SearchInputs("chicken", calories_val=300, limit=10),
+            (NumericWeights(1.0, 1.0),),
+        ),
+        (
+            # numeric mode ignores the category, as its Superlinked template does
+            numeric_search,
+            SearchInputs(
+                "chicken", category_query=category, calories_val=300, limit=10
+            ),
+            (NumericWeights(1.0, 1.0),),
+        ),
+        (
+            combined_search,
+            SearchInputs(
+                "chicken",
+                category_query=category,
+                calories_val=300,
+                categories=(category,),
+                limit=10,
+            ),
+            (NumericWeights(1.0, 0.5),),
+        ),
+        (
+            simple_search,
+            SearchInputs("cheese", calories_between=(100.0, 300.0), limit=10),
+            (),
+        ),
+    ]
+
+
+def _frame(result):
+    return result[0] if isinstance(result, tuple) else result
+
+
+def test_superlinked_and_numpy_rank_alike(ctx, np_ctx, food_df):
+    for search, inp, weights in _cases(food_df.food_category.iloc[5]):
+        expected = _frame(search(ctx, inp, *weights))
+        actual = _frame(search(np_ctx, inp, *weights))
+        assert list(actual.description) == list(expected.description), search.__name__
+
+
+def test_hard_filters_hold_on_superlinked(ctx, food_df):
+    category = food_df.food_category.iloc[0]
+    inp = SearchInputs(
+        "apple",
+        category_query=category,
+        calories_val=200,
+        categories=(category,),
+        calories_between=(50.0, 400.0),
+        limit=20,
+    )
+    res = combined_search(ctx, inp, NumericWeights(1.0, 1.0))
+    assert len(res)
+    assert set(res.food_category) == {category}
+    assert res.calories.between(50.0, 400.0).all()
+
+
+def test_list_filters_are_cached_like_tuples(ctx, food_df, monkeypatch):
+    monkeypatch.setattr(get_search_results(), "max_entries", 16)
+    category = food_df.food_category.iloc[0]
+    listed = SearchInputs("apple", categories=[category], calories_between=[0, 500])
+    assert listed.categories == (category,)
+    assert listed.calories_between == (0, 500)
+    expected = simple_search(ctx, replace(listed, categories=(category,)))
+    assert list(simple_search(ctx, listed).description) == list(expected.description)
+
+
+@pytest.mark.parametrize(
+    "weights",
+    [CategoryWeights(1.0, 0.5), CategoryWeights(-0.5, 2.0), CategoryWeights(0.0, 1.0)],
+)
+def test_rerank_matches_weighted_search(np_ctx, weights):
+    inp = SearchInputs("apple pie", category_query="Sweets", limit=10)
+    pool = score_pool(np_ctx, inp, weights)
+    expected = weighted_search(np_ctx, inp, weights)
+    actual = rerank(np_ctx, pool, weights, k=10)
+    assert list(actual.id) == list(expected.id)
+    np.testing.assert_allclose(
+        actual.similarity_score, expected.similarity_score, rtol=1e-5, atol=1e-6
+    )
+
+
+def test_live_search_matches_combined_search(np_ctx, food_df):
+    category = food_df.food_category.iloc[3]
+    inp = SearchInputs(
+        "beef",
+        category_query=category,
+        calories_val=250,
+        categories=(category,),
+        limit=10,
+    )
+    for weights in (NumericWeights(1.0, 1.0), NumericWeights(2.0, -1.0)):
+        expected = combined_search(np_ctx, inp, weights)
+        actual = live_search(np_ctx, inp, weights)
+        assert list(actual.description) == list(expected.description)
+        np.testing.assert_allclose(
+            actual.similarity_score, expected.similarity_score, rtol=1e-5, atol=1e-6
+        )
@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from backend.server.app import parse_request  # noqa: E402
+from backend.search.types import CategoryWeights  # noqa: E402
+
+
+def test_parse_request_builds_inputs_and_weights():
+    inp, weights = parse_request(
+        "weighted",
+        {
+            "description_query": "apple",
+            "category_query": "dessert",
+            "categories": ["Sweets", "Baked Products"],
+            "calories_between": [100, 300],
+            "cat_weight": 0.5,
+        },
+    )
+    assert inp.categories == ("Sweets", "Baked Products")
+    assert inp.calories_between == (100.0, 300.0)
+    assert weights == CategoryWeights(desc_weight=1.0, cat_weight=0.5)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"description_query": 3},
+        {"description_query": "apple", "categories": "Sweets"},
+        {"description_query": "apple", "categories": ["Sweets", 1]},
+        {"description_query": "apple", "calories_between": [100]},
+        {"description_query": "apple", "calories_between": "100-300"},
+        {"description_query": "apple", "limit": 0},
+        {"description_query": "apple", "limit": -1},
+    ],
+)
+def test_parse_request_rejects_malformed_bodies(body):
+    with pytest.raises(ValueError):
+        parse_request("simple", body)
+
+
+def test_parse_request_clamps_the_limit(monkeypatch):
+    from backend.config import settings
+
+    monkeypatch.setattr(settings, "server_max_limit", 50)
+    inp, _ = parse_request("simple", {"description_query": "apple", "limit": 10**6})
+    assert inp.limit == 50
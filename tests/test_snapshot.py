@@ -0,0 +1,43 @@
+import os
+import numpy as np
+from backend.ingest.snapshot import SnapshotWriter, compute_fingerprint, load_snapshot
+
+
+def _write(directory, fingerprint, value):
+    writer = SnapshotWriter(directory, 4)
+    writer.write(
+        0, np.arange(4), {"description": np.full((4, 3), value, dtype=np.float32)}
+    )
+    return writer.finish(fingerprint)
+
+
+def test_round_trip_and_stale_fingerprint(tmp_path):
+    directory = tmp_path / "snapshot"
+    _write(directory, "a", 1.0)
+    snapshot = load_snapshot(directory, "a")
+    np.testing.assert_array_equal(snapshot.ids, np.arange(4))
+    assert snapshot.vectors["description"][0, 0] == 1.0
+    assert load_snapshot(directory, "b") is None
+
+
+def test_republish_swaps_versions_and_keeps_old_maps_valid(tmp_path):
+    directory = tmp_path / "snapshot"
+    _write(directory, "a", 1.0)
+    old = load_snapshot(directory, "a")
+    _write(directory, "b", 2.0)
+    assert directory.is_symlink()
+    assert old.vectors["description"][0, 0] == 1.0
+    assert load_snapshot(directory, "b").vectors["description"][0, 0] == 2.0
+    # only the live version is left beside the link
+    assert sorted(os.listdir(tmp_path)) == sorted(["snapshot", os.readlink(directory)])
+
+
+def test_fingerprint_ignores_chunking_but_not_config():
+    hashes = np.arange(10, dtype=np.uint64)
+    config = {"categories": ["a", "b"]}
+    assert compute_fingerprint([hashes], config) == compute_fingerprint(
+        [hashes[:3], hashes[3:]], config
+    )
+    assert compute_fingerprint([hashes], config) != compute_fingerprint(
+        [hashes], {"categories": ["b", "a"]}
+    )
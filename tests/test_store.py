@@ -0,0 +1,33 @@
+import numpy as np
+from backend.ingest.store import open_store
+from backend.search.filters import build_filter_index
+from backend.search.vectors import calorie_vectors
+
+
+def test_workers_map_the_derived_arrays(ctx):
+    vi = open_store().vectors
+    assert isinstance(vi.cal_vec, np.memmap)
+    assert isinstance(vi.filters.calorie_order, np.memmap)
+    np.testing.assert_allclose(
+        vi.cal_vec, calorie_vectors(vi.calories, vi.calories_min, vi.calories_max)
+    )
+    fresh = build_filter_index(vi.cat_codes, len(vi.categories), vi.calories)
+    for mapped, built in zip(vi.filters.category_rows, fresh.category_rows):
+        np.testing.assert_array_equal(mapped, built)
+    np.testing.assert_array_equal(vi.filters.sorted_calories, fresh.sorted_calories)
+
+
+def test_workers_map_the_quantized_blocks(ctx, monkeypatch):
+    from backend.config import settings
+    from backend.ingest.store import write_metadata
+
+    monkeypatch.setattr(settings, "vector_precision", "int8")
+    store = open_store()  # quantizes in memory: the store has no int8 blocks yet
+    write_metadata(store.vectors, store.fingerprint)
+    vi = open_store().vectors
+    assert isinstance(vi.desc_q.data, np.memmap) and isinstance(
+        vi.cat_text_q.scale, np.memmap
+    )
+    np.testing.assert_array_equal(vi.desc_q.data, store.vectors.desc_q.data)
+    # unit-norm snapshot vectors are used as mapped, not normalised into a copy
+    assert isinstance(vi.desc, np.memmap)
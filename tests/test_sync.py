@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backend.config import settings
+from backend.ingest.loader import build_superlinked_app, sync_index
+from backend.search.queries import simple_search
+from backend.search.types import SearchInputs
+
+
+@pytest.fixture
+def base(food_df):
+    # leave rows out so the sync has something to add
+    return food_df.iloc[:300].reset_index(drop=True)
+
+
+@pytest.fixture
+def base_ctx(base):
+    return build_superlinked_app(base)
+
+
+def _added(food_df, base):
+    # rows outside ``base`` in its categories (new categories force a rebuild)
+    rest = food_df.iloc[len(base) :]
+    return rest[rest.food_category.isin(set(base.food_category))]
+
+
+def _changed(food_df, base):
+    new = pd.concat([base.iloc[5:], _added(food_df, base)], ignore_index=True)
+    new["description"] = new["description"].astype(object)
+    new.loc[0, "description"] = "Apple pie, sync test edition"
+    new.loc[1, "calories"] = 999.0
+    return new
+
+
+def test_unchanged_data_is_a_no_op(base_ctx, base):
+    ctx, stats = sync_index(base_ctx, base)
+    assert not stats
+    assert ctx is base_ctx
+
+
+def test_sync_applies_upserts_and_deletes(base_ctx, base, food_df):
+    new = _changed(food_df, base)
+    ctx, stats = sync_index(base_ctx, new)
+
+    assert not stats.rebuilt
+    np.testing.assert_array_equal(
+        np.sort(stats.deleted), np.sort(base.fdc_id.iloc[:5].to_numpy())
+    )
+    np.testing.assert_array_equal(
+        np.sort(stats.added), np.sort(_added(food_df, base).fdc_id.to_numpy())
+    )
+    assert set(stats.updated) == set(new.fdc_id.iloc[:2])
+
+    vi = ctx.vectors
+    np.testing.assert_array_equal(vi.ids, new.fdc_id.to_numpy())
+    assert vi.descriptions[0] == "Apple pie, sync test edition"
+    assert vi.calories[1] == 999.0
+
+    # same vectors and fingerprint as ingesting the new data from scratch
+    fresh = build_superlinked_app(new, use_snapshot=False)
+    assert ctx.fingerprint == fresh.fingerprint
+    np.testing.assert_allclose(vi.desc, fresh.vectors.desc, atol=1e-5)
+    assert vi.categories == fresh.vectors.categories
+
+    res = simple_search(
+        ctx, SearchInputs("apple pie sync test edition", limit=len(new))
+    )
+    assert "Apple pie, sync test edition" in set(res.description)
+    assert not set(base.description.iloc[:5]) - set(new.description) & set(
+        res.description
+    )
+
+
+def test_deleting_a_whole_category_keeps_fingerprints_consistent(base_ctx, base):
+    gone = base.food_category.iloc[0]
+    new = base[base.food_category != gone].reset_index(drop=True)
+    ctx, stats = sync_index(base_ctx, new)
+    assert not stats.rebuilt
+    assert gone not in ctx.vectors.categories
+    assert ctx.fingerprint == build_superlinked_app(new, use_snapshot=False).fingerprint
+
+
+def test_tombstones_past_the_cap_trigger_a_rebuild(base_ctx, base, monkeypatch):
+    monkeypatch.setattr(settings, "max_tombstones", 3)
+    ctx, stats = sync_index(base_ctx, base.iloc[2:].reset_index(drop=True))
+    assert not stats.rebuilt and len(ctx.deleted_ids) == 2
+
+    ctx, stats = sync_index(ctx, base.iloc[4:].reset_index(drop=True))
+    assert stats.rebuilt
+    assert not ctx.deleted_ids
+    np.testing.assert_array_equal(ctx.vectors.ids, base.fdc_id.iloc[4:].to_numpy())
+    res = simple_search(ctx, SearchInputs(base.description.iloc[0], limit=len(base)))
+    assert len(res) == len(base) - 4
@@ -0,0 +1,32 @@
+import asyncio
+from backend.search.understanding import (
+    LocalTranslator,
+    OpenAITranslator,
+    QueryUnderstanding,
+    TranslationCache,
+)
+
+
+def test_parse_many_runs_again_from_the_cache():
+    stage = QueryUnderstanding(LocalTranslator(), TranslationCache())
+    first = stage.parse_many(["マンゴー", "Pão", "マンゴー"])
+    descriptions = [p.description for p in first]
+    assert descriptions == ["mango, raw", "bread, white", "mango, raw"]
+    # a second blocking call runs on a new event loop and reads the cache
+    assert stage.parse_many(["Pão"]) == [first[1]]
+    assert stage.cache.stats().hits == 1
+
+
+def test_openai_translator_has_a_client_per_event_loop(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    translator = OpenAITranslator()
+
+    async def clients():
+        return translator._async_client(), translator._async_client()
+
+    first, same = asyncio.run(clients())
+    second, _ = asyncio.run(clients())
+    assert first is same
+    assert second is not first
+    # clients of closed loops are dropped
+    assert len(translator._aclients) == 1